@@ -73,6 +73,12 @@ input_classes = OrderedDict(
 
 fixpoint_classes = OrderedDict(
     [('FIR_DF_wdg', {'name': 'FIR_DF', 'mod': 'pyfda.fixpoint_widgets.fir_df', 'opt': ['Equiripple', 'Firwin']}),
+     ('FIR_Sym_wdg', {'name': 'FIR_Sym', 'mod': 'pyfda.fixpoint_widgets.fir_sym', 'opt': ['Equiripple', 'Firwin']}),
+     ('FIR_TF_wdg', {'name': 'FIR_TF', 'mod': 'pyfda.fixpoint_widgets.fir_sym', 'opt': ['Equiripple', 'Firwin']}),
+     ('FIR_CSD_wdg', {'name': 'FIR_CSD', 'mod': 'pyfda.fixpoint_widgets.fir_csd', 'opt': ['Equiripple', 'Firwin']}),
+     ('IIR_SOS_wdg', {'name': 'IIR_SOS', 'mod': 'pyfda.fixpoint_widgets.iir_sos', 'opt': ['Bessel', 'Butter', 'Cheby1', 'Cheby2', 'Ellip']}),
+     ('FIR_Decim_wdg', {'name': 'FIR_Decim', 'mod': 'pyfda.fixpoint_widgets.fir_poly', 'opt': ['Equiripple', 'Firwin']}),
+     ('FIR_Interp_wdg', {'name': 'FIR_Interp', 'mod': 'pyfda.fixpoint_widgets.fir_poly', 'opt': ['Equiripple', 'Firwin']}),
      ('Delay_wdg', {'name': 'Delay', 'mod': 'pyfda.fixpoint_widgets.delay1', 'opt': ['Equiripple']})
      ])
 
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the pyFDA project hosted at https://github.com/chipmuenk/pyfda
+#
+# Copyright © pyFDA Project Contributors
+# Licensed under the terms of the MIT License
+# (see file LICENSE in root directory for details)
+
+"""
+Widget for specifying the parameters of a multiplierless FIR filter: The
+products of the transposed direct form are calculated by a shift-and-add
+network derived from the CSD digits of the coefficients with common
+subexpressions shared between the taps.
+
+The filter performs the same integer arithmetics as the direct form
+:class:`pyfda.fixpoint_widgets.fir_df.FIR`, the NumPy model :func:`fir_np` is
+bit-exact for it as well.
+"""
+import sys
+import logging
+logger = logging.getLogger(__name__)
+
+import numpy as np
+import pyfda.filterbroker as fb
+from pyfda.libs.pyfda_fix_lib import csd_cse, csd_cse_adders
+
+from .fixpoint_helpers import requant, fx_hash, fx_cache
+from .fir_df import fir_qp
+from .fir_sym import FIR_TF_wdg
+
+from migen import Signal, Module
+from migen.fhdl import verilog
+
+classes = {'FIR_CSD_wdg':'FIR_CSD'} #: Dict containing widget class name : display name
+
+###############################################################################
+class FIR_CSD(Module):
+    """
+    Multiplierless transposed direct form FIR filter: The registered input is
+    multiplied with all distinct coefficient magnitudes by a network of
+    shifts and adders (see :func:`pyfda.libs.pyfda_fix_lib.csd_cse`), the
+    products are added to a chain of registers holding the partial sums.
+    """
+    def __init__(self):
+        p = fb.fil[0]['fxqc']
+
+        # ------------- Define I/Os -------------------------------------------
+        self.i = Signal((p['QI']['W'], True)) # input signal
+        self.o = Signal((p['QO']['W'], True)) # output signal
+
+        ###
+        QP = fir_qp(p) # word format for sum of partial products b_i * x_i
+        b = [int(c) for c in p['b']]
+        W_I = p['QI']['W']
+
+        x_reg = Signal((W_I, True)) # input register
+        self.sync += x_reg.eq(self.i)
+
+        # shared subexpressions, each one requires a single adder / subtractor
+        subs, terms = csd_cse(b)
+        xs = [x_reg]
+        vals = [1] # multiples of x_reg represented by the subexpressions
+        for id_a, shift, sign, id_b in subs:
+            vals.append(sign * (vals[id_a] << shift) + vals[id_b])
+            x_sub = Signal((W_I + abs(vals[-1]).bit_length() + 1, True))
+            if sign > 0:
+                self.comb += x_sub.eq((xs[id_a] << shift) + xs[id_b])
+            else:
+                self.comb += x_sub.eq(xs[id_b] - (xs[id_a] << shift))
+            xs.append(x_sub)
+
+        # products with the odd fundamentals
+        prods_f = {}
+        for f, t in terms.items():
+            expr = None
+            for sign, shift, idx in t:
+                if expr is None:
+                    expr = xs[idx] << shift if sign > 0 else -(xs[idx] << shift)
+                else:
+                    expr = expr + (xs[idx] << shift) if sign > 0 else expr - (xs[idx] << shift)
+            prod = Signal((W_I + f.bit_length() + 1, True))
+            self.comb += prod.eq(expr)
+            prods_f[f] = prod
+
+        # products with the coefficient magnitudes are shifted fundamentals
+        prods = {}
+        for c in {abs(c) for c in b} - {0}:
+            tz = (c & -c).bit_length() - 1
+            prods[c] = prods_f[c >> tz] << tz
+
+        # chain of partial sums, starting with the last coefficient. Partial sums
+        # wrap at the full precision word length like the final sum.
+        s = None
+        for c in reversed(b):
+            if c == 0:
+                expr = 0 if s is None else s
+            elif s is None:
+                expr = prods[abs(c)] if c > 0 else -prods[abs(c)]
+            else:
+                expr = s + prods[abs(c)] if c > 0 else s - prods[abs(c)]
+            s_reg = Signal((QP['W'], True))
+            self.sync += s_reg.eq(expr)
+            s = s_reg
+        sum_full = s
+
+        # rescale from full product format to accumulator format
+        sum_accu = Signal((p['QA']['W'], True))
+        self.comb += sum_accu.eq(requant(self, sum_full, QP, p['QA']))
+
+        # rescale from accumulator format to output width
+        self.comb += self.o.eq(requant(self, sum_accu, p['QA'], p['QO']))
+
+        # signals of the stages, e.g. for verifying the NumPy model
+        self.stages = {'QP':sum_full, 'QA':sum_accu, 'QO':self.o}
+
+###############################################################################
+class FIR_CSD_wdg(FIR_TF_wdg):
+    """
+    Widget for entering word formats & quantization of a multiplierless
+    transposed FIR filter, also instantiates fixpoint filter class :class:`FIR_CSD`.
+    """
+    def __init__(self, parent):
+        super(FIR_CSD_wdg, self).__init__(parent)
+
+        self.title = ("<b>Multiplierless FIR Filter</b><br />"
+                      "Transposed direct form with CSD shift-and-add network.")
+        self.lbl_mults.setToolTip("<span>Number of adders for calculating the "
+            "products with shared subexpressions (and without sharing) compared "
+            "to the number of multipliers of the direct form FIR filter. The "
+            "adders of the register chain are not included.</span>")
+
+#------------------------------------------------------------------------------
+    def _update_mults(self):
+        """
+        Update the label with the number of adders of the shift-and-add network
+        """
+        if self.lbl_mults is None: # called during initialization of the parent
+            return
+        b = fb.fil[0]['fxqc']['b']
+        self.lbl_mults.setText("Adders: {0} (no sharing: {1}), Direct Form: {2} Multipliers"
+            .format(csd_cse_adders(b), csd_cse_adders(b, cse=False), len(b)))
+
+#------------------------------------------------------------------------------
+    def construct_fixp_filter(self):
+        """
+        Construct an instance of the fixpoint filter object using the settings from
+        the 'fxqc' quantizer dict
+        """
+        p = fb.fil[0]['fxqc']
+        if not all(np.isfinite(p['b'])):
+            logger.error("Coefficients contain non-finite values!")
+            return
+        if any(np.iscomplex(p['b'])):
+            logger.error("Coefficients contain complex values!")
+            return
+
+        self.fixp_filter = fx_cache.get_module(fx_hash('FIR_CSD', p), FIR_CSD)
+
+#------------------------------------------------------------------------------
+    def to_verilog(self, **kwargs):
+        """
+        Convert the migen description to Verilog, the code is cached for
+        identical settings and conversion options `kwargs`
+        """
+        return fx_cache.get_verilog(fx_hash('FIR_CSD', fb.fil[0]['fxqc'], kwargs),
+            lambda: verilog.convert(self.fixp_filter,
+                                    ios={self.fixp_filter.i, self.fixp_filter.o},
+                                    **kwargs))
+
+#------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    from pyfda.libs.compat import QApplication
+    app = QApplication(sys.argv)
+    mainw = FIR_CSD_wdg(None)
+    mainw.show()
+
+    app.exec_()
+
+    # test using "python -m pyfda.fixpoint_widgets.fir_csd"
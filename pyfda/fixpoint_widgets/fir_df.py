@@ -16,23 +16,27 @@ logger = logging.getLogger(__name__)
 import numpy as np
 import pyfda.filterbroker as fb
 from pyfda.libs.pyfda_lib import set_dict_defaults, pprint_log
-from pyfda.libs.pyfda_qt_lib import qget_cmb_box
+from pyfda.libs.pyfda_qt_lib import qget_cmb_box, qset_cmb_box
 
-from pyfda.libs.compat import QWidget, QVBoxLayout, pyqtSignal
+from pyfda.libs.compat import (QWidget, QLabel, QSpinBox, QVBoxLayout, QHBoxLayout,
+                               pyqtSignal)
 
 #import pyfda.libs.pyfda_fix_lib as fx
-from .fixpoint_helpers import UI_W, UI_Q, requant
+from .fixpoint_helpers import (UI_W, UI_Q, requant, requant_np, wrap_np, fx_hash, fx_cache,
+                               adder_levels, adder_tree)
 
 #####################
-from functools import reduce
-from operator import add
-
 from migen import Signal, Module, run_simulation
 from migen.fhdl import verilog
 ################################
 
 classes = {'FIR_DF_wdg':'FIR_DF'} #: Dict containing widget class name : display name
 
+# latency of the migen simulation: input register, register for the sum
+# and one cycle for passing the stimulus in the testbench. Pipeline registers
+# of the adder tree add to this, see `fir_latency()`
+FIR_LATENCY = 3
+
 # =============================================================================
 
 class FIR_DF_wdg(QWidget):
@@ -68,6 +72,7 @@ class FIR_DF_wdg(QWidget):
             fb.fil[0]['fxqc']['QA'] = {}
         set_dict_defaults(fb.fil[0]['fxqc']['QA'], 
                           {'WI':0, 'WF':30, 'W':32, 'ovfl':'wrap', 'quant':'floor'})
+        fb.fil[0]['fxqc'].setdefault('pipe', 0)
       
         self.wdg_w_coeffs = UI_W(self, fb.fil[0]['fxqc']['QCB'], id='w_coeff',
                                         label='Coeff. Format <i>B<sub>I.F&nbsp;</sub></i>:',
@@ -94,12 +99,29 @@ class FIR_DF_wdg(QWidget):
         self.wdg_w_accu.ledWF.setEnabled(cmbW=='man')
         self.wdg_w_accu.ledWI.setEnabled(cmbW=='man')
 
+        # number of pipeline registers in the adder tree
+        self.lbl_pipe = QLabel("Adder Pipeline:", self)
+        self.spn_pipe = QSpinBox(self)
+        self.spn_pipe.setToolTip("<span>Number of pipeline register stages in the adder "
+            "tree for the sum of products. More stages reduce the logic depth "
+            "(higher f<sub>max</sub>) at the cost of latency and registers.</span>")
+        self.lbl_pipe_info = QLabel("", self)
+        self.lbl_pipe_info.setToolTip("<span>Latency of the filter in clock cycles and "
+            "max. number of adders in series between two registers.</span>")
+        self._update_pipe_ui()
+        self.layHPipe = QHBoxLayout()
+        self.layHPipe.addWidget(self.lbl_pipe)
+        self.layHPipe.addWidget(self.spn_pipe)
+        self.layHPipe.addWidget(self.lbl_pipe_info)
+        self.layHPipe.addStretch()
+
         #----------------------------------------------------------------------
         # LOCAL SIGNALS & SLOTs & EVENTFILTERS
         #----------------------------------------------------------------------      
         self.wdg_w_coeffs.sig_tx.connect(self.update_q_coeff)
         self.wdg_w_accu.sig_tx.connect(self.process_sig_rx)
         self.wdg_q_accu.sig_tx.connect(self.process_sig_rx)
+        self.spn_pipe.valueChanged.connect(self._set_pipe)
 #------------------------------------------------------------------------------
 
         layVWdg = QVBoxLayout()
@@ -109,6 +131,7 @@ class FIR_DF_wdg(QWidget):
 #        layVWdg.addWidget(self.wdg_q_coeffs)
         layVWdg.addWidget(self.wdg_q_accu)
         layVWdg.addWidget(self.wdg_w_accu)
+        layVWdg.addLayout(self.layHPipe)
 
         layVWdg.addStretch()
 
@@ -145,6 +168,43 @@ class FIR_DF_wdg(QWidget):
 
         self.sig_tx.emit(dict_sig)
 
+#------------------------------------------------------------------------------
+    def _set_pipe(self, pipe):
+        """
+        Store the number of adder pipeline stages selected in the spin box in
+        `fb.fil[0]['fxqc']['pipe']` and update the info label
+        """
+        fb.fil[0]['fxqc']['pipe'] = pipe
+        self._update_pipe_ui()
+        self.sig_tx.emit({'sender':__name__, 'ui':'pipe', 'id':'pipe'})
+
+#------------------------------------------------------------------------------
+    def _update_pipe_ui(self):
+        """
+        Update range and value of the pipeline spin box (the number of stages is
+        limited by the number of adder levels) and the info label showing the
+        latency / logic depth trade-off.
+        """
+        p = fb.fil[0]['fxqc']
+        N = self.adder_inputs()
+        levels = adder_levels(N)
+        self.spn_pipe.blockSignals(True)
+        self.spn_pipe.setRange(0, max(levels - 1, 0))
+        self.spn_pipe.setValue(fir_pipe(p, N))
+        self.spn_pipe.blockSignals(False)
+        depth = -(-levels // (fir_pipe(p, N) + 1)) # ceil(levels / (pipe + 1))
+        self.lbl_pipe_info.setText("Latency = {0}, Adders / Stage = {1}".format(
+            fir_latency(p, N) - 1, depth)) # w/o the extra cycle of the testbench
+
+#------------------------------------------------------------------------------
+    def adder_inputs(self, p=None):
+        """
+        Return the number of inputs of the adder tree (the number of products)
+        for the coefficients of the fixpoint dict `p` (default: `fb.fil[0]['fxqc']`)
+        """
+        p = fb.fil[0]['fxqc'] if p is None else p
+        return len(p['b'])
+
 #------------------------------------------------------------------------------        
     def update_q_coeff(self, dict_sig):
         """
@@ -220,6 +280,7 @@ class FIR_DF_wdg(QWidget):
             
         self.wdg_w_coeffs.dict2ui(fxqc_dict['QCB']) # update coefficient wordlength
         self.update_accu_settings()                 # update accumulator settings
+        self._update_pipe_ui()                      # number of adder levels may have changed
 #------------------------------------------------------------------------------
     def ui2dict(self):
         """
@@ -248,6 +309,8 @@ class FIR_DF_wdg(QWidget):
         - 'QA': dictionary with accumulator quantization settings
         
         - 'b' : list of coefficients in integer format
+
+        - 'pipe' : number of pipeline register stages in the adder tree
             
         """
         fxqc_dict = fb.fil[0]['fxqc']
@@ -265,6 +328,7 @@ class FIR_DF_wdg(QWidget):
         
         fxqc_dict.update({'b':self.wdg_w_coeffs.quant_coeffs(self.wdg_w_coeffs.q_dict,
                                                         fb.fil[0]['ba'][0])})
+        fxqc_dict.update({'pipe':self.spn_pipe.value()})
         return fxqc_dict
     
 #------------------------------------------------------------------------------
@@ -281,37 +345,201 @@ class FIR_DF_wdg(QWidget):
             logger.error("Coefficients contain complex values!")
             return
 
-        self.fixp_filter = FIR()
+        # reuse the elaborated module when word formats and coefficients are unchanged
+        self.fixp_filter = fx_cache.get_module(fx_hash('FIR_DF', p), FIR)
 #------------------------------------------------------------------------------
     def to_verilog(self, **kwargs):
         """
-        Convert the migen description to Verilog
+        Convert the migen description to Verilog, the code is cached for
+        identical settings and conversion options `kwargs`
         """
-        return verilog.convert(self.fixp_filter,
-                               ios={self.fixp_filter.i, self.fixp_filter.o},
-                               **kwargs) 
+        return fx_cache.get_verilog(fx_hash('FIR_DF', fb.fil[0]['fxqc'], kwargs),
+            lambda: verilog.convert(self.fixp_filter,
+                                    ios={self.fixp_filter.i, self.fixp_filter.o},
+                                    **kwargs))
 #------------------------------------------------------------------------------
-    def tb_wdg_stim(self, stimulus, outputs):
-        """ use stimulus list from widget as input to filter """
-        for x in stimulus:
+    def tb_wdg_stim(self, stimulus, outputs, stages=None, progress=None):
+        """
+        use stimulus list from widget as input to filter, optionally record the
+        signals of all stages in the dict of lists `stages`. The callback
+        `progress(n, outputs)` is called before each sample, the simulation
+        stops when it returns False.
+        """
+        for n, x in enumerate(stimulus):
+            if progress is not None and not progress(n, outputs):
+                return # simulation has been cancelled
             yield self.fixp_filter.i.eq(int(x)) # pass one stimulus value to filter
             outputs.append((yield self.fixp_filter.o)) # append filter output to output list
+            if stages is not None:
+                for k in stages:
+                    stages[k].append((yield self.fixp_filter.stages[k]))
             yield # next x until stimulus is used up
 
 
 #------------------------------------------------------------------------------           
-    def run_sim(self, stimulus):
+    def run_sim(self, stimulus, stages=False, progress=None):
         """
         Pass stimuli and run filter simulation, see 
         https://reconfig.io/2018/05/hello_world_migen
         https://github.com/m-labs/migen/blob/master/examples/sim/fir.py        
+
+        When `stages == True`, return a dict with the responses of all stages
+        (keys 'QP', 'QA' and 'QO') instead of the output response.
+
+        The optional callback `progress(n, response)` receives the number of
+        simulated samples and the response so far, when it returns False the
+        simulation is cancelled and the partial response is returned.
         """
     
         response = []
-        testbench = self.tb_wdg_stim(stimulus, response) 
+        if stages:
+            stages = {k:[] for k in self.fixp_filter.stages}
+        else:
+            stages = None
+        testbench = self.tb_wdg_stim(stimulus, response, stages, progress)
         run_simulation(self.fixp_filter, testbench)
         
-        return response
+        if stages is None:
+            return response
+        else:
+            return stages
+
+#------------------------------------------------------------------------------
+    def run_sim_np(self, stimulus, stages=False, p=None):
+        """
+        Calculate the fixpoint response with the bit-exact NumPy model
+        :func:`fir_np` instead of the migen simulation. This yields the same
+        integer results as :meth:`run_sim`, but much faster.
+
+        `p` is the fixpoint dict, `fb.fil[0]['fxqc']` by default. Pass a copy to
+        run the model in a different thread while the UI can still be edited.
+        """
+        p = fb.fil[0]['fxqc'] if p is None else p
+        return fir_np(p, stimulus, stages=stages,
+                      latency=fir_latency(p, self.adder_inputs(p)))
+
+#------------------------------------------------------------------------------
+    def optimize_fxqc(self, **kwargs):
+        """
+        Search the minimum word lengths of coefficients, accumulator and output
+        meeting the targets passed as `kwargs` with
+        :func:`pyfda.fixpoint_widgets.fx_optimizer.optimize_fxqc` and write
+        them to `fb.fil[0]['fxqc']`. The accumulator width is set to manual
+        mode to keep the optimized format.
+        """
+        from .fx_optimizer import optimize_fxqc # avoid circular import
+        p = optimize_fxqc(fb.fil[0]['fxqc'], fb.fil[0]['ba'][0], fb.fil[0], **kwargs)
+        for k in ('QCB', 'QA', 'QO'):
+            fb.fil[0]['fxqc'][k].update({key:p[k][key] for key in ('WI', 'WF', 'W')})
+        fb.fil[0]['fxqc']['b'] = p['b']
+
+        qset_cmb_box(self.wdg_w_accu.cmbW, 'man')
+        self.wdg_w_accu.ledWF.setEnabled(True)
+        self.wdg_w_accu.ledWI.setEnabled(True)
+
+#------------------------------------------------------------------------------
+    def settling_time(self, N_max=None):
+        """
+        Return the number of samples after which the response doesn't depend
+        on the initial (zero) state of the filter anymore, i.e. the response
+        of a simulation starting in the middle of a stimulus becomes valid.
+        The result is capped at `N_max` unless `N_max` is None.
+        """
+        N = len(fb.fil[0]['fxqc']['b'])\
+            + fir_latency(fb.fil[0]['fxqc'], self.adder_inputs()) - 1
+        return N if N_max is None else min(N, N_max)
+
+###############################################################################
+def fir_pipe(p, N=None):
+    """
+    Return the number of pipeline register stages in the adder tree, i.e. the
+    setting `p['pipe']` limited to the number of adder levels - 1 (the sum is
+    always registered once). `N` is the number of inputs of the adder tree,
+    by default the number of coefficients.
+    """
+    if N is None:
+        N = len(p['b'])
+    return max(min(int(p.get('pipe', 0)), adder_levels(N) - 1), 0)
+
+#------------------------------------------------------------------------------
+def fir_latency(p, N=None):
+    """
+    Return the latency of the migen simulation for the `fxqc` dict `p` and
+    an adder tree with `N` inputs (default: number of coefficients)
+    """
+    return FIR_LATENCY + fir_pipe(p, N)
+
+#------------------------------------------------------------------------------
+def fir_qp(p):
+    """
+    Return the quantization dict for the full precision sum of partial products
+    b_i * x_i, using the coefficient and input settings of the `fxqc` dict `p`.
+    """
+    DW = int(np.ceil(np.log2(len(p['b'])))) # word growth
+    QP = {'WI':p['QI']['WI'] + p['QCB']['WI'] + DW,
+          'WF':p['QI']['WF'] + p['QCB']['WF']}
+    QP.update({'W':QP['WI'] + QP['WF'] + 1})
+    return QP
+
+#------------------------------------------------------------------------------
+def fir_np(p, stimulus, stages=False, latency=None):
+    """
+    Bit-exact NumPy model of the migen module :class:`FIR`, operating on whole
+    arrays instead of single samples.
+
+    The register chain and the products of coefficients and registers are
+    calculated by an integer convolution, the sum is wrapped to the full
+    precision format `QP` and requantized to the accumulator and the output
+    format with :func:`requant_np`.
+
+    Parameters
+    ----------
+    p: dict
+        `fxqc` dict with the quantization settings and the integer coefficients `p['b']`
+
+    stimulus: array-like of integers
+        input signal in integer format, this is wrapped to the input word length
+        like the migen input signal
+
+    stages: bool
+        When True, return the signals of all stages instead of the output only
+
+    latency: int or None
+        latency of the migen simulation, the default `None` uses the latency
+        of :class:`FIR` calculated by :func:`fir_latency`. This allows using
+        the model for other FIR structures with the same arithmetics.
+
+    Returns
+    -------
+    ndarray of integers
+        response with the same length and the same latency as the migen
+        simulation with :meth:`FIR_DF_wdg.run_sim`, or a dict with the
+        responses of the sum of products ('QP'), the accumulator ('QA') and
+        the output ('QO') when `stages == True`.
+    """
+    QP = fir_qp(p)
+    if QP['W'] <= 64:
+        dtype = np.int64
+    else: # use python integers, int64 arithmetics could overflow
+        dtype = object
+
+    x = wrap_np(np.asarray(stimulus, dtype=np.int64).astype(dtype), p['QI']['W'])
+    b = np.array([int(b) for b in p['b']], dtype=dtype)
+    sum_full = wrap_np(np.convolve(x, b)[:len(x)], QP['W'])
+    sum_accu = requant_np(sum_full, QP, p['QA'])
+    y = requant_np(sum_accu, p['QA'], p['QO'])
+
+    # delay all signals by the latency of the migen simulation
+    L = fir_latency(p) if latency is None else latency
+    responses = {}
+    for k, sig in (('QP', sum_full), ('QA', sum_accu), ('QO', y)):
+        responses[k] = np.zeros(len(x), dtype=dtype)
+        responses[k][L:] = sig[:max(len(x) - L, 0)]
+
+    if stages:
+        return responses
+    else:
+        return responses['QO']
 ###############################################################################
 # A synthesizable FIR filter.
 class FIR(Module):
@@ -324,11 +552,7 @@ class FIR(Module):
 
         ###
         muls = []    # list for partial products b_i * x_i
-        DW = int(np.ceil(np.log2(len(p['b'])))) # word growth 
-        # word format for sum of partial products b_i * x_i
-        QP = {'WI':p['QI']['WI'] + p['QCB']['WI'] + DW, 
-              'WF':p['QI']['WF'] + p['QCB']['WF']}
-        QP.update({'W':QP['WI'] + QP['WF'] + 1})
+        QP = fir_qp(p) # word format for sum of partial products b_i * x_i
 
         src = self.i # first register is connected to input signal
 
@@ -343,7 +567,8 @@ class FIR(Module):
         # saturation logic doesn't make much sense with a FIR filter, this is 
         # just for demonstration
         sum_full = Signal((QP['W'], True))
-        self.sync += sum_full.eq(reduce(add, muls)) # sum of multiplication products
+        # sum of multiplication products with a (pipelined) binary adder tree
+        self.sync += sum_full.eq(adder_tree(self, muls, QP['W'], fir_pipe(p)))
 
         # rescale from full product format to accumulator format 
         sum_accu = Signal((p['QA']['W'], True))
@@ -352,6 +577,9 @@ class FIR(Module):
         # rescale from accumulator format to output width
         self.comb += self.o.eq(requant(self, sum_accu, p['QA'], p['QO']))
 
+        # signals of the stages, e.g. for verifying the NumPy model
+        self.stages = {'QP':sum_full, 'QA':sum_accu, 'QO':self.o}
+
 #------------------------------------------------------------------------------
 
 if __name__ == '__main__':
@@ -0,0 +1,562 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the pyFDA project hosted at https://github.com/chipmuenk/pyfda
+#
+# Copyright © pyFDA Project Contributors
+# Licensed under the terms of the MIT License
+# (see file LICENSE in root directory for details)
+
+"""
+Widgets for specifying the parameters of polyphase FIR decimators and
+interpolators.
+
+The decimator only calculates every M-th output sample of the FIR filter,
+the interpolator filters the upsampled input without calculating products
+with the inserted zeros. In both cases, the coefficients are split into
+polyphase components that share one set of multipliers: The decimator
+accumulates the partial sums of the M phases, the interpolator calculates one
+phase per clock cycle.
+
+The arithmetics are the same as for the direct form
+:class:`pyfda.fixpoint_widgets.fir_df.FIR` (products in full precision, sum
+wrapped to the full precision format). The vectorized NumPy models
+:func:`decim_np` and :func:`interp_np` are bit-exact with the migen modules.
+"""
+import sys
+import logging
+logger = logging.getLogger(__name__)
+
+import numpy as np
+import pyfda.filterbroker as fb
+
+from pyfda.libs.compat import QLabel, QSpinBox, QHBoxLayout
+
+from .fixpoint_helpers import requant, requant_np, wrap_np, fx_hash, fx_cache, adder_tree
+from .fir_df import FIR_DF_wdg, FIR_LATENCY, fir_qp
+
+from migen import Signal, Module, If, Case
+from migen.fhdl import verilog
+
+classes = {'FIR_Decim_wdg':'FIR_Decim', 'FIR_Interp_wdg':'FIR_Interp'} #: Dict containing widget class name : display name
+
+#------------------------------------------------------------------------------
+def poly_mults(b, R):
+    """
+    Return the number of multipliers of a polyphase decimator / interpolator
+    with the coefficients `b` and the rate change factor `R`, i.e. the length
+    of the longest polyphase component
+    """
+    return -(-len(b) // max(int(R), 1))
+
+#------------------------------------------------------------------------------
+def _coeff_mux(mod, b, i, R, phase, offset):
+    """
+    Return a migen signal or an integer for the coefficient of the polyphase
+    multiplier `i`: `b[i * R + (offset +/- phase) % R]` is selected by the
+    phase counter `phase` (None for `R == 1`). The sign of `phase` is given by
+    the sign of the multiplier -1 (decimator) or +1 (interpolator) in `offset`.
+    """
+    sign, offset = offset
+    coeffs = []
+    for ph in range(R):
+        k = i * R + (offset + sign * ph) % R
+        coeffs.append(b[k] if k < len(b) else 0)
+    if phase is None:
+        return coeffs[0]
+    W_c = max(abs(c) for c in coeffs).bit_length() + 1
+    c = Signal((W_c, True))
+    mod.comb += Case(phase, {ph: c.eq(coeffs[ph]) for ph in range(R)})
+    return c
+
+###############################################################################
+class FIR_Decim(Module):
+    """
+    Polyphase FIR decimator by `p['M']`: The input is shifted into a register
+    chain at the full rate, the multipliers are shared between the M
+    polyphase components of the coefficients. In each clock cycle, one
+    component is multiplied with every M-th register and the partial sum is
+    accumulated, every M cycles the sum is registered and the strobe `o_valid`
+    is set.
+    """
+    def __init__(self):
+        p = fb.fil[0]['fxqc']
+        M = max(int(p['M']), 1)
+
+        # ------------- Define I/Os -------------------------------------------
+        self.i = Signal((p['QI']['W'], True)) # input signal
+        self.o = Signal((p['QO']['W'], True)) # output signal
+        self.o_valid = Signal()                # new output sample
+
+        ###
+        QP = fir_qp(p) # word format for sum of partial products b_i * x_i
+        b = [int(c) for c in p['b']]
+        N_i = poly_mults(b, M)
+
+        sregs = [] # chain of registers with input word length
+        src = self.i
+        for _ in range((N_i - 1) * M + 1):
+            sreg = Signal((p['QI']['W'], True))
+            self.sync += sreg.eq(src)
+            src = sreg
+            sregs.append(sreg)
+
+        phase = Signal(max=M) if M > 1 else None # phase counter
+        # the register chain holds x[n - k] when phase (2 - n) % M is processed
+        muls = [_coeff_mux(self, b, i, M, phase, (-1, 2)) * sregs[i * M]
+                for i in range(N_i)]
+        partial = adder_tree(self, muls, QP['W'])
+
+        sum_full = Signal((QP['W'], True))
+        if M == 1:
+            self.sync += [sum_full.eq(partial), self.o_valid.eq(1)]
+        else:
+            acc = Signal((QP['W'], True)) # accumulator for the partial sums
+            self.sync += [
+                If(phase == M - 1, phase.eq(0)).Else(phase.eq(phase + 1)),
+                If(phase == 3 % M, acc.eq(partial)).Else(acc.eq(acc + partial)),
+                If(phase == 2 % M, sum_full.eq(acc + partial)),
+                self.o_valid.eq(phase == 2 % M)
+                ]
+
+        # rescale from full product format to accumulator format
+        sum_accu = Signal((p['QA']['W'], True))
+        self.comb += sum_accu.eq(requant(self, sum_full, QP, p['QA']))
+
+        # rescale from accumulator format to output width
+        self.comb += self.o.eq(requant(self, sum_accu, p['QA'], p['QO']))
+
+        # signals of the stages, e.g. for verifying the NumPy model
+        self.stages = {'QP':sum_full, 'QA':sum_accu, 'QO':self.o}
+
+###############################################################################
+class FIR_Interp(Module):
+    """
+    Polyphase FIR interpolator by `p['L']`: The input is sampled every L clock
+    cycles (strobe `i_ready`) into a register chain, in each clock cycle one
+    polyphase component of the coefficients is multiplied with the registers
+    and yields one output sample.
+    """
+    def __init__(self):
+        p = fb.fil[0]['fxqc']
+        L = max(int(p['L']), 1)
+
+        # ------------- Define I/Os -------------------------------------------
+        self.i = Signal((p['QI']['W'], True)) # input signal
+        self.o = Signal((p['QO']['W'], True)) # output signal
+        self.i_ready = Signal()                # input sample is taken
+
+        ###
+        QP = fir_qp(p) # word format for sum of partial products b_i * x_i
+        b = [int(c) for c in p['b']]
+        N_i = poly_mults(b, L)
+
+        phase = Signal(max=L) if L > 1 else None # phase counter
+        sregs = [Signal((p['QI']['W'], True)) for _ in range(N_i)]
+        shift = [sregs[0].eq(self.i)] + [sregs[k].eq(sregs[k-1]) for k in range(1, N_i)]
+        if L == 1:
+            self.sync += shift
+            self.comb += self.i_ready.eq(1)
+        else:
+            self.sync += If(phase == L - 1, phase.eq(0)).Else(phase.eq(phase + 1))
+            self.sync += If(phase == 1 % L, *shift)
+            self.comb += self.i_ready.eq(phase == 1 % L)
+
+        # output phase (phase - 2) % L is calculated from x[m - i]
+        muls = [_coeff_mux(self, b, i, L, phase, (1, -2)) * sregs[i] for i in range(N_i)]
+
+        sum_full = Signal((QP['W'], True))
+        self.sync += sum_full.eq(adder_tree(self, muls, QP['W']))
+
+        # rescale from full product format to accumulator format
+        sum_accu = Signal((p['QA']['W'], True))
+        self.comb += sum_accu.eq(requant(self, sum_full, QP, p['QA']))
+
+        # rescale from accumulator format to output width
+        self.comb += self.o.eq(requant(self, sum_accu, p['QA'], p['QO']))
+
+        # signals of the stages, e.g. for verifying the NumPy model
+        self.stages = {'QP':sum_full, 'QA':sum_accu, 'QO':self.o}
+
+#------------------------------------------------------------------------------
+def _poly_stages(p, acc):
+    """
+    Wrap the polyphase sum `acc` to the full precision format and requantize
+    it to the accumulator and the output format, return a dict with the
+    signals of the stages
+    """
+    QP = fir_qp(p)
+    sum_full = wrap_np(acc, QP['W'])
+    sum_accu = requant_np(sum_full, QP, p['QA'])
+    return {'QP':sum_full, 'QA':sum_accu, 'QO':requant_np(sum_accu, p['QA'], p['QO'])}
+
+def _poly_init(p, stimulus):
+    """
+    Return the wrapped stimulus, the integer coefficients and the dtype for
+    the calculation of the polyphase models
+    """
+    if fir_qp(p)['W'] <= 64:
+        dtype = np.int64
+    else: # use python integers, int64 arithmetics could overflow
+        dtype = object
+    x = wrap_np(np.asarray(stimulus, dtype=np.int64).astype(dtype), p['QI']['W'])
+    b = np.array([int(c) for c in p['b']], dtype=dtype)
+    return x, b, dtype
+
+#------------------------------------------------------------------------------
+def decim_np(p, stimulus, stages=False):
+    """
+    Bit-exact NumPy model of the migen module :class:`FIR_Decim`: Only the
+    output samples `y[m * M]` of the FIR filter are calculated as the sum of
+    the M polyphase components `b[j::M]` convolved with the input samples
+    `x[m * M - j]`, i.e. each convolution runs at the low rate.
+
+    Parameters
+    ----------
+    p: dict
+        `fxqc` dict with the quantization settings, the integer coefficients
+        `p['b']` and the decimation factor `p['M']`
+
+    stimulus: array-like of integers
+        input signal in integer format
+
+    stages: bool
+        When True, return the signals of all stages instead of the output only
+
+    Returns
+    -------
+    ndarray of integers
+        the output samples of the migen simulation with
+        :meth:`FIR_Decim_wdg.run_sim` (one sample every M input samples,
+        including the latency) or a dict with the signals of the stages 'QP',
+        'QA' and 'QO' when `stages == True`.
+    """
+    M = max(int(p['M']), 1)
+    x, b, dtype = _poly_init(p, stimulus)
+    N = len(x)
+    N_d = -(-N // M) # number of output samples y[m * M] with m * M < N
+    xp = np.concatenate((np.zeros(M - 1, dtype=dtype), x, np.zeros(M, dtype=dtype)))
+    acc = np.zeros(N_d, dtype=dtype)
+    for j in range(min(M, len(b))):
+        x_j = xp[M - 1 - j::M][:N_d] # x[m * M - j]
+        acc += np.convolve(x_j, b[j::M])[:N_d]
+
+    # the migen output is valid every M cycles, starting at cycle FIR_LATENCY % M
+    N_o = len(range(FIR_LATENCY % M, N, M))
+    N_z = FIR_LATENCY // M # outputs before the first valid sample
+    responses = {}
+    for k, s in _poly_stages(p, acc).items():
+        responses[k] = np.concatenate((np.zeros(N_z, dtype=dtype), s))[:N_o]
+
+    if stages:
+        return responses
+    else:
+        return responses['QO']
+
+#------------------------------------------------------------------------------
+def interp_np(p, stimulus, stages=False):
+    """
+    Bit-exact NumPy model of the migen module :class:`FIR_Interp`: The output
+    samples `y[m * L + j]` of the FIR filter for the upsampled input are
+    calculated by convolving the input with the L polyphase components
+    `b[j::L]`, i.e. without products with the inserted zeros.
+
+    Parameters
+    ----------
+    p: dict
+        `fxqc` dict with the quantization settings, the integer coefficients
+        `p['b']` and the interpolation factor `p['L']`
+
+    stimulus: array-like of integers
+        input signal in integer format
+
+    stages: bool
+        When True, return the signals of all stages instead of the output only
+
+    Returns
+    -------
+    ndarray of integers
+        the output samples of the migen simulation with
+        :meth:`FIR_Interp_wdg.run_sim` (L samples per input sample, including
+        the latency) or a dict with the signals of the stages 'QP', 'QA' and
+        'QO' when `stages == True`.
+    """
+    L = max(int(p['L']), 1)
+    x, b, dtype = _poly_init(p, stimulus)
+    N = len(x)
+    acc = np.zeros((N, L), dtype=dtype)
+    for j in range(min(L, len(b))):
+        acc[:, j] = np.convolve(x, b[j::L])[:N]
+    acc = acc.ravel()
+
+    responses = {}
+    for k, s in _poly_stages(p, acc).items():
+        responses[k] = np.zeros(N * L, dtype=dtype)
+        responses[k][FIR_LATENCY:] = s[:max(N * L - FIR_LATENCY, 0)]
+
+    if stages:
+        return responses
+    else:
+        return responses['QO']
+
+###############################################################################
+class FIR_Decim_wdg(FIR_DF_wdg):
+    """
+    Widget for entering word formats & quantization and the decimation factor
+    of a polyphase FIR decimator, also instantiates fixpoint filter class
+    :class:`FIR_Decim`.
+    """
+    key = 'M' # key of the rate change factor in the fxqc dict
+    label = "Decimation <i>M</i>:"
+
+    def __init__(self, parent):
+        fb.fil[0]['fxqc'].setdefault(self.key, 2)
+        self.lbl_mults = None
+        super(FIR_Decim_wdg, self).__init__(parent)
+
+        self.title = ("<b>Polyphase FIR Decimator</b><br />"
+                      "Calculates every M-th output sample with shared multipliers.")
+        self.img_name = ""
+        # no pipelined adder tree
+        for w in (self.lbl_pipe, self.spn_pipe, self.lbl_pipe_info):
+            w.setVisible(False)
+
+        lbl_rate = QLabel(self.label, self)
+        self.spn_rate = QSpinBox(self)
+        self.spn_rate.setRange(1, 256)
+        self.spn_rate.setValue(int(fb.fil[0]['fxqc'][self.key]))
+        self.spn_rate.setToolTip("<span>Rate change factor of the filter.</span>")
+        self.lbl_mults = QLabel("", self)
+        self.lbl_mults.setToolTip("<span>Number of multipliers compared to the "
+                                  "direct form FIR filter.</span>")
+        layHRate = QHBoxLayout()
+        layHRate.addWidget(lbl_rate)
+        layHRate.addWidget(self.spn_rate)
+        layHRate.addWidget(self.lbl_mults)
+        layHRate.addStretch()
+        self.layout().insertLayout(self.layout().count() - 1, layHRate)
+        self._update_mults()
+
+        self.spn_rate.valueChanged.connect(self._set_rate)
+
+#------------------------------------------------------------------------------
+    def _set_rate(self, R):
+        """
+        Store the rate change factor selected in the spin box in the fxqc dict
+        """
+        fb.fil[0]['fxqc'][self.key] = R
+        self._update_mults()
+        self.sig_tx.emit({'sender':__name__, 'ui':'rate', 'id':'rate'})
+
+#------------------------------------------------------------------------------
+    def _update_mults(self):
+        """
+        Update the label with the number of multipliers
+        """
+        if self.lbl_mults is None: # called during initialization of the parent
+            return
+        p = fb.fil[0]['fxqc']
+        self.lbl_mults.setText("Multipliers: {0} (Direct Form: {1})".format(
+            poly_mults(p['b'], p[self.key]), len(p['b'])))
+
+#------------------------------------------------------------------------------
+    def adder_inputs(self, p=None):
+        """
+        Return 1 as the adder tree is not pipelined
+        """
+        return 1
+
+#------------------------------------------------------------------------------
+    def rate(self):
+        """
+        Return the interpolation and the decimation factor `(L, M)` of the
+        filter, the output rate is `L / M` times the input rate
+        """
+        return (1, int(fb.fil[0]['fxqc']['M']))
+
+#------------------------------------------------------------------------------
+    def dict2ui(self):
+        """
+        Update the UI from the fixpoint dict, see
+        :meth:`pyfda.fixpoint_widgets.fir_df.FIR_DF_wdg.dict2ui`
+        """
+        super(FIR_Decim_wdg, self).dict2ui()
+        if self.lbl_mults is not None:
+            self.spn_rate.blockSignals(True)
+            self.spn_rate.setValue(int(fb.fil[0]['fxqc'][self.key]))
+            self.spn_rate.blockSignals(False)
+        self._update_mults()
+
+#------------------------------------------------------------------------------
+    def ui2dict(self):
+        """
+        Read out the subwidgets, see
+        :meth:`pyfda.fixpoint_widgets.fir_df.FIR_DF_wdg.ui2dict`, and add the
+        rate change factor
+        """
+        fxqc_dict = super(FIR_Decim_wdg, self).ui2dict()
+        fxqc_dict.update({self.key:self.spn_rate.value()})
+        return fxqc_dict
+
+#------------------------------------------------------------------------------
+    def construct_fixp_filter(self):
+        """
+        Construct an instance of the fixpoint filter object using the settings from
+        the 'fxqc' quantizer dict
+        """
+        p = fb.fil[0]['fxqc']
+        if not all(np.isfinite(p['b'])):
+            logger.error("Coefficients contain non-finite values!")
+            return
+        if any(np.iscomplex(p['b'])):
+            logger.error("Coefficients contain complex values!")
+            return
+
+        self.fixp_filter = fx_cache.get_module(fx_hash('FIR_Decim', p), FIR_Decim)
+
+#------------------------------------------------------------------------------
+    def to_verilog(self, **kwargs):
+        """
+        Convert the migen description to Verilog, the code is cached for
+        identical settings and conversion options `kwargs`
+        """
+        return fx_cache.get_verilog(fx_hash('FIR_Decim', fb.fil[0]['fxqc'], kwargs),
+            lambda: verilog.convert(self.fixp_filter,
+                                    ios={self.fixp_filter.i, self.fixp_filter.o,
+                                         self.fixp_filter.o_valid},
+                                    **kwargs))
+
+#------------------------------------------------------------------------------
+    def run_sim(self, stimulus, stages=False, progress=None, p=None):
+        """
+        Run the migen simulation, see
+        :meth:`pyfda.fixpoint_widgets.fir_df.FIR_DF_wdg.run_sim`, and return
+        the valid output samples (every M-th sample, starting at the latency
+        `FIR_LATENCY % M`)
+
+        The rate is read from the fixpoint dict `p` (default: `fb.fil[0]['fxqc']`).
+        """
+        p = fb.fil[0]['fxqc'] if p is None else p
+        M = max(int(p['M']), 1)
+        n0 = FIR_LATENCY % M
+        if progress is not None:
+            progress_full = progress
+            outputs_M = [] # valid outputs, only the new ones are appended per call
+            def progress(n, outputs):
+                outputs_M.extend(outputs[n0 + len(outputs_M) * M::M])
+                return progress_full(n, outputs_M)
+        results = super(FIR_Decim_wdg, self).run_sim(stimulus, stages, progress)
+        if stages:
+            return {k:v[n0::M] for k, v in results.items()}
+        else:
+            return results[n0::M]
+
+#------------------------------------------------------------------------------
+    def run_sim_np(self, stimulus, stages=False, p=None):
+        """
+        Calculate the fixpoint response with the bit-exact NumPy model
+        :func:`decim_np` instead of the migen simulation.
+
+        `p` is the fixpoint dict, `fb.fil[0]['fxqc']` by default. Pass a copy to
+        run the model in a different thread while the UI can still be edited.
+        """
+        p = fb.fil[0]['fxqc'] if p is None else p
+        return decim_np(p, stimulus, stages=stages)
+
+    # word length optimization and windowed verification are based on the
+    # single rate model, they are not supported for multirate filters
+    optimize_fxqc = None
+    settling_time = None
+
+###############################################################################
+class FIR_Interp_wdg(FIR_Decim_wdg):
+    """
+    Widget for entering word formats & quantization and the interpolation
+    factor of a polyphase FIR interpolator, also instantiates fixpoint filter
+    class :class:`FIR_Interp`.
+    """
+    key = 'L' # key of the rate change factor in the fxqc dict
+    label = "Interpolation <i>L</i>:"
+
+    def __init__(self, parent):
+        super(FIR_Interp_wdg, self).__init__(parent)
+
+        self.title = ("<b>Polyphase FIR Interpolator</b><br />"
+                      "Filters the upsampled signal without multiplying zeros.")
+
+#------------------------------------------------------------------------------
+    def rate(self):
+        """
+        Return the interpolation and the decimation factor `(L, M)` of the
+        filter, the output rate is `L / M` times the input rate
+        """
+        return (int(fb.fil[0]['fxqc']['L']), 1)
+
+#------------------------------------------------------------------------------
+    def construct_fixp_filter(self):
+        """
+        Construct an instance of the fixpoint filter object using the settings from
+        the 'fxqc' quantizer dict
+        """
+        p = fb.fil[0]['fxqc']
+        if not all(np.isfinite(p['b'])):
+            logger.error("Coefficients contain non-finite values!")
+            return
+        if any(np.iscomplex(p['b'])):
+            logger.error("Coefficients contain complex values!")
+            return
+
+        self.fixp_filter = fx_cache.get_module(fx_hash('FIR_Interp', p), FIR_Interp)
+
+#------------------------------------------------------------------------------
+    def to_verilog(self, **kwargs):
+        """
+        Convert the migen description to Verilog, the code is cached for
+        identical settings and conversion options `kwargs`
+        """
+        return fx_cache.get_verilog(fx_hash('FIR_Interp', fb.fil[0]['fxqc'], kwargs),
+            lambda: verilog.convert(self.fixp_filter,
+                                    ios={self.fixp_filter.i, self.fixp_filter.o,
+                                         self.fixp_filter.i_ready},
+                                    **kwargs))
+
+#------------------------------------------------------------------------------
+    def run_sim(self, stimulus, stages=False, progress=None, p=None):
+        """
+        Run the migen simulation, see
+        :meth:`pyfda.fixpoint_widgets.fir_df.FIR_DF_wdg.run_sim`, with each
+        stimulus sample held for L clock cycles. One output sample is returned
+        per clock cycle.
+
+        The rate is read from the fixpoint dict `p` (default: `fb.fil[0]['fxqc']`).
+        """
+        p = fb.fil[0]['fxqc'] if p is None else p
+        L = max(int(p['L']), 1)
+        if progress is not None:
+            progress_full = progress
+            progress = lambda n, outputs: progress_full(n // L, outputs)
+        return FIR_DF_wdg.run_sim(self, np.repeat(stimulus, L), stages, progress)
+
+#------------------------------------------------------------------------------
+    def run_sim_np(self, stimulus, stages=False, p=None):
+        """
+        Calculate the fixpoint response with the bit-exact NumPy model
+        :func:`interp_np` instead of the migen simulation.
+
+        `p` is the fixpoint dict, `fb.fil[0]['fxqc']` by default. Pass a copy to
+        run the model in a different thread while the UI can still be edited.
+        """
+        p = fb.fil[0]['fxqc'] if p is None else p
+        return interp_np(p, stimulus, stages=stages)
+
+#------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    from pyfda.libs.compat import QApplication
+    app = QApplication(sys.argv)
+    mainw = FIR_Decim_wdg(None)
+    mainw.show()
+
+    app.exec_()
+
+    # test using "python -m pyfda.fixpoint_widgets.fir_poly"
@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the pyFDA project hosted at https://github.com/chipmuenk/pyfda
+#
+# Copyright © pyFDA Project Contributors
+# Licensed under the terms of the MIT License
+# (see file LICENSE in root directory for details)
+
+"""
+Widgets for specifying the parameters of FIR filters that exploit symmetric
+coefficients of linear-phase filters: a folded direct form with pre-adders and
+a transposed direct form with shared products.
+
+Both structures perform the same integer arithmetics as the direct form
+:class:`pyfda.fixpoint_widgets.fir_df.FIR` (products in full precision, sum
+wrapped to the full precision format), they only differ in the number of
+multipliers and the latency. Hence, the NumPy model :func:`fir_np` is
+bit-exact for them as well.
+"""
+import sys
+import logging
+logger = logging.getLogger(__name__)
+
+import numpy as np
+import pyfda.filterbroker as fb
+
+from pyfda.libs.compat import QLabel
+
+from .fixpoint_helpers import requant, fx_hash, fx_cache, adder_tree
+from .fir_df import FIR_DF_wdg, fir_qp, fir_pipe
+
+from migen import Signal, Module
+from migen.fhdl import verilog
+
+classes = {'FIR_Sym_wdg':'FIR_Sym', 'FIR_TF_wdg':'FIR_TF'} #: Dict containing widget class name : display name
+
+#------------------------------------------------------------------------------
+def fir_symmetry(b):
+    """
+    Return 1 for symmetric coefficients `b` (even symmetry, type I and II
+    linear-phase filters), -1 for antisymmetric coefficients (odd symmetry,
+    type III and IV) and 0 otherwise.
+    """
+    b = [int(c) for c in b]
+    if b == b[::-1]:
+        return 1
+    elif b == [-c for c in b[::-1]]:
+        return -1
+    else:
+        return 0
+
+#------------------------------------------------------------------------------
+def fir_sym_mults(b):
+    """
+    Return the number of multipliers of the folded structure :class:`FIR_Sym`,
+    i.e. the number of products summed by the adder tree. The center tap of
+    odd-length antisymmetric coefficients is always zero and needs no multiplier.
+    """
+    sym = fir_symmetry(b)
+    if sym == 0:
+        return len(b)
+    elif sym < 0:
+        return len(b) // 2
+    return (len(b) + 1) // 2
+
+#------------------------------------------------------------------------------
+def fir_tf_mults(b):
+    """
+    Return the number of multipliers of the transposed structure :class:`FIR_TF`,
+    i.e. the number of distinct non-zero coefficient magnitudes
+    """
+    return len({abs(int(c)) for c in b} - {0})
+
+###############################################################################
+class FIR_Sym(Module):
+    """
+    Folded direct form FIR filter: Pairs of registers with the same (or
+    negated) coefficient are added (subtracted) by a pre-adder before the
+    multiplication. For coefficients without symmetry, each tap gets its own
+    multiplier like :class:`pyfda.fixpoint_widgets.fir_df.FIR`.
+    """
+    def __init__(self):
+        p = fb.fil[0]['fxqc']
+
+        # ------------- Define I/Os -------------------------------------------
+        self.i = Signal((p['QI']['W'], True)) # input signal
+        self.o = Signal((p['QO']['W'], True)) # output signal
+
+        ###
+        QP = fir_qp(p) # word format for sum of partial products b_i * x_i
+        b = [int(c) for c in p['b']]
+        N = len(b)
+        sym = fir_symmetry(b)
+
+        sregs = [] # chain of registers with input word length
+        src = self.i
+        for _ in b:
+            sreg = Signal((p['QI']['W'], True))
+            self.sync += sreg.eq(src)
+            src = sreg
+            sregs.append(sreg)
+
+        if sym == 0:
+            muls = [b[k] * sregs[k] for k in range(N)]
+        else:
+            # pre-adders (symmetric) or pre-subtractors (antisymmetric)
+            muls = [b[k] * (sregs[k] + sregs[N-1-k] if sym > 0 else sregs[k] - sregs[N-1-k])
+                    for k in range(N // 2)]
+            if N % 2 and sym > 0: # center tap, it is zero for antisymmetric coefficients
+                muls.append(b[N // 2] * sregs[N // 2])
+        logger.debug("{0} multipliers for {1} coefficients".format(len(muls), N))
+
+        sum_full = Signal((QP['W'], True))
+        self.sync += sum_full.eq(adder_tree(self, muls, QP['W'], fir_pipe(p, len(muls))))
+
+        # rescale from full product format to accumulator format
+        sum_accu = Signal((p['QA']['W'], True))
+        self.comb += sum_accu.eq(requant(self, sum_full, QP, p['QA']))
+
+        # rescale from accumulator format to output width
+        self.comb += self.o.eq(requant(self, sum_accu, p['QA'], p['QO']))
+
+        # signals of the stages, e.g. for verifying the NumPy model
+        self.stages = {'QP':sum_full, 'QA':sum_accu, 'QO':self.o}
+
+###############################################################################
+class FIR_TF(Module):
+    """
+    Transposed direct form FIR filter: The registered input is multiplied with
+    all coefficients, the products are added to a chain of registers holding
+    the partial sums. Products with the same coefficient magnitude are only
+    calculated once, for symmetric coefficients this halves the number of
+    multipliers. The critical path only consists of one multiplier and one adder.
+    """
+    def __init__(self):
+        p = fb.fil[0]['fxqc']
+
+        # ------------- Define I/Os -------------------------------------------
+        self.i = Signal((p['QI']['W'], True)) # input signal
+        self.o = Signal((p['QO']['W'], True)) # output signal
+
+        ###
+        QP = fir_qp(p) # word format for sum of partial products b_i * x_i
+        b = [int(c) for c in p['b']]
+
+        x_reg = Signal((p['QI']['W'], True)) # input register
+        self.sync += x_reg.eq(self.i)
+
+        prods = {c:c * x_reg for c in {abs(c) for c in b} - {0}} # shared products
+
+        # chain of partial sums, starting with the last coefficient. Partial sums
+        # wrap at the full precision word length like the final sum.
+        s = None
+        for c in reversed(b):
+            if c == 0:
+                expr = 0 if s is None else s
+            elif s is None:
+                expr = prods[abs(c)] if c > 0 else -prods[abs(c)]
+            else:
+                expr = s + prods[abs(c)] if c > 0 else s - prods[abs(c)]
+            s_reg = Signal((QP['W'], True))
+            self.sync += s_reg.eq(expr)
+            s = s_reg
+        sum_full = s
+
+        # rescale from full product format to accumulator format
+        sum_accu = Signal((p['QA']['W'], True))
+        self.comb += sum_accu.eq(requant(self, sum_full, QP, p['QA']))
+
+        # rescale from accumulator format to output width
+        self.comb += self.o.eq(requant(self, sum_accu, p['QA'], p['QO']))
+
+        # signals of the stages, e.g. for verifying the NumPy model
+        self.stages = {'QP':sum_full, 'QA':sum_accu, 'QO':self.o}
+
+###############################################################################
+class FIR_Sym_wdg(FIR_DF_wdg):
+    """
+    Widget for entering word formats & quantization of a folded FIR filter with
+    pre-adders, also instantiates fixpoint filter class :class:`FIR_Sym`.
+    """
+    def __init__(self, parent):
+        self.lbl_mults = None
+        super(FIR_Sym_wdg, self).__init__(parent)
+
+        self.title = ("<b>Folded Symmetric FIR Filter</b><br />"
+                      "Direct form with pre-adders for linear-phase filters.")
+        self.img_name = ""
+
+        self.lbl_mults = QLabel("", self)
+        self.lbl_mults.setToolTip("<span>Number of multipliers compared to the "
+                                  "direct form FIR filter.</span>")
+        self.layout().insertWidget(self.layout().count() - 1, self.lbl_mults)
+        self._update_mults()
+
+#------------------------------------------------------------------------------
+    def count_mults(self, p=None):
+        """
+        Return the number of multipliers for the coefficients of the fixpoint
+        dict `p` (default: `fb.fil[0]['fxqc']`)
+        """
+        p = fb.fil[0]['fxqc'] if p is None else p
+        return fir_sym_mults(p['b'])
+
+#------------------------------------------------------------------------------
+    def adder_inputs(self, p=None):
+        """
+        Return the number of inputs of the adder tree (the number of products)
+        for the coefficients of the fixpoint dict `p` (default: `fb.fil[0]['fxqc']`)
+        """
+        return self.count_mults(p)
+
+#------------------------------------------------------------------------------
+    def _update_mults(self):
+        """
+        Update the label with the number of multipliers
+        """
+        if self.lbl_mults is None: # called during initialization of the parent
+            return
+        b = fb.fil[0]['fxqc']['b']
+        self.lbl_mults.setText("Multipliers: {0} (Direct Form: {1}){2}".format(
+            self.count_mults(), len(b), "" if fir_symmetry(b) else ", no symmetry!"))
+
+#------------------------------------------------------------------------------
+    def dict2ui(self):
+        """
+        Update the UI from the fixpoint dict, see
+        :meth:`pyfda.fixpoint_widgets.fir_df.FIR_DF_wdg.dict2ui`
+        """
+        super(FIR_Sym_wdg, self).dict2ui()
+        self._update_mults()
+
+#------------------------------------------------------------------------------
+    def construct_fixp_filter(self):
+        """
+        Construct an instance of the fixpoint filter object using the settings from
+        the 'fxqc' quantizer dict
+        """
+        p = fb.fil[0]['fxqc']
+        if not all(np.isfinite(p['b'])):
+            logger.error("Coefficients contain non-finite values!")
+            return
+        if any(np.iscomplex(p['b'])):
+            logger.error("Coefficients contain complex values!")
+            return
+        if fir_symmetry(p['b']) == 0:
+            logger.warning("Coefficients are not symmetric, using one multiplier per tap.")
+
+        self.fixp_filter = fx_cache.get_module(fx_hash('FIR_Sym', p), FIR_Sym)
+
+#------------------------------------------------------------------------------
+    def to_verilog(self, **kwargs):
+        """
+        Convert the migen description to Verilog, the code is cached for
+        identical settings and conversion options `kwargs`
+        """
+        return fx_cache.get_verilog(fx_hash('FIR_Sym', fb.fil[0]['fxqc'], kwargs),
+            lambda: verilog.convert(self.fixp_filter,
+                                    ios={self.fixp_filter.i, self.fixp_filter.o},
+                                    **kwargs))
+
+###############################################################################
+class FIR_TF_wdg(FIR_Sym_wdg):
+    """
+    Widget for entering word formats & quantization of a transposed FIR filter
+    with shared products, also instantiates fixpoint filter class :class:`FIR_TF`.
+    """
+    def __init__(self, parent):
+        super(FIR_TF_wdg, self).__init__(parent)
+
+        self.title = ("<b>Transposed FIR Filter</b><br />"
+                      "Transposed direct form with shared products.")
+        # no adder tree, the latency is independent of the number of taps
+        for w in (self.lbl_pipe, self.spn_pipe, self.lbl_pipe_info):
+            w.setVisible(False)
+
+#------------------------------------------------------------------------------
+    def count_mults(self, p=None):
+        """
+        Return the number of multipliers for the coefficients of the fixpoint
+        dict `p` (default: `fb.fil[0]['fxqc']`)
+        """
+        p = fb.fil[0]['fxqc'] if p is None else p
+        return fir_tf_mults(p['b'])
+
+#------------------------------------------------------------------------------
+    def adder_inputs(self, p=None):
+        """
+        Return 1 as there is no adder tree and hence no pipelining
+        """
+        return 1
+
+#------------------------------------------------------------------------------
+    def construct_fixp_filter(self):
+        """
+        Construct an instance of the fixpoint filter object using the settings from
+        the 'fxqc' quantizer dict
+        """
+        p = fb.fil[0]['fxqc']
+        if not all(np.isfinite(p['b'])):
+            logger.error("Coefficients contain non-finite values!")
+            return
+        if any(np.iscomplex(p['b'])):
+            logger.error("Coefficients contain complex values!")
+            return
+
+        self.fixp_filter = fx_cache.get_module(fx_hash('FIR_TF', p), FIR_TF)
+
+#------------------------------------------------------------------------------
+    def to_verilog(self, **kwargs):
+        """
+        Convert the migen description to Verilog, the code is cached for
+        identical settings and conversion options `kwargs`
+        """
+        return fx_cache.get_verilog(fx_hash('FIR_TF', fb.fil[0]['fxqc'], kwargs),
+            lambda: verilog.convert(self.fixp_filter,
+                                    ios={self.fixp_filter.i, self.fixp_filter.o},
+                                    **kwargs))
+
+#------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    from pyfda.libs.compat import QApplication
+    app = QApplication(sys.argv)
+    mainw = FIR_Sym_wdg(None)
+    mainw.show()
+
+    app.exec_()
+
+    # test using "python -m pyfda.fixpoint_widgets.fir_sym"
@@ -9,12 +9,17 @@
 """
 Helper classes and functions for generating and simulating fixpoint filters
 """
-import sys
+import sys, os, io
+import json
+import hashlib
+from collections import OrderedDict
 import logging
 logger = logging.getLogger(__name__)
-#import numpy as np
+import numpy as np
 import pyfda.filterbroker as fb
 import pyfda.libs.pyfda_fix_lib as fx
+import pyfda.libs.pyfda_dirs as dirs
+from pyfda.version import __version__
 
 from pyfda.libs.compat import (QWidget, QLabel, QLineEdit, QComboBox, QPushButton, QIcon,
                       QVBoxLayout, QHBoxLayout, QFrame,
@@ -176,6 +181,266 @@ def requant(mod, sig_i, QI, QO):
 
     return sig_o
 
+#------------------------------------------------------------------------------
+def adder_levels(N):
+    """
+    Return the number of adder levels of a binary adder tree with `N` inputs
+    """
+    return int(np.ceil(np.log2(max(N, 1))))
+
+#------------------------------------------------------------------------------
+def adder_tree(mod, terms, W, N_pipe=0):
+    """
+    Sum the migen expressions `terms` with a balanced binary adder tree and
+    return the (combinatorial) sum.
+
+    `N_pipe` register stages are distributed evenly over the adder levels to
+    reduce the logic depth, each stage adds one cycle of latency. Registered
+    partial sums are signed `W` bit signals, i.e. they wrap at the word length
+    of the final result which doesn't change the result modulo `2**W`.
+
+    Parameters
+    ----------
+    mod: Module (migen)
+        instance of migen module, the registers are added to its sync domain
+
+    terms: list
+        migen expressions (at least one) to be summed
+
+    W: int
+        word length of the registered partial sums
+
+    N_pipe: int
+        number of pipeline register stages, this needs to be less than
+        ``adder_levels(len(terms))``
+
+    Returns
+    -------
+    migen expression
+        sum of all terms
+    """
+    levels = adder_levels(len(terms))
+    reg_levels = {(k * levels) // (N_pipe + 1) for k in range(1, N_pipe + 1)}
+    level = 0
+    while len(terms) > 1:
+        level += 1
+        sums = [terms[k] + terms[k+1] for k in range(0, len(terms) - 1, 2)]
+        if len(terms) % 2:
+            sums.append(terms[-1]) # odd number of terms, pass on the last one
+        if level in reg_levels:
+            regs = [Signal((W, True)) for _ in sums]
+            mod.sync += [r.eq(s) for r, s in zip(regs, sums)]
+            sums = regs
+        terms = sums
+    return terms[0]
+
+#------------------------------------------------------------------------------
+def wrap_np(x, W):
+    """
+    Wrap the integer (array) `x` to the range of a signed `W` bit word, i.e.
+    keep the `W` LSBs and interpret them as a two's complement number, like
+    assigning `x` to a migen `Signal((W, True))`.
+    """
+    if W >= 64 and np.result_type(x) != object:
+        return x # int64 arithmetics already wraps at 64 bits
+    offset = 1 << (W - 1)
+    return ((x + offset) & ((1 << W) - 1)) - offset
+
+#------------------------------------------------------------------------------
+def requant_np(x, QI, QO):
+    """
+    Bit-exact NumPy model of :func:`requant`: Change the word length of the
+    integer (array) `x` from the format `QI` to the format `QO`, using the
+    quantization and saturation methods specified by ``QO['quant']`` and
+    ``QO['ovfl']`` in the same way as the migen implementation.
+
+    This deviates from the quantization of :class:`pyfda.libs.pyfda_fix_lib.Fixed`
+    in some cases, e.g. 'fix' adds the sign bit as LSB before truncation and
+    left-shifting the input is done in an intermediate word that may wrap.
+
+    Parameters
+    ----------
+
+    x: integer or array-like of integers
+        Input value(s) in integer representation, the result has the same shape.
+        Use `dtype=object` (python integers) for word lengths > 63 bits.
+
+    QI: dict
+        Quantization dict for input word, only the keys 'WI' and 'WF' are evaluated.
+
+    QO: dict
+        Quantization dict for output word format; the keys 'WI', 'WF', 'quant'
+        and 'ovfl' are evaluated.
+
+    Returns
+    -------
+
+    ndarray of integers
+        Requantized value(s) in the range of a signed `WO` bit word.
+    """
+    x = np.asarray(x)
+    WI = QI['WI'] + QI['WF'] + 1  # total word length (input signal)
+    WO = QO['WI'] + QO['WF'] + 1  # total word length (output signal)
+
+    dWF = QI['WF'] - QO['WF']     # difference of fractional lengths
+    dWI = QI['WI'] - QO['WI']     # difference of integer lengths
+
+    if dWF <= 0: # Extend fractional word length by shifting left by -dWF
+        x_q = x << -dWF
+    elif QO['quant'] == 'round': # add half an LSB before right shift
+        x_q = (x + (1 << (dWF - 1))) >> dWF
+    elif QO['quant'] == 'floor': # just shift right
+        x_q = x >> dWF
+    elif QO['quant'] == 'fix': # add sign bit as LSB before right shift
+        x_q = (x + (x < 0).astype(x.dtype) * (1 << dWF)) >> dWF
+    else:
+        raise Exception(u'Unknown quantization method "%s"!'%(QO['quant']))
+    x_q = wrap_np(x_q, max(WI, WO)) # intermediate signal
+
+    if dWI <= 0 or QO['ovfl'] == 'wrap': # sign extension or wrap around
+        return wrap_np(x_q, WO)
+    elif QO['ovfl'] == 'sat':
+        MIN_o = - 1 << (WO - 1)
+        return np.clip(x_q, MIN_o, -MIN_o - 1)
+    else:
+        raise Exception(u'Unknown overflow method "%s"!'%(QO['ovfl']))
+
+#------------------------------------------------------------------------------
+def fx_hash(*args):
+    """
+    Return a hex digest identifying a fixpoint filter, calculated from `args`,
+    e.g. the name of the filter class, the `fxqc` dict with word formats and
+    integer coefficients and the options for Verilog conversion. All arguments
+    need to be JSON serializable, NumPy scalars and arrays are converted to
+    python types. Keys of dicts are sorted, making the digest independent of
+    the order of insertion.
+    """
+    def _np2py(obj):
+        if isinstance(obj, (np.generic, np.ndarray)):
+            return obj.tolist()
+        raise TypeError("Cannot hash object of type {0}".format(type(obj)))
+
+    code = json.dumps(args, sort_keys=True, default=_np2py)
+    return hashlib.sha1(code.encode('utf8')).hexdigest()
+
+#------------------------------------------------------------------------------
+def fx_generator_id():
+    """
+    Return a hex digest identifying the HDL generators, calculated from the
+    versions of pyfda and migen and the source code of the fixpoint widgets
+    (which also changes during development without a new version number).
+    """
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+        try:
+            v_migen = version('migen')
+        except PackageNotFoundError:
+            v_migen = None
+    except ImportError: # Python < 3.8
+        v_migen = None
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    h = hashlib.sha1(fx_hash(__version__, v_migen).encode('utf8'))
+    for f in sorted(os.listdir(src_dir)):
+        if f.endswith('.py'):
+            with open(os.path.join(src_dir, f), 'rb') as src:
+                h.update(src.read())
+    return h.hexdigest()
+
+#------------------------------------------------------------------------------
+class FX_Cache(object):
+    """
+    Content-addressed cache for elaborated fixpoint filter modules and the
+    generated Verilog code, using keys calculated by :func:`fx_hash`.
+
+    Verilog code is kept in memory and optionally on disk in `cache_dir`,
+    in the subdirectory `version` when it is not None: Keys only describe the
+    filter settings, code generated by other versions of the generators (see
+    :func:`fx_generator_id`) must not be returned. Modules are only kept in
+    memory. The `size` most recently used entries of each type are kept in
+    memory.
+
+    A migen module can only be simulated or converted once, a cached module
+    is only returned as long as it hasn't been used. Hence, every simulation
+    elaborates a new module, the module cache only saves the elaboration when
+    a module is constructed again before it has been used (e.g. for an HDL
+    export with the Verilog code found in the cache).
+    """
+    def __init__(self, cache_dir=None, size=16, version=None):
+        if cache_dir is not None and version is not None:
+            cache_dir = os.path.join(cache_dir, version)
+        self.cache_dir = cache_dir
+        self.size = size
+        self.modules = OrderedDict()
+        self.verilog = OrderedDict()
+        if cache_dir is not None and not os.path.isdir(cache_dir):
+            try:
+                os.makedirs(cache_dir)
+            except (IOError, OSError) as e:
+                logger.warning("Cannot create cache directory '{0}', using memory "
+                               "cache only:\n{1}".format(cache_dir, e))
+                self.cache_dir = None
+
+#------------------------------------------------------------------------------
+    def _store(self, cache, key, value):
+        """ Store `value` under `key`, removing the least recently used entry """
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.size:
+            cache.popitem(last=False)
+
+#------------------------------------------------------------------------------
+    def get_module(self, key, construct):
+        """
+        Return the module stored under `key` when it hasn't been simulated or
+        converted yet. Otherwise, construct a new module by calling
+        `construct()` and store it.
+        """
+        mod = self.modules.get(key)
+        if mod is None or mod.get_fragment_called:
+            mod = construct()
+            logger.debug("Elaborated module {0}".format(key))
+        self._store(self.modules, key, mod)
+        return mod
+
+#------------------------------------------------------------------------------
+    def get_verilog(self, key, convert):
+        """
+        Return the Verilog code stored under `key` in memory or on disk.
+        Otherwise, generate it by calling `convert()` and store it.
+        """
+        code = self.verilog.get(key)
+        file_name = None
+        if code is None and self.cache_dir is not None:
+            file_name = os.path.join(self.cache_dir, key + ".v")
+            if os.path.isfile(file_name):
+                try:
+                    with io.open(file_name, 'r', encoding="utf8") as f:
+                        code = f.read()
+                except (IOError, OSError) as e:
+                    logger.warning("Cannot read cache file '{0}':\n{1}".format(file_name, e))
+        if code is None:
+            code = str(convert())
+            if file_name is not None:
+                try:
+                    with io.open(file_name, 'w', encoding="utf8") as f:
+                        f.write(code)
+                except (IOError, OSError) as e:
+                    logger.warning("Cannot write cache file '{0}':\n{1}".format(file_name, e))
+        else:
+            logger.debug("Verilog code {0} found in cache".format(key))
+        self._store(self.verilog, key, code)
+        return code
+
+#------------------------------------------------------------------------------
+    def clear(self):
+        """ Clear the memory cache, files on disk are kept """
+        self.modules.clear()
+        self.verilog.clear()
+
+# global cache instance for all fixpoint widgets
+fx_cache = FX_Cache(os.path.join(dirs.CONF_DIR, 'fx_cache'), version=fx_generator_id())\
+    if params['fx_cache_disk'] else FX_Cache()
+
 #------------------------------------------------------------------------------
 class UI_W(QWidget):
     """
@@ -419,6 +684,7 @@ class UI_W(QWidget):
             logger.warning("No key 'WF' in dict!")
         
         self.W = self.WF + self.WI + 1
+        self.q_dict.update({'WI':self.WI, 'WF':self.WF, 'W':self.W})
 
 #------------------------------------------------------------------------------
 #        
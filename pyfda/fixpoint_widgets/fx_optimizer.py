@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the pyFDA project hosted at https://github.com/chipmuenk/pyfda
+#
+# Copyright © pyFDA Project Contributors
+# Licensed under the terms of the MIT License
+# (see file LICENSE in root directory for details)
+
+"""
+Word length optimization for the fixpoint FIR filters: Search the minimum
+word lengths of the coefficients (`QCB`), the accumulator (`QA`) and the output
+(`QO`) that meet the following targets:
+
+- stopband attenuation of the frequency response with quantized coefficients
+
+- signal-to-noise ratio (SNR) of the fixpoint output compared to the ideal
+  response with the quantized coefficients
+
+- no overflows in the accumulator and the output (guaranteed for arbitrary
+  input signals)
+
+Candidates are evaluated with the bit-exact NumPy model :func:`fir_np` which
+is valid for all FIR widgets. The evaluations of a search step are independent
+and are distributed over a process pool.
+"""
+import os
+import copy
+from concurrent.futures import ProcessPoolExecutor
+import logging
+logger = logging.getLogger(__name__)
+
+import numpy as np
+import pyfda.libs.pyfda_fix_lib as fx
+
+from .fixpoint_helpers import requant_np
+from .fir_df import fir_np, fir_qp
+
+#------------------------------------------------------------------------------
+def stop_bands(fil_dict):
+    """
+    Return a list of tuples `(F1, F2, A)` with the stop bands of the filter
+    specification `fil_dict` (frequencies normalized to f_S) and the
+    corresponding max. linear magnitude `A` for response types 'LP', 'HP',
+    'BP' and 'BS'. Other response types return an empty list.
+    """
+    rt = fil_dict['rt']
+    if rt == 'LP':
+        return [(fil_dict['F_SB'], 0.5, fil_dict['A_SB'])]
+    elif rt == 'HP':
+        return [(0., fil_dict['F_SB'], fil_dict['A_SB'])]
+    elif rt == 'BP':
+        return [(0., fil_dict['F_SB'], fil_dict['A_SB']),
+                (fil_dict['F_SB2'], 0.5, fil_dict['A_SB2'])]
+    elif rt == 'BS':
+        return [(fil_dict['F_SB'], fil_dict['F_SB2'], fil_dict['A_SB'])]
+    else:
+        return []
+
+#------------------------------------------------------------------------------
+def stopband_excess(b, bands, N_FFT=2048):
+    """
+    Return the max. excess (in dB) of the magnitude response of the FIR
+    filter with coefficients `b` over the limits of the stop `bands` as
+    returned by :func:`stop_bands`. Negative values mean that the specs are met
+    with some margin.
+    """
+    H = np.abs(np.fft.rfft(np.asarray(b, dtype=float), 2 * N_FFT))
+    F = np.linspace(0, 0.5, len(H))
+    excess = -np.inf
+    for F1, F2, A in bands:
+        H_sb = H[(F >= F1) & (F <= F2)]
+        if len(H_sb):
+            excess = max(excess, 20 * np.log10(max(np.max(H_sb), 1e-15) / A))
+    return excess
+
+#------------------------------------------------------------------------------
+def quant_coeffs(q_dict, coeffs):
+    """
+    Quantize the floating point coefficients `coeffs` with the settings of the
+    quantization dict `q_dict` and return them as a list of integers, like
+    :meth:`pyfda.fixpoint_widgets.fixpoint_helpers.UI_W.quant_coeffs`.
+    """
+    Q_coeff = fx.Fixed(dict(q_dict)) # Fixed() adds keys to the dict
+    Q_coeff.frmt = 'dec'
+    return [int(c) for c in np.rint(Q_coeff.float2frmt(np.asarray(coeffs, dtype=float))
+                                    * (1 << Q_coeff.WF))]
+
+#------------------------------------------------------------------------------
+def output_snr(p, x):
+    """
+    Return the SNR (in dB) of the response of the NumPy model for the `fxqc`
+    dict `p` and the integer stimulus `x`. The reference is the floating point
+    response with the quantized coefficients `p['b']`, i.e. only the noise of
+    the arithmetics (quantization and overflows) is regarded.
+    """
+    y = fir_np(p, x, latency=0).astype(float) * 2.**-p['QO']['WF']
+    ref = np.convolve(np.asarray(x, dtype=float) * 2.**-p['QI']['WF'],
+                      np.asarray(p['b'], dtype=float) * 2.**-p['QCB']['WF'])[:len(x)]
+    P_noise = np.sum((y - ref)**2)
+    if P_noise == 0:
+        return np.inf
+    return 10 * np.log10(np.sum(ref**2) / P_noise)
+
+#------------------------------------------------------------------------------
+def _min_WI(y_min, y_max, WF):
+    """
+    Return the min. number of integer bits for representing the integers
+    `y_min ... y_max` with `WF` fractional bits in two's complement format
+    """
+    return max(int(max(y_max, 0)).bit_length(), int(max(-y_min - 1, 0)).bit_length()) - WF
+
+def ovfl_free_WI(p):
+    """
+    Return the min. number of integer bits of the accumulator and the output
+    as a tuple `(WI_A, WI_O)` that avoid overflows for arbitrary input signals
+    with the settings in the `fxqc` dict `p`: The sum of products is bounded by
+    the sum of the coefficient magnitudes times the max. input magnitude,
+    the bounds are requantized like the signal.
+    """
+    x_max = (1 << (p['QI']['W'] - 1)) - 1
+    x_min = -x_max - 1
+    b = [int(c) for c in p['b']]
+    y = [sum(c * (x_max if c > 0 else x_min) for c in b), # max. sum of products
+         sum(c * (x_min if c > 0 else x_max) for c in b)] # min. sum of products
+    QP = fir_qp(p)
+    # requantize the bounds without overflows (python integers)
+    QA = dict(p['QA'], WI=QP['WI'] + 1, ovfl='wrap')
+    y_A = requant_np(np.array(y, dtype=object), QP, QA)
+    WI_A = max(_min_WI(y_A[1], y_A[0], QA['WF']), 0)
+    QO = dict(p['QO'], WI=QP['WI'] + 1, ovfl='wrap')
+    y_O = requant_np(y_A, QA, QO)
+    WI_O = max(_min_WI(y_O[1], y_O[0], QO['WF']), 0)
+    return WI_A, WI_O
+
+#------------------------------------------------------------------------------
+def _eval_excess(args):
+    """ Evaluate the stopband excess of the quantized coefficients for a pool """
+    q_dict, coeffs, bands = args
+    b = np.array(quant_coeffs(q_dict, coeffs), dtype=float) * 2.**-q_dict['WF']
+    return stopband_excess(b, bands)
+
+def _eval_snr(args):
+    """ Evaluate the SNR of a candidate `fxqc` dict for a pool """
+    p, x = args
+    return output_snr(p, x)
+
+def _set_W(q_dict, WI, WF):
+    """ Set integer, fractional and total word lengths of `q_dict` """
+    q_dict.update({'WI':int(WI), 'WF':int(WF), 'W':int(WI) + int(WF) + 1})
+
+#------------------------------------------------------------------------------
+def optimize_fxqc(p, coeffs, fil_dict=None, A_SB_loss=1., SNR=None, ovfl=True,
+                  WF_max=24, N=4096, n_jobs=None):
+    """
+    Search the minimum word lengths for the coefficients, the accumulator and
+    the output of a fixpoint FIR filter that meet the given targets. The input
+    format `p['QI']` and the quantization and overflow methods remain unchanged.
+
+    The search steps are
+
+    1. Coefficients: min. number of fractional bits where the stopband
+       attenuation of the quantized coefficients is at most `A_SB_loss` dB worse
+       than the specification in `fil_dict` (or the floating point coefficients
+       when they don't meet the specification). The integer bits are derived
+       from the max. coefficient magnitude.
+
+    2. Output and accumulator: min. number of fractional bits for the output,
+       then for the accumulator (starting with full precision) where the output
+       SNR for a random full-scale stimulus with `N` samples is at least `SNR` dB.
+
+    3. With `ovfl = True`, the integer bits of accumulator and output are
+       set to the minimum that avoids overflows (see :func:`ovfl_free_WI`).
+
+    Targets set to `None` (or `fil_dict = None`) keep the corresponding
+    current settings of `p`.
+
+    Parameters
+    ----------
+    p: dict
+        `fxqc` dict with the current settings
+
+    coeffs: array-like of floats
+        floating point coefficients, e.g. `fb.fil[0]['ba'][0]`
+
+    fil_dict: dict or None
+        filter dict with the specifications (response type 'rt', stop band
+        frequencies and attenuations)
+
+    A_SB_loss: float or None
+        max. loss of stop band attenuation by coefficient quantization in dB
+
+    SNR: float or None
+        min. SNR of the output in dB
+
+    ovfl: bool
+        guarantee freedom from overflows in accumulator and output
+
+    WF_max: int
+        max. number of fractional bits for the coefficient search
+
+    N: int
+        length of the stimulus for the SNR evaluation
+
+    n_jobs: int or None
+        number of worker processes, `None` uses the number of CPUs, 1 evaluates
+        all candidates in the current process
+
+    Returns
+    -------
+    dict
+        copy of `p` with the optimized formats 'QCB', 'QA' and 'QO' and the
+        coefficients 'b' quantized with the new format
+    """
+    p = copy.deepcopy(p)
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=n_jobs) if n_jobs > 1 else None
+    pmap = pool.map if pool else map
+    try:
+        # ---- coefficients ---------------------------------------------------
+        bands = stop_bands(fil_dict) if fil_dict is not None else []
+        if A_SB_loss is not None and bands:
+            c_max = np.max(np.abs(coeffs))
+            WI_C = int(np.floor(np.log2(c_max))) + 1 if c_max >= 1 else 0
+            limit = max(stopband_excess(coeffs, bands), 0) + A_SB_loss
+            candidates = [dict(p['QCB'], WI=WI_C, WF=WF) for WF in range(1, WF_max + 1)]
+            excess = list(pmap(_eval_excess, [(q, coeffs, bands) for q in candidates]))
+            ok = [WF for WF, e in zip(range(1, WF_max + 1), excess) if e <= limit]
+            if ok:
+                _set_W(p['QCB'], WI_C, ok[0])
+            else:
+                logger.warning("Stop band attenuation cannot be met with {0} fractional "
+                               "coefficient bits!".format(WF_max))
+                _set_W(p['QCB'], WI_C, WF_max)
+        p['b'] = quant_coeffs(p['QCB'], coeffs)
+
+        # ---- output and accumulator -----------------------------------------
+        def candidates_q(key, WF_list):
+            """ candidate dicts with `WF` of format `key`, overflow-free if required """
+            cands = []
+            for WF in WF_list:
+                p_c = copy.deepcopy(p)
+                _set_W(p_c[key], p_c[key]['WI'], WF)
+                if ovfl:
+                    WI_A, WI_O = ovfl_free_WI(p_c)
+                    _set_W(p_c['QA'], WI_A, p_c['QA']['WF'])
+                    _set_W(p_c['QO'], WI_O, p_c['QO']['WF'])
+                cands.append(p_c)
+            return cands
+
+        if SNR is not None:
+            # start with a full precision accumulator
+            WF_A_full = p['QI']['WF'] + p['QCB']['WF']
+            _set_W(p['QA'], p['QA']['WI'], WF_A_full)
+            x = np.random.RandomState(0).randint(-(1 << (p['QI']['W'] - 1)),
+                                                 1 << (p['QI']['W'] - 1), N)
+            for key in ('QO', 'QA'):
+                if key == 'QO':
+                    WF_list = range(0, WF_A_full + 1)
+                else:
+                    WF_list = range(min(p['QO']['WF'], WF_A_full), WF_A_full + 1)
+                cands = candidates_q(key, WF_list)
+                snr = list(pmap(_eval_snr, [(p_c, x) for p_c in cands]))
+                ok = [p_c for p_c, s in zip(cands, snr) if s >= SNR]
+                if not ok:
+                    logger.warning("Output SNR of {0} dB cannot be reached!".format(SNR))
+                    p = cands[-1]
+                    break
+                p = ok[0]
+        else:
+            p = candidates_q('QO', [p['QO']['WF']])[0]
+    finally:
+        if pool:
+            pool.shutdown()
+
+    logger.info("Optimized word formats: QCB = {0}.{1}, QA = {2}.{3}, QO = {4}.{5}"
+                .format(p['QCB']['WI'], p['QCB']['WF'], p['QA']['WI'], p['QA']['WF'],
+                        p['QO']['WI'], p['QO']['WF']))
+    return p
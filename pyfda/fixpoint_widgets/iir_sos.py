@@ -0,0 +1,533 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the pyFDA project hosted at https://github.com/chipmuenk/pyfda
+#
+# Copyright © pyFDA Project Contributors
+# Licensed under the terms of the MIT License
+# (see file LICENSE in root directory for details)
+
+"""
+Widget for specifying the parameters of an IIR filter, implemented as a
+cascade of second-order sections (biquads) in direct form 1.
+
+The floating point sections `fb.fil[0]['sos']` are optionally reordered for
+minimum roundoff noise and scaled with the L2 or the L-infinity norm before
+the coefficients are quantized. The NumPy model :func:`sos_np` is based on
+:func:`pyfda.libs.pyfda_fix_iir_lib.sos_fx` and is bit-exact with the migen
+module :class:`IIR_SOS`.
+"""
+import sys
+import logging
+logger = logging.getLogger(__name__)
+
+import numpy as np
+import scipy.signal as sig
+import pyfda.filterbroker as fb
+from pyfda.libs.pyfda_lib import set_dict_defaults, pprint_log
+from pyfda.libs.pyfda_qt_lib import qget_cmb_box, qset_cmb_box
+
+from pyfda.libs.compat import (QWidget, QLabel, QComboBox, QCheckBox, QVBoxLayout,
+                               QHBoxLayout, pyqtSignal)
+
+import pyfda.libs.pyfda_fix_lib as fx
+from pyfda.libs.pyfda_fix_iir_lib import sos_fx, sos_scale, sos_order, sos_noise_gain
+from .fixpoint_helpers import UI_W, UI_Q, requant, fx_hash, fx_cache
+
+from migen import Signal, Module, run_simulation
+from migen.fhdl import verilog
+
+classes = {'IIR_SOS_wdg':'IIR_SOS'} #: Dict containing widget class name : display name
+
+# latency of the migen simulation: input register and one cycle for passing
+# the stimulus in the testbench. The output register of each section adds
+# one cycle, see `sos_latency()`
+SOS_LATENCY = 2
+
+# =============================================================================
+
+class IIR_SOS_wdg(QWidget):
+    """
+    Widget for entering word formats & quantization, section scaling and
+    ordering, also instantiates fixpoint filter class :class:`IIR_SOS`.
+    """
+    # incoming,
+    sig_rx = pyqtSignal(object)
+    # outcgoing
+    sig_tx = pyqtSignal(object)
+
+    def __init__(self, parent):
+        super(IIR_SOS_wdg, self).__init__(parent)
+
+        self.title = ("<b>Cascaded Second-Order Sections (SOS)</b><br />"
+                      "Biquads in direct form 1, suitable for higher orders.")
+        self.img_name = ""
+
+        self._sos_cache = (None, None) # key and float sections after scaling / ordering
+        self._construct_UI()
+        # Construct an instance of the fixpoint filter using the settings from
+        # the 'fxqc' quantizer dict
+        self.construct_fixp_filter()
+#------------------------------------------------------------------------------
+
+    def _construct_UI(self):
+        """
+        Intitialize the UI with widgets for coefficient, section and accumulator
+        format and the options for scaling and ordering the sections
+        """
+        p = fb.fil[0]['fxqc']
+        for k, v in (('QCA', {'WI':1, 'WF':14, 'W':16, 'ovfl':'sat', 'quant':'round'}),
+                     ('QS', {'WI':2, 'WF':15, 'W':18, 'ovfl':'sat', 'quant':'round'}),
+                     ('QA', {'WI':4, 'WF':30, 'W':35, 'ovfl':'sat', 'quant':'floor'})):
+            if not k in p:
+                p[k] = {}
+            set_dict_defaults(p[k], v)
+        p.setdefault('norm', 'l2')
+        p.setdefault('order', True)
+        p.setdefault('sos', [])
+
+        self.wdg_w_coeffs = UI_W(self, p['QCB'], id='w_coeff',
+                                 label='Coeff. Format <i>B<sub>I.F&nbsp;</sub></i>:',
+                                 tip_WI='Number of integer bits of the numerator coefficients',
+                                 tip_WF='Number of fractional bits of the numerator coefficients')
+        self.wdg_w_coeffs_a = UI_W(self, p['QCA'], id='w_coeff_a',
+                                   label='Coeff. Format <i>A<sub>I.F&nbsp;</sub></i>:',
+                                   tip_WI='Number of integer bits of the denominator '
+                                          'coefficients, at least 1 for biquads.',
+                                   tip_WF='Number of fractional bits of the denominator '
+                                          'coefficients')
+
+        self.wdg_q_sect = UI_Q(self, p['QS'], id='q_sect',
+                               label='Section Format <i>Q<sub>S&nbsp;</sub></i>:')
+        self.wdg_w_sect = UI_W(self, p['QS'], label='', id='w_sect')
+
+        self.wdg_q_accu = UI_Q(self, p['QA'], id='q_accu',
+                               label='Accu Format <i>Q<sub>A&nbsp;</sub></i>:')
+        self.wdg_w_accu = UI_W(self, p['QA'], label='', id='w_accu')
+
+        lbl_norm = QLabel("Scaling:", self)
+        self.cmb_norm = QComboBox(self)
+        for data, text in (('none', 'None'), ('l2', 'L2'), ('linf', 'L∞')):
+            self.cmb_norm.addItem(text, data)
+        self.cmb_norm.setObjectName('norm')
+        self.cmb_norm.setToolTip("<span>Scale the numerators of the sections "
+            "to avoid overflows between the sections: L2 norm for noise-like "
+            "signals, L∞ norm for sinusoids (no overflows, less SNR).</span>")
+        qset_cmb_box(self.cmb_norm, p['norm'], data=True)
+
+        self.chk_order = QCheckBox("Reorder", self)
+        self.chk_order.setObjectName('order')
+        self.chk_order.setToolTip("<span>Order the sections for minimum roundoff "
+            "noise gain.</span>")
+        self.chk_order.setChecked(p['order'])
+        layHSos = QHBoxLayout()
+        layHSos.addWidget(lbl_norm)
+        layHSos.addWidget(self.cmb_norm)
+        layHSos.addWidget(self.chk_order)
+        layHSos.addStretch()
+
+        self.lbl_info = QLabel("", self)
+        self.lbl_info.setToolTip("<span>Number of sections, roundoff noise gain "
+            "of the cascade and latency in clock cycles.</span>")
+
+        #----------------------------------------------------------------------
+        # LOCAL SIGNALS & SLOTs & EVENTFILTERS
+        #----------------------------------------------------------------------
+        for wdg in (self.wdg_w_coeffs, self.wdg_w_coeffs_a, self.wdg_q_sect,
+                    self.wdg_w_sect, self.wdg_q_accu, self.wdg_w_accu):
+            wdg.sig_tx.connect(self.process_sig_rx)
+        self.cmb_norm.currentIndexChanged.connect(self._set_sos_opts)
+        self.chk_order.stateChanged.connect(self._set_sos_opts)
+#------------------------------------------------------------------------------
+
+        layVWdg = QVBoxLayout()
+        layVWdg.setContentsMargins(0,0,0,0)
+
+        layVWdg.addWidget(self.wdg_w_coeffs)
+        layVWdg.addWidget(self.wdg_w_coeffs_a)
+        layVWdg.addWidget(self.wdg_q_sect)
+        layVWdg.addWidget(self.wdg_w_sect)
+        layVWdg.addWidget(self.wdg_q_accu)
+        layVWdg.addWidget(self.wdg_w_accu)
+        layVWdg.addLayout(layHSos)
+        layVWdg.addWidget(self.lbl_info)
+
+        layVWdg.addStretch()
+
+        self.setLayout(layVWdg)
+
+        fb.fil[0]['fxqc'].update(self.ui2dict())
+
+#------------------------------------------------------------------------------
+    def process_sig_rx(self, dict_sig=None):
+        logger.debug("sig_rx:\n{0}".format(pprint_log(dict_sig)))
+        if 'ui' in dict_sig:
+            # coefficient formats or options have changed, requantize the sections
+            fb.fil[0]['fxqc'].update(self.ui2dict())
+            dict_sig.update({'sender':__name__}) # currently only local
+
+        self.sig_tx.emit(dict_sig)
+
+#------------------------------------------------------------------------------
+    def _set_sos_opts(self):
+        """
+        Store the scaling norm and the ordering option in `fb.fil[0]['fxqc']`,
+        requantize the sections and pass the change on
+        """
+        self.process_sig_rx({'sender':__name__, 'ui':self.sender().objectName(),
+                             'id':'sos'})
+
+#------------------------------------------------------------------------------
+    def float_sos(self):
+        """
+        Return the floating point sections of the current filter design (from
+        `fb.fil[0]['sos']` or converted from `fb.fil[0]['ba']`), reordered and
+        scaled with the settings `fb.fil[0]['fxqc']['order']` and
+        `fb.fil[0]['fxqc']['norm']`. The result is cached, comparing the
+        permutations of the sections is expensive.
+        """
+        sos = np.asarray(fb.fil[0]['sos'], dtype=float)
+        if sos.ndim != 2 or len(sos) == 0:
+            sos = sig.tf2sos(*fb.fil[0]['ba'])
+        p = fb.fil[0]['fxqc']
+        key = fx_hash(sos, p['norm'], p['order'])
+        if key != self._sos_cache[0]:
+            norm = None if p['norm'] == 'none' else p['norm']
+            if p['order'] and len(sos) > 1:
+                sos = sos[list(sos_order(sos, norm))]
+            if norm is not None:
+                sos = sos_scale(sos, norm)
+            self._sos_cache = (key, sos)
+        return self._sos_cache[1]
+
+#------------------------------------------------------------------------------
+    def _update_info(self, sos):
+        """
+        Update the info label with the properties of the cascade `sos`
+        """
+        p = fb.fil[0]['fxqc']
+        self.lbl_info.setText("Sections: {0}, Noise Gain = {1:.3g}, Latency = {2}"
+            .format(len(sos), sos_noise_gain(sos), sos_latency(p) - 1))
+
+#------------------------------------------------------------------------------
+    def dict2ui(self):
+        """
+        Update all parts of the UI that need to be updated when specs have been
+        changed outside this class, e.g. coefficients and coefficient wordlength.
+        This also provides the initial setting for the widgets when the filter has
+        been changed.
+
+        This is called from one level above by
+        :class:`pyfda.input_widgets.input_fixpoint_specs.Input_Fixpoint_Specs`.
+        """
+        p = fb.fil[0]['fxqc']
+        self.wdg_w_coeffs.dict2ui(p['QCB'])
+        self.wdg_w_coeffs_a.dict2ui(p['QCA'])
+        self.wdg_w_sect.dict2ui(p['QS'])
+        self.wdg_w_accu.dict2ui(p['QA'])
+        qset_cmb_box(self.cmb_norm, p['norm'], data=True)
+        self.chk_order.blockSignals(True)
+        self.chk_order.setChecked(p['order'])
+        self.chk_order.blockSignals(False)
+        # the filter design may have changed
+        p.update(self.ui2dict())
+
+#------------------------------------------------------------------------------
+    def ui2dict(self):
+        """
+        Read out the subwidgets and store their settings in the central
+        fixpoint dictionary `fb.fil[0]['fxqc']` using the keys described below.
+
+        Returns
+        -------
+        fxqc_dict : dict
+
+           containing the following keys and values:
+
+        - 'QCB', 'QCA': dictionaries with numerator / denominator coefficient
+          quantization settings
+
+        - 'QS': dictionary with the quantization settings between the sections
+
+        - 'QA': dictionary with accumulator quantization settings
+
+        - 'norm', 'order': scaling norm and ordering of the sections
+
+        - 'sos' : sections with coefficients in integer format, one row
+          `[b0, b1, b2, a0, a1, a2]` per section
+        """
+        fxqc_dict = fb.fil[0]['fxqc']
+        fxqc_dict['QCB'].update(self.wdg_w_coeffs.q_dict)
+        fxqc_dict['QCA'].update(self.wdg_w_coeffs_a.q_dict)
+        fxqc_dict['QS'].update(self.wdg_w_sect.q_dict)
+        fxqc_dict['QA'].update(self.wdg_w_accu.q_dict)
+        fxqc_dict.update({'norm':qget_cmb_box(self.cmb_norm),
+                          'order':self.chk_order.isChecked()})
+
+        sos = self.float_sos()
+        fxqc_dict.update({'sos':sos_quant_coeffs(sos, fxqc_dict['QCB'], fxqc_dict['QCA'])})
+        self._update_info(sos)
+        return fxqc_dict
+
+#------------------------------------------------------------------------------
+    def construct_fixp_filter(self):
+        """
+        Construct an instance of the fixpoint filter object using the settings from
+        the 'fxqc' quantizer dict
+        """
+        p = fb.fil[0]['fxqc']
+        if len(p['sos']) == 0:
+            logger.error("No second-order sections!")
+            return
+        if not np.all(np.isfinite(np.asarray(p['sos'], dtype=float))):
+            logger.error("Coefficients contain non-finite values!")
+            return
+
+        # reuse the elaborated module when word formats and coefficients are unchanged
+        self.fixp_filter = fx_cache.get_module(fx_hash('IIR_SOS', p), IIR_SOS)
+
+#------------------------------------------------------------------------------
+    def to_verilog(self, **kwargs):
+        """
+        Convert the migen description to Verilog, the code is cached for
+        identical settings and conversion options `kwargs`
+        """
+        return fx_cache.get_verilog(fx_hash('IIR_SOS', fb.fil[0]['fxqc'], kwargs),
+            lambda: verilog.convert(self.fixp_filter,
+                                    ios={self.fixp_filter.i, self.fixp_filter.o},
+                                    **kwargs))
+
+#------------------------------------------------------------------------------
+    def tb_wdg_stim(self, stimulus, outputs, stages=None, progress=None):
+        """
+        use stimulus list from widget as input to filter, optionally record the
+        signals of all stages in the dict of lists `stages`. The callback
+        `progress(n, outputs)` is called before each sample, the simulation
+        stops when it returns False.
+        """
+        for n, x in enumerate(stimulus):
+            if progress is not None and not progress(n, outputs):
+                return # simulation has been cancelled
+            yield self.fixp_filter.i.eq(int(x)) # pass one stimulus value to filter
+            outputs.append((yield self.fixp_filter.o)) # append filter output to output list
+            if stages is not None:
+                for k in stages:
+                    stages[k].append((yield self.fixp_filter.stages[k]))
+            yield # next x until stimulus is used up
+
+#------------------------------------------------------------------------------
+    def run_sim(self, stimulus, stages=False, progress=None):
+        """
+        Pass stimuli and run the migen simulation of the filter.
+
+        When `stages == True`, return a dict with the outputs of all sections
+        (keys 'S0', 'S1', ... and 'QO' for the last section) instead of the
+        output response.
+
+        The optional callback `progress(n, response)` receives the number of
+        simulated samples and the response so far, when it returns False the
+        simulation is cancelled and the partial response is returned.
+        """
+        response = []
+        if stages:
+            stages = {k:[] for k in self.fixp_filter.stages}
+        else:
+            stages = None
+        testbench = self.tb_wdg_stim(stimulus, response, stages, progress)
+        run_simulation(self.fixp_filter, testbench)
+
+        if stages is None:
+            return response
+        else:
+            return stages
+
+#------------------------------------------------------------------------------
+    def run_sim_np(self, stimulus, stages=False, p=None):
+        """
+        Calculate the fixpoint response with the bit-exact NumPy model
+        :func:`sos_np` instead of the migen simulation. This yields the same
+        integer results as :meth:`run_sim`, but much faster.
+
+        `p` is the fixpoint dict, `fb.fil[0]['fxqc']` by default. Pass a copy to
+        run the model in a different thread while the UI can still be edited.
+        """
+        p = fb.fil[0]['fxqc'] if p is None else p
+        return sos_np(p, stimulus, stages=stages)
+
+#------------------------------------------------------------------------------
+    def settling_time(self, N_max=None):
+        """
+        Return the number of samples after which the response doesn't depend
+        on the initial state of the filter anymore, estimated by
+        :func:`sos_settling_time` and capped at `N_max` (e.g. the length of the
+        stimulus).
+        """
+        return sos_settling_time(fb.fil[0]['fxqc'], N_max)
+
+###############################################################################
+def sos_quant_coeffs(sos, QCB, QCA):
+    """
+    Quantize the floating point sections `sos` with the numerator format `QCB`
+    and the denominator format `QCA` and return them as a list of rows
+    `[b0, b1, b2, a0, a1, a2]` of integers (scaled by `2**WF`). The leading
+    denominator coefficient `a0` (normalized to 1) is not quantized, it is
+    set to `2**QCA['WF']`.
+    """
+    sos = np.asarray(sos, dtype=float)
+    sos_q = np.zeros(sos.shape, dtype=np.int64)
+    for cols, Q in ((slice(0, 3), QCB), (slice(4, 6), QCA)):
+        q_obj = {'WI':Q['WI'], 'WF':Q['WF'], 'quant':Q.get('quant', 'round'),
+                 'ovfl':Q.get('ovfl', 'sat'), 'frmt':'float', 'scale':1}
+        sos_q[:, cols] = np.round(fx.Fixed(q_obj).fixp(sos[:, cols], scaling='none')
+                                  * (1 << Q['WF']))
+    sos_q[:, 3] = 1 << QCA['WF']
+    return sos_q.tolist()
+
+#------------------------------------------------------------------------------
+def sos_latency(p):
+    """
+    Return the latency of the migen simulation for the `fxqc` dict `p`
+    """
+    return SOS_LATENCY + len(p['sos'])
+
+#------------------------------------------------------------------------------
+def sos_settling_time(p, N_max=None):
+    """
+    Estimate the settling time of the cascade for the `fxqc` dict `p`: The
+    state of section `k` with the pole radius `r_k` decays below the LSB of the
+    accumulator (format `QA`) after `n_k = log(2**-W_A) / log(r_k)` samples, the
+    settling times of the sections and the latency of the cascade are added.
+    Stable sections with quantized coefficients (format `QCA`) have a pole
+    radius `r_k <= sqrt(1 - 2**-WF)`, this bound is also used for unstable
+    sections. Limit cycles are not taken into account.
+
+    The result is capped at `N_max` unless `N_max` is None.
+    """
+    W_A = p['QA']['WI'] + p['QA']['WF'] + 1
+    r_max = np.sqrt(1 - 2.**-p['QCA']['WF'])
+    N = sos_latency(p)
+    for s in p['sos']:
+        r = min(np.max(np.abs(np.roots(s[3:])), initial=0), r_max)
+        if r > 0:
+            N += int(np.ceil(W_A * np.log(2) / -np.log(r)))
+    return N if N_max is None else min(N, N_max)
+
+#------------------------------------------------------------------------------
+def sos_np(p, stimulus, stages=False):
+    """
+    Bit-exact NumPy model of the migen module :class:`IIR_SOS`, based on
+    :func:`pyfda.libs.pyfda_fix_iir_lib.sos_fx`.
+
+    Parameters
+    ----------
+    p: dict
+        `fxqc` dict with the quantization settings and the integer sections `p['sos']`
+
+    stimulus: array-like of integers
+        input signal in integer format, this is wrapped to the input word length
+        like the migen input signal
+
+    stages: bool
+        When True, return the outputs of all sections instead of the output only
+
+    Returns
+    -------
+    ndarray of integers
+        response with the same length and the same latency as the migen
+        simulation with :meth:`IIR_SOS_wdg.run_sim`, or a dict with the outputs
+        of the sections ('S0', 'S1', ... and 'QO' for the last section) when
+        `stages == True`.
+    """
+    ys = sos_fx(p, stimulus, stages=True)
+    L = len(ys)
+    responses = {}
+    for k, y in enumerate(ys):
+        D = SOS_LATENCY + k + 1 # delay of the output register of section k
+        key = 'QO' if k == L - 1 else 'S{0}'.format(k)
+        responses[key] = np.zeros(len(y), dtype=y.dtype)
+        responses[key][D:] = y[:max(len(y) - D, 0)]
+
+    if stages:
+        return responses
+    else:
+        return responses['QO']
+
+###############################################################################
+# A synthesizable cascade of DF1 biquads
+class IIR_SOS(Module):
+    """
+    Cascade of second-order sections in direct form 1. Products are
+    requantized to the accumulator format `QA`, the accumulator saturates or
+    wraps after each addition, the quantized output of each section (format
+    `QS`, `QO` for the last section) is fed back and registered as the input
+    of the next section. This is the arithmetics of
+    :func:`pyfda.libs.pyfda_fix_iir_lib.iir_fx` with the structure 'DF1'.
+    """
+    def __init__(self):
+        p = fb.fil[0]['fxqc']
+
+        # ------------- Define I/Os -------------------------------------------
+        self.i = Signal((p['QI']['W'], True)) # input signal
+        self.o = Signal((p['QO']['W'], True)) # output signal
+
+        ###
+        QA = p['QA']
+        W_A = QA['WI'] + QA['WF'] + 1
+        QA_1 = {'WI':QA['WI'] + 1, 'WF':QA['WF']} # format of sum before overflow handling
+        L = len(p['sos'])
+
+        def mac(acc, c, x, Q_x, Q_c, sign=1):
+            """ return accumulator `acc` +/- requantized product `c * x` """
+            QP = {'WI':Q_x['WI'] + Q_c['WI'] + 1, 'WF':Q_x['WF'] + Q_c['WF']}
+            # the product signal holds the exact product, `requant` wraps after shifting
+            prod = Signal((QP['WI'] + QP['WF'] + 2, True))
+            self.comb += prod.eq(c * x)
+            prod_q = requant(self, prod, QP, QA)
+            if acc is None:
+                return prod_q
+            s = Signal((W_A + 1, True))
+            self.comb += s.eq(acc + prod_q if sign > 0 else acc - prod_q)
+            return requant(self, s, QA_1, QA)
+
+        x_reg = Signal((p['QI']['W'], True)) # input register
+        self.sync += x_reg.eq(self.i)
+
+        src, Q_src = x_reg, p['QI']
+        self.stages = {}
+        for k, s in enumerate(p['sos']):
+            b = [int(c) for c in s[:3]]
+            a = [int(c) for c in s[3:]]
+            Q_y = p['QO'] if k == L - 1 else p['QS']
+            W_y = Q_y['WI'] + Q_y['WF'] + 1
+
+            y_reg = Signal((W_y, True)) # output register = first feedback register
+            zx = [Signal((len(src), True)) for _ in range(2)]
+            zy = [y_reg, Signal((W_y, True))]
+            self.sync += [zx[0].eq(src), zx[1].eq(zx[0]), zy[1].eq(zy[0])]
+
+            acc = None
+            for c, x, Q_x, Q_c, sign in ((b[0], src, Q_src, p['QCB'], 1),
+                                         (b[1], zx[0], Q_src, p['QCB'], 1),
+                                         (a[1], zy[0], Q_y, p['QCA'], -1),
+                                         (b[2], zx[1], Q_src, p['QCB'], 1),
+                                         (a[2], zy[1], Q_y, p['QCA'], -1)):
+                if c != 0 or acc is None: # zero products don't change the sum
+                    acc = mac(acc, c, x, Q_x, Q_c, sign)
+            self.sync += y_reg.eq(requant(self, acc, QA, Q_y))
+
+            self.stages['QO' if k == L - 1 else 'S{0}'.format(k)] = y_reg
+            src, Q_src = y_reg, Q_y
+
+        self.comb += self.o.eq(src)
+
+#------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    from pyfda.libs.compat import QApplication
+    app = QApplication(sys.argv)
+    mainw = IIR_SOS_wdg(None)
+    mainw.show()
+
+    app.exec_()
+
+    # test using "python -m pyfda.fixpoint_widgets.iir_sos"
@@ -11,21 +11,23 @@ Widget for simulating fixpoint filters and generating Verilog Code
 
 """
 import sys, os, io
+import copy
 import re
 import importlib
+import inspect
 import time
 import logging
 logger = logging.getLogger(__name__)
 
 from pyfda.libs.compat import (Qt, QWidget, QPushButton, QComboBox, QFD, QSplitter, QLabel,
-                      QPixmap, QVBoxLayout, QHBoxLayout, pyqtSignal, QFrame, 
-                      QEvent, QSizePolicy)
+                      QLineEdit, QPixmap, QVBoxLayout, QHBoxLayout, pyqtSignal, QFrame, 
+                      QEvent, QSizePolicy, QObject, QThread, pyqtSlot)
 
 import numpy as np
 
 import pyfda.filterbroker as fb # importing filterbroker initializes all its globals
 import pyfda.libs.pyfda_dirs as dirs
-from pyfda.libs.pyfda_lib import qstr, cmp_version, pprint_log
+from pyfda.libs.pyfda_lib import qstr, cmp_version, pprint_log, safe_eval
 import pyfda.libs.pyfda_fix_lib as fx
 from pyfda.libs.pyfda_io_lib import extract_file_ext
 from pyfda.libs.pyfda_qt_lib import qget_cmb_box, qset_cmb_box, qstyle_widget
@@ -47,6 +49,78 @@ except ImportError:
     HAS_DS = False
 #------------------------------------------------------------------------------
 
+class FX_Sim_Worker(QObject):
+    """
+    Run a fixpoint simulation in a separate thread to keep the GUI responsive.
+
+    The simulation function `sim_func(stimulus, progress)` is called with the
+    callback :meth:`progress` which has to be called regularly with the number
+    of processed samples and the results calculated so far. It returns the
+    results or a dict with the results under the key 'fx_results' and further
+    entries (e.g. 'fx_verify') that are passed on via `sig_finished`. The partial results
+    are passed on via `sig_progress` at most every `t_progress` seconds, the
+    callback returns False when the simulation has been cancelled.
+    """
+    # outgoing: dict with the partial results 'fx_results' and the progress 'n'
+    sig_progress = pyqtSignal(object)
+    # outgoing: dict with the final results 'fx_results' and 'cancelled' / 'error'
+    sig_finished = pyqtSignal(object)
+
+    def __init__(self, sim_func, stimulus, t_progress=0.5):
+        super(FX_Sim_Worker, self).__init__()
+        self.sim_func = sim_func
+        self.stimulus = stimulus
+        self.t_progress = t_progress
+        self.cancelled = False
+        self.t_last = time.perf_counter()
+
+#------------------------------------------------------------------------------
+    def progress(self, n, results):
+        """
+        Callback for the simulation: Emit a copy of the partial `results` for
+        `n` processed samples when `t_progress` has elapsed since the last
+        emission. Return False when the simulation has been cancelled.
+        """
+        if self.cancelled:
+            return False
+        t = time.perf_counter()
+        if t - self.t_last >= self.t_progress:
+            self.t_last = t
+            self.sig_progress.emit({'n':n, 'fx_results':np.array(results)})
+        return True
+
+#------------------------------------------------------------------------------
+    def cancel(self):
+        """
+        Request cancellation, the simulation stops at the next call of
+        :meth:`progress`. This is thread-safe as only a flag is set.
+        """
+        self.cancelled = True
+
+#------------------------------------------------------------------------------
+    @pyqtSlot()
+    def run(self):
+        """
+        Run the simulation and emit the results via `sig_finished`. This is
+        always emitted, otherwise the simulation thread would never be terminated.
+        """
+        result = {'fx_results':None, 'error':None}
+        try:
+            fx_results = self.sim_func(self.stimulus, self.progress)
+            if isinstance(fx_results, dict):
+                result.update(fx_results)
+            else:
+                result['fx_results'] = fx_results
+        except Exception as e:
+            logger.error("Fixpoint simulation failed with {0}: {1}"
+                         .format(type(e).__name__, e))
+            result['error'] = e
+        finally:
+            result['cancelled'] = self.cancelled
+            self.sig_finished.emit(result)
+
+#------------------------------------------------------------------------------
+
 classes = {'Input_Fixpoint_Specs':'Fixpoint'} #: Dict containing class name : display name
 
 class Input_Fixpoint_Specs(QWidget):
@@ -78,6 +152,11 @@ class Input_Fixpoint_Specs(QWidget):
         if not os.path.isfile(self.default_fx_img):
             logger.error("Image {0:s} not found!".format(self.default_fx_img))
         
+        self.sim_thread = None # thread and worker for running fixpoint simulations
+        self.sim_worker = None
+        self.fx_verify = None # result of the last verification, see fx_sim_verify()
+        self.fx_sim_fxqc = None # copy of the fixpoint dict for the simulation
+
         if HAS_MIGEN:
             self._construct_UI()
         else:
@@ -95,7 +174,9 @@ class Input_Fixpoint_Specs(QWidget):
 		3. ``fx_sim_set_stimulus()``: Receive stimulus from widget in 'fx_sim':'send_stimulus'
 			and pass it to HDL object for simulation
 		   
-		4. Send back HDL response to widget via 'fx_sim':'set_response'
+		4. Send back HDL response to widget via 'fx_sim':'set_response'. While
+		   the simulation is running, partial results are sent with an additional
+		   key 'fx_progress'. The simulation can be stopped by 'fx_sim':'cancel'.
 
         """
 		
@@ -125,6 +206,8 @@ class Input_Fixpoint_Specs(QWidget):
                     
             elif dict_sig['fx_sim'] == 'send_stimulus':
                 self.fx_sim_set_stimulus(dict_sig)
+            elif dict_sig['fx_sim'] == 'cancel':
+                self.fx_sim_cancel()
             elif dict_sig['fx_sim'] == 'specs_changed':
                 # fixpoint specification have been changed somewhere, update ui
                 # and set run button to "changed" in wdg_dict2ui()
@@ -164,7 +247,8 @@ class Input_Fixpoint_Specs(QWidget):
                     fb.fil[0]['fxqc']['QI']['W'] = fb.fil[0]['fxqc']['QO']['W']
  
             elif 'id' in dict_sig and dict_sig['id'] in \
-                {'w_coeff', 'q_input', 'q_output', 'w_accu', 'q_accu'}:
+                {'w_coeff', 'w_coeff_a', 'q_input', 'q_output', 'w_accu', 'q_accu',
+                 'w_sect', 'q_sect', 'pipe', 'sos', 'rate'}:
                 pass # nothing to do for now
 
             else:
@@ -174,7 +258,8 @@ class Input_Fixpoint_Specs(QWidget):
                     logger.warning('Unknown id "{0}" in dict_sig:\n{1}'\
                                    .format(dict_sig['id'], pprint_log(dict_sig)))
                     
-            if not dict_sig['ui'] in {'WI', 'WF', 'ovfl', 'quant', 'cmbW', 'butLock'}:
+            if not dict_sig['ui'] in {'WI', 'WF', 'ovfl', 'quant', 'cmbW', 'butLock', 'pipe',
+                                      'norm', 'order', 'rate'}:
                logger.warning("Unknown value '{0}' for key 'ui'".format(dict_sig['ui']))
             self.wdg_dict2ui() # update wordlengths in UI and set RUN button to 'changed'
             self.sig_tx.emit({'sender':__name__, 'fx_sim':'specs_changed'})
@@ -289,13 +374,48 @@ class Input_Fixpoint_Specs(QWidget):
 #       Simulation and export Buttons        
 #------------------------------------------------------------------------------        
         self.butExportHDL = QPushButton(self)
-        self.butExportHDL.setToolTip("Export fixpoint filter in Verilog format.")
+        self.butExportHDL.setToolTip("<span>Export fixpoint filter in Verilog format. Code for "
+                                     "unchanged settings is taken from the cache.</span>")
         self.butExportHDL.setText("Create HDL")
 
         self.butSimHDL = QPushButton(self)
-        self.butSimHDL.setToolTip("Start migen fixpoint simulation.")
+        self.butSimHDL.setToolTip("<span>Start fixpoint simulation. A migen module can only be "
+                                  "simulated once, it is elaborated again for every run.</span>")
         self.butSimHDL.setText("Sim. HDL")
         
+        self.cmb_sim_backend = QComboBox(self)
+        self.cmb_sim_backend.addItems(["migen","NumPy","Verify"])
+        qset_cmb_box(self.cmb_sim_backend, "migen")
+        self.cmb_sim_backend.setToolTip("<span>Simulation backend: Cycle-based migen "
+                "simulation or bit-exact NumPy model of the fixpoint filter (much faster, "
+                "only available for some filter topologies). 'Verify' simulates with the "
+                "model and cross-checks random windows of the stimulus with migen.</span>")
+
+        # number of windows and window length for verification of the model
+        self.N_verify_win = 4
+        self.L_verify_win = 256
+        self.led_verify_win = QLineEdit(self)
+        self.led_verify_win.setText(str(self.N_verify_win))
+        self.led_verify_win.setMaximumWidth(40)
+        self.led_verify_win.setToolTip("<span>Number of randomly placed windows with {0} "
+                "samples each that are simulated with migen for verifying the model."
+                "</span>".format(self.L_verify_win))
+        self.led_verify_win.setVisible(False)
+
+        # target SNR for the word length optimization
+        self.opt_snr = 60.
+        self.butOptW = QPushButton(self)
+        self.butOptW.setText("Opt. W")
+        self.butOptW.setToolTip("<span>Search the minimum word lengths of coefficients, "
+                "accumulator and output that meet the stop band specifications, "
+                "the output SNR and avoid overflows (only available for some filter "
+                "topologies).</span>")
+        self.led_opt_snr = QLineEdit(self)
+        self.led_opt_snr.setText(str(self.opt_snr))
+        self.led_opt_snr.setMaximumWidth(40)
+        self.led_opt_snr.setToolTip("<span>Target SNR of the output in dB for the "
+                                    "word length optimization.</span>")
+
         self.butSimFxPy = QPushButton(self)
         self.butSimFxPy.setToolTip("Simulate filter with fixpoint effects.")
         self.butSimFxPy.setText("Sim. FixPy")
@@ -303,6 +423,10 @@ class Input_Fixpoint_Specs(QWidget):
         self.layHHdlBtns = QHBoxLayout()
         self.layHHdlBtns.addWidget(self.butSimFxPy)
         self.layHHdlBtns.addWidget(self.butSimHDL)
+        self.layHHdlBtns.addWidget(self.cmb_sim_backend)
+        self.layHHdlBtns.addWidget(self.led_verify_win)
+        self.layHHdlBtns.addWidget(self.butOptW)
+        self.layHHdlBtns.addWidget(self.led_opt_snr)
         self.layHHdlBtns.addWidget(self.butExportHDL)
         # This frame encompasses the HDL buttons sim and convert
         frmHdlBtns = QFrame(self)
@@ -350,6 +474,10 @@ class Input_Fixpoint_Specs(QWidget):
 
         self.butExportHDL.clicked.connect(self.exportHDL)
         self.butSimHDL.clicked.connect(self.fx_sim_init)
+        self.butOptW.clicked.connect(self.fx_optimize)
+        self.cmb_sim_backend.currentIndexChanged.connect(
+            lambda: self.led_verify_win.setVisible(
+                qget_cmb_box(self.cmb_sim_backend, data=False) == "Verify"))
         #----------------------------------------------------------------------
         inst_wdg_list = self._update_filter_cmb()
         if len(inst_wdg_list) == 0:
@@ -500,6 +628,8 @@ class Input_Fixpoint_Specs(QWidget):
             self.butSimFxPy.setVisible(False)
             self.butSimHDL.setEnabled(False)
             self.butExportHDL.setEnabled(False)
+            self.cmb_sim_backend.setEnabled(False)
+            self.butOptW.setEnabled(False)
             #self.layH_fx_wdg.setVisible(False)
             self.img_fixp = self.embed_fixp_img(self.no_fx_filter_img)
             self.lblTitle.setText("")
@@ -564,6 +694,8 @@ class Input_Fixpoint_Specs(QWidget):
             if hasattr(self.fx_wdg_inst,'fixp_filter'):
                 self.butExportHDL.setEnabled(hasattr(self.fx_wdg_inst, "to_verilog"))
                 self.butSimHDL.setEnabled(hasattr(self.fx_wdg_inst, "run_sim"))
+                self.cmb_sim_backend.setEnabled(hasattr(self.fx_wdg_inst, "run_sim_np"))
+                self.butOptW.setEnabled(getattr(self.fx_wdg_inst, "optimize_fxqc", None) is not None)
                 self.update_fxqc_dict()
                 self.sig_tx.emit({'sender':__name__, 'fx_sim':'specs_changed'})
             else:
@@ -606,6 +738,39 @@ class Input_Fixpoint_Specs(QWidget):
                 logger.debug("update fxqc: \n{0}".format(pprint_log(fb.fil[0]['fxqc'])))
         else:
             logger.error("No fixpoint widget found!")
+#------------------------------------------------------------------------------
+    def fx_optimize(self):
+        """
+        Let the fixpoint widget search the minimum word lengths of coefficients,
+        accumulator and output that meet the stop band specs of the filter, the
+        output SNR entered in `led_opt_snr` and avoid overflows. The results are
+        written to `fb.fil[0]['fxqc']` and the UI is updated.
+        """
+        if not (self.fx_wdg_found and getattr(self.fx_wdg_inst, "optimize_fxqc", None) is not None):
+            logger.warning("Fixpoint widget doesn't support word length optimization.")
+            return
+        self.opt_snr = safe_eval(self.led_opt_snr.text(), self.opt_snr,
+                                 return_type='float', sign='pos')
+        self.led_opt_snr.setText(str(self.opt_snr))
+        if self.wdg_w_input.butLock.isChecked():
+            logger.info("Unlocking input and output format for optimizing the output format.")
+            self.wdg_w_input.butLock.setChecked(False)
+            self.wdg_w_input.butLock_clicked(False)
+        try:
+            self.update_fxqc_dict()
+            t_start = time.process_time()
+            # don't spawn worker processes from the GUI thread (slow startup, fork
+            # of the Qt application), the candidates are evaluated in this process
+            self.fx_wdg_inst.optimize_fxqc(SNR=self.opt_snr, n_jobs=1)
+            logger.info("Word length optimization finished [{0:5.3g} ms]"
+                        .format((time.process_time() - t_start) * 1000))
+        except (ValueError, KeyError) as e:
+            logger.error("Word length optimization failed:\n{0}".format(e))
+            return
+
+        self.wdg_dict2ui()
+        self.sig_tx.emit({'sender':__name__, 'fx_sim':'specs_changed'})
+
 #------------------------------------------------------------------------------           
             
     def exportHDL(self):
@@ -689,7 +854,9 @@ class Input_Fixpoint_Specs(QWidget):
             
         - Update the `fxqc_dict` containing all quantization information
         
-        - Setup a filter instance for migen simulation
+        - Setup a filter instance for migen simulation and store a copy of the
+          `fxqc_dict` in `fx_sim_fxqc`: The simulation runs in a worker thread
+          while the UI (and the `fxqc_dict`) can be edited
         
         - Request a stimulus signal
         """
@@ -698,11 +865,15 @@ class Input_Fixpoint_Specs(QWidget):
             self.sig_tx.emit({'sender':__name__, 'fx_sim':'error'})
             return
 
+        # a migen module can only be simulated once, stop simulation before
+        # constructing a new one
+        self.fx_sim_cancel(wait=True)
         try:
             logger.info("Fixpoint simulation started")
             self.t_start = time.process_time()
             self.update_fxqc_dict()
             self.fx_wdg_inst.construct_fixp_filter()   # setup filter instance         
+            self.fx_sim_fxqc = copy.deepcopy(fb.fil[0]['fxqc'])
 
             dict_sig = {'sender':__name__, 'fx_sim':'get_stimulus'}
             self.sig_tx.emit(dict_sig)
@@ -717,81 +888,291 @@ class Input_Fixpoint_Specs(QWidget):
         """
         - Get fixpoint stimulus from `dict_sig` in integer format
           
-        - Pass it to the fixpoint filter and calculate the fixpoint response
-        
-        - Send the reponse to the plotting widget
+        - Pass it to the fixpoint filter and start the simulation in a worker
+          thread (:class:`FX_Sim_Worker`)
+
+        The partial and the final results are sent to the plotting widget by
+        :meth:`fx_sim_progress` and :meth:`fx_sim_finished`.
         """
-        try:
-            logger.debug('Starting fixpoint simulation with stimulus from "{0}":\n\tfx_stimulus:{1}'
-                        '\n\tStimuli: Shape {2} of type "{3}"'
-                        .format( 
-                            dict_sig['sender'],
-                            pprint_log(dict_sig['fx_stimulus'], tab=" "),
-                            np.shape(dict_sig['fx_stimulus']),
-                            dict_sig['fx_stimulus'].dtype,
-                            ))
-            self.t_stim = time.process_time()
-            logger.info("Fixpoint simulation [{0:5.3g} ms]: Stimuli generated"\
-                        .format((self.t_stim-self.t_start)*1000))
-
-            # Run fixpoint simulation and return the results as integer values:
-            self.fx_results=self.fx_wdg_inst.run_sim(dict_sig['fx_stimulus'])  # Run the simulation
-            self.t_resp = time.process_time()
-
-            if len(self.fx_results) == 0:
-                logger.warning("Fixpoint simulation returned empty results!")
-            else:
-                #logger.debug("fx_results: {0}"\
-                #            .format(pprint_log(self.fx_results, tab= " ")))
-                logger.debug('Fixpoint simulation successful for dict\n{0}'
-                         '\tStimuli: Shape {1} of type "{2}"'
-                         '\n\tResponse: Shape {3} of type "{4}"'\
-                           .format(pprint_log(dict_sig),
-                                   np.shape(dict_sig['fx_stimulus']),
-                                   dict_sig['fx_stimulus'].dtype,
-                                   np.shape(self.fx_results),
-                                   type(self.fx_results)
-                                    ))
-                logger.info('Fixpoint simulation [{0:5.3g} ms]: Response calculated'\
-                            .format((self.t_resp - self.t_stim)*1000))
-
-            #TODO: fixed point / integer to float conversion?
-            #TODO: color push-button to show state of simulation
-            #TODO: add QTimer single shot
-#            self.timer_id = QtCore.QTimer()
-#            self.timer_id.setSingleShot(True)
-#            # kill simulation after some idle time, also add a button for this
-#            self.timer_id.timeout.connect(self.kill_sim)
-
-        except ValueError as e:
-            logger.error("Simulator error {0}".format(e))
+        logger.debug('Starting fixpoint simulation with stimulus from "{0}":\n\tfx_stimulus:{1}'
+                    '\n\tStimuli: Shape {2} of type "{3}"'
+                    .format( 
+                        dict_sig['sender'],
+                        pprint_log(dict_sig['fx_stimulus'], tab=" "),
+                        np.shape(dict_sig['fx_stimulus']),
+                        dict_sig['fx_stimulus'].dtype,
+                        ))
+        self.t_stim = time.process_time()
+        logger.info("Fixpoint simulation [{0:5.3g} ms]: Stimuli generated"\
+                    .format((self.t_stim-self.t_start)*1000))
+
+        # Run fixpoint simulation and return the results as integer values,
+        # either with migen or with the NumPy model of the filter (if available).
+        # All settings are read from the UI here, the worker thread must not
+        # access any widgets or the live `fxqc_dict`: The migen module has been
+        # constructed by `fx_sim_init()`, the models get the copy `fx_sim_fxqc`.
+        backend = qget_cmb_box(self.cmb_sim_backend, data=False)
+        p = self.fx_sim_fxqc
+        sim_kwargs = inspect.signature(self.fx_wdg_inst.run_sim).parameters
+        sim_kwargs = {'p':p} if 'p' in sim_kwargs else {}
+        if backend == "NumPy" and hasattr(self.fx_wdg_inst, "run_sim_np"):
+            def sim_func(stimulus, progress):
+                return self.fx_wdg_inst.run_sim_np(stimulus, p=p)
+        elif backend == "Verify" and hasattr(self.fx_wdg_inst, "run_sim_np"):
+            if getattr(self.fx_wdg_inst, "settling_time", None) is None:
+                logger.error("Fixpoint widget doesn't support verification!")
+                self.sig_tx.emit({'sender':__name__, 'fx_sim':'error'})
+                return
+            self.N_verify_win = safe_eval(self.led_verify_win.text(), self.N_verify_win,
+                                          return_type='int', sign='pos')
+            self.led_verify_win.setText(str(self.N_verify_win))
+            windows = self.fx_verify_windows(len(dict_sig['fx_stimulus']))
+            def sim_func(stimulus, progress):
+                fx_stages = self.fx_wdg_inst.run_sim_np(stimulus, stages=True, p=p)
+                return {'fx_results':fx_stages['QO'],
+                        'fx_verify':self.fx_sim_verify(stimulus, fx_stages, windows,
+                                                       progress=progress)}
+        elif 'progress' in inspect.signature(self.fx_wdg_inst.run_sim).parameters:
+            def sim_func(stimulus, progress):
+                return self.fx_wdg_inst.run_sim(stimulus, progress=progress, **sim_kwargs)
+        else: # widget cannot report its progress and cannot be cancelled
+            def sim_func(stimulus, progress):
+                return self.fx_wdg_inst.run_sim(stimulus, **sim_kwargs)
+
+        self.fx_sim_cancel(wait=True) # there should be no running simulation
+        self.fx_stimulus = dict_sig['fx_stimulus']
+        self.fx_results = None
+        self.sim_worker = FX_Sim_Worker(sim_func, self.fx_stimulus)
+        self.sim_thread = QThread()
+        self.sim_worker.moveToThread(self.sim_thread)
+        self.sim_thread.started.connect(self.sim_worker.run)
+        self.sim_worker.sig_progress.connect(self.fx_sim_progress)
+        self.sim_worker.sig_finished.connect(self.fx_sim_finished)
+        self.sim_thread.start()
+        return
+
+#------------------------------------------------------------------------------
+    def fx_sim_progress(self, dict_progress):
+        """
+        Send the partial results of a running simulation to the plotting widget
+        with the additional key 'fx_progress' (fraction of processed samples)
+        """
+        if self.sender() is not self.sim_worker:
+            return # signal from an old, cancelled simulation
+        logger.debug("Fixpoint simulation: {0} of {1} samples".format(
+            dict_progress['n'], len(self.fx_stimulus)))
+        self.sig_tx.emit({'sender':__name__, 'fx_sim':'set_results',
+                          'fx_results':dict_progress['fx_results'], 'fx_rate':self.fx_rate(),
+                          'fx_progress':dict_progress['n'] / max(len(self.fx_stimulus), 1)})
+
+#------------------------------------------------------------------------------
+    def fx_rate(self):
+        """
+        Return the interpolation and the decimation factor `(L, M)` of the
+        fixpoint widget, `(1, 1)` for single rate filters. The response has
+        `L / M` times the number of stimulus samples.
+        """
+        if self.fx_wdg_found and hasattr(self.fx_wdg_inst, "rate"):
+            return self.fx_wdg_inst.rate()
+        return (1, 1)
+
+#------------------------------------------------------------------------------
+    def fx_sim_finished(self, result):
+        """
+        Terminate the simulation thread and send the (possibly incomplete)
+        results of the simulation to the plotting widget
+        """
+        if self.sender() is not self.sim_worker:
+            return # signal from an old, cancelled simulation
+        self.sim_thread.quit()
+        self.sim_thread.wait()
+        self.sim_thread = self.sim_worker = None
+        self.t_resp = time.process_time()
+        self.fx_results = result['fx_results']
+        if 'fx_verify' in result:
+            self.fx_verify = result['fx_verify']
+
+        if result['error'] is not None: # the error message has been logged by the worker
+            logger.error('Fixpoint simulation failed for stimulus with shape {0}'
+                         .format(np.shape(self.fx_stimulus)))
             self.fx_results = None
             qstyle_widget(self.butSimHDL, "error")
             self.sig_tx.emit({'sender':__name__, 'fx_sim':'error'})
             return
-        except AssertionError as e:
-            logger.error('Fixpoint simulation failed for dict\n{0}'
-                         '\twith msg. "{1}"\n\tStimuli: Shape {2} of type "{3}"'
-                         '\n\tResponse: Shape {4} of type "{5}"'\
-                           .format(pprint_log(dict_sig), e, 
-                                   np.shape(dict_sig['fx_stimulus']),
-                                   dict_sig['fx_stimulus'].dtype,
+
+        if self.fx_results is None or len(self.fx_results) == 0:
+            logger.warning("Fixpoint simulation returned empty results!")
+        else:
+            logger.debug('Fixpoint simulation successful:'
+                         '\n\tStimuli: Shape {0} of type "{1}"'
+                         '\n\tResponse: Shape {2} of type "{3}"'\
+                           .format(np.shape(self.fx_stimulus),
+                                   self.fx_stimulus.dtype,
                                    np.shape(self.fx_results),
                                    type(self.fx_results)
                                     ))
-
-            self.fx_results = None
-            qstyle_widget(self.butSimHDL, "error")
-            self.sig_tx.emit({'sender':__name__, 'fx_sim':'error'})
-            return
+        if result['cancelled']:
+            logger.warning('Fixpoint simulation [{0:5.3g} ms]: Cancelled after {1} of {2} samples'\
+                           .format((self.t_resp - self.t_stim)*1000,
+                                   len(self.fx_results), len(self.fx_stimulus)))
+            qstyle_widget(self.butSimHDL, "changed")
+        else:
+            logger.info('Fixpoint simulation [{0:5.3g} ms]: Response calculated'\
+                        .format((self.t_resp - self.t_stim)*1000))
+            qstyle_widget(self.butSimHDL, "normal")
 
         logger.debug("Sending fixpoint results")
-        dict_sig = {'sender':__name__, 'fx_sim':'set_results', 
-                    'fx_results':self.fx_results }            
-        self.sig_tx.emit(dict_sig)
-        qstyle_widget(self.butSimHDL, "normal")
+        self.sig_tx.emit({'sender':__name__, 'fx_sim':'set_results',
+                          'fx_results':self.fx_results, 'fx_rate':self.fx_rate(),
+                          'fx_cancelled':result['cancelled']})
         return
 
+#------------------------------------------------------------------------------
+    def fx_sim_cancel(self, wait=False):
+        """
+        Cancel a running fixpoint simulation. The worker stops at the next
+        progress report and returns the results calculated so far via
+        :meth:`fx_sim_finished`.
+
+        With `wait=True`, block until the simulation thread has terminated and
+        discard its results.
+        """
+        if self.sim_thread is None:
+            return
+        self.sim_worker.cancel()
+        if wait:
+            self.sim_worker.sig_finished.disconnect()
+            self.sim_worker.sig_progress.disconnect()
+            self.sim_thread.quit()
+            self.sim_thread.wait()
+            self.sim_thread = self.sim_worker = None
+            logger.warning("Running fixpoint simulation has been aborted.")
+
+#------------------------------------------------------------------------------
+    def fx_verify_windows(self, N):
+        """
+        Place `N_verify_win` windows with `L_verify_win` samples randomly in a
+        stimulus with `N` samples for :meth:`fx_sim_verify`. This accesses the
+        fixpoint widget and has to be called in the GUI thread.
+
+        Returns
+        -------
+        tuple
+            `(starts, L, N_settle)` with the sorted start indices `starts` and
+            the length `L` of the windows and the settling time `N_settle` of
+            the filter
+        """
+        L = min(self.L_verify_win, N)
+        N_settle = self.fx_wdg_inst.settling_time(N_max=N)
+        starts = np.sort(np.random.choice(N - L + 1, replace=False,
+                                          size=min(self.N_verify_win, N - L + 1)))
+        return starts, L, N_settle
+
+#------------------------------------------------------------------------------
+    def fx_sim_verify(self, stimulus, fx_stages, windows, progress=None):
+        """
+        Cross-verify the response of the NumPy model of the fixpoint filter with
+        the migen simulation. Only some randomly placed windows of the stimulus
+        are simulated with migen, each window is preceded by the settling time
+        of the filter to obtain the same filter state as the model.
+
+        A migen module can only be simulated once, hence all windows are
+        simulated in one run of the module constructed by :meth:`fx_sim_init`
+        in the GUI thread: The segments (settling time + window) are concatenated,
+        overlapping segments are merged.
+
+        Parameters
+        ----------
+        stimulus: ndarray of integers
+            complete stimulus in integer format
+
+        fx_stages: dict
+            responses of all stages of the model for the complete stimulus as
+            returned by ``run_sim_np(stimulus, stages=True)``
+
+        windows: tuple
+            `(starts, L, N_settle)` as returned by :meth:`fx_verify_windows`
+
+        progress: callable or None
+            callback `progress(n, results)` of :class:`FX_Sim_Worker`, called
+            during the migen simulation with the corresponding sample index `n`
+            of the stimulus. The verification is stopped when it returns False.
+
+        Returns
+        -------
+        dict or None
+            None when the responses are identical, otherwise a dict with the
+            first mismatching sample index 'n', the 'stage' and the values
+            'model' and 'migen' and the differing 'bits' at this index. The
+            result is passed on as 'fx_verify' by the worker and stored in
+            `self.fx_verify` by :meth:`fx_sim_finished` in the GUI thread.
+        """
+        t_start = time.process_time()
+
+        starts, L, N_settle = windows
+        segs = [] # [start, stop] of the simulated segments of the stimulus
+        for s in starts:
+            s0 = max(s - N_settle, 0) # start simulation before window
+            if segs and s0 <= segs[-1][1]:
+                segs[-1][1] = s + L
+            else:
+                segs.append([s0, s + L])
+        # start index of each segment in the concatenated stimulus
+        offsets = np.cumsum([0] + [b - a for a, b in segs])
+
+        def sim_progress(n, outputs):
+            k = np.searchsorted(offsets, n, side='right') - 1
+            n_stim = segs[k][0] + n - offsets[k]
+            return progress(n_stim, fx_stages['QO'][:n_stim])
+
+        if progress is not None and\
+                'progress' in inspect.signature(self.fx_wdg_inst.run_sim).parameters:
+            ref = self.fx_wdg_inst.run_sim(
+                np.concatenate([stimulus[a:b] for a, b in segs]), stages=True,
+                progress=sim_progress)
+        else:
+            ref = self.fx_wdg_inst.run_sim(
+                np.concatenate([stimulus[a:b] for a, b in segs]), stages=True)
+
+        stages = list(fx_stages.keys()) # ordered from input to output
+        mismatch = None
+        N_win = 0 # number of verified windows
+        k = 0 # current segment
+        for s in starts:
+            while s >= segs[k][1]:
+                k += 1
+            n0 = offsets[k] + s - segs[k][0] # window start in the migen response
+            if n0 + L > len(ref[stages[-1]]):
+                break # simulation has been cancelled
+            N_win += 1
+            for stage in stages:
+                diff = np.flatnonzero(np.asarray(ref[stage][n0:n0 + L])
+                                      != fx_stages[stage][s:s + L])
+                if len(diff) == 0:
+                    continue
+                n = s + diff[0]
+                if mismatch is None or (n, stages.index(stage))\
+                        < (mismatch['n'], stages.index(mismatch['stage'])):
+                    mismatch = {'n':int(n), 'stage':stage,
+                                'model':int(fx_stages[stage][n]),
+                                'migen':int(ref[stage][n - s + n0])}
+
+        t_verify = (time.process_time() - t_start) * 1000
+        if mismatch is None:
+            logger.info("Fixpoint verification [{0:5.3g} ms]: Model and migen simulation "
+                        "match for {1} windows with {2} samples".format(
+                            t_verify, N_win, L))
+        else:
+            # differing bits in two's complement format
+            W = max(abs(mismatch['model']), abs(mismatch['migen'])).bit_length() + 1
+            mismatch['bits'] = format((mismatch['model'] ^ mismatch['migen'])
+                                      & ((1 << W) - 1), '0{0}b'.format(W))
+            logger.warning("Fixpoint verification [{0:5.3g} ms]: First mismatch at n = {1} "
+                           "in stage '{2}': model = {3}, migen = {4}, differing bits: {5}"
+                           .format(t_verify, mismatch['n'], mismatch['stage'],
+                                   mismatch['model'], mismatch['migen'], mismatch['bits']))
+        return mismatch
+
 ###############################################################################
 
 if __name__ == '__main__':
@@ -26,7 +26,7 @@ import scipy.signal as sig
 
 import pyfda.filterbroker as fb # importing filterbroker initializes all its globals
 import pyfda.filter_factory as ff # importing filterbroker initializes all its globals
-from pyfda.libs.pyfda_lib import lin2unit, mod_version, to_html, safe_eval
+from pyfda.libs.pyfda_lib import lin2unit, mod_version, to_html, safe_eval, calc_Hcomplex
 from pyfda.input_widgets.input_info_about import AboutWindow#about_window
 from pyfda.pyfda_rc import params
 # TODO: Passband and stopband info should show min / max values for each band
@@ -294,8 +294,6 @@ class Input_Info(QWidget):
         specs are violated, colour the table entry in red.
         """
 
-        antiC = False
-
         def _find_min_max(self, f_start, f_stop, unit = 'dB'):
             """
             Find minimum and maximum magnitude and the corresponding frequencies
@@ -303,19 +301,8 @@ class Input_Info(QWidget):
             [f_start, f_stop].
             """
             w = np.linspace(f_start, f_stop, params['N_FFT'])*2*np.pi
-            [w, H] = sig.freqz(bb, aa, worN = w)
-
-            # add antiCausals if we have them
-            if (antiC):
-               #
-               # Evaluate transfer function of anticausal half on the same freq grid.
-               #
-               wa, ha = sig.freqz(bbA, aaA, worN = w)
-               ha = ha.conjugate()
-               #
-               # Total transfer function is the product
-               #
-               H = H*ha
+            # memoized response, including antiCausals if we have them
+            [w, H] = calc_Hcomplex(fb.fil[0], w, True)
 
             f = w / (2.0 * pi) # frequency normalized to f_S
             H_abs = abs(H)
@@ -332,17 +319,6 @@ class Input_Info(QWidget):
         self.tblFiltPerf.setVisible(self.butFiltPerf.isChecked())
         if self.butFiltPerf.isChecked():
 
-            bb = fb.fil[0]['ba'][0]
-            aa = fb.fil[0]['ba'][1]
-
-            #'rpk' means nonCausal filter
-            if 'rpk' in fb.fil[0]:
-                antiC = True
-                bbA = fb.fil[0]['baA'][0]
-                aaA = fb.fil[0]['baA'][1]
-                bbA = bbA.conjugate()
-                aaA = aaA.conjugate()
-
             f_S  = fb.fil[0]['f_S']
 
             f_lbls = []
@@ -413,12 +389,8 @@ class Input_Info(QWidget):
                 logger.debug("F_test_labels = %s" %f_lbls)
 
                 # Calculate frequency response at test frequencies
-                [w_test, a_test] = sig.freqz(bb, aa, 2.0 * pi * f_vals.astype(np.float))
-                # add antiCausals if we have them
-                if (antiC):
-                   wa, ha = sig.freqz(bbA, aaA, 2.0 * pi * f_vals.astype(np.float))
-                   ha = ha.conjugate()
-                   a_test = a_test*ha
+                # (including antiCausals if we have them)
+                [w_test, a_test] = calc_Hcomplex(fb.fil[0], 2.0 * pi * f_vals.astype(np.float), True)
 
 
             (F_min, H_min, F_max, H_max) = _find_min_max(self, 0, 1, unit = 'V')
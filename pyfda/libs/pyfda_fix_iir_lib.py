@@ -0,0 +1,478 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the pyFDA project hosted at https://github.com/chipmuenk/pyfda
+#
+# Copyright © pyFDA Project Contributors
+# Licensed under the terms of the MIT License
+# (see file LICENSE in root directory for details)
+
+"""
+Bit-exact fixpoint simulation of recursive (IIR) filters in integer arithmetics
+
+Recursive filters cannot be vectorized without losing bit-exactness, the
+sample loops are compiled with numba when it is installed. Otherwise (and
+for word lengths that don't fit into 64 bit integers), the same code runs as
+pure Python with python integers.
+
+Cascades of second-order sections are simulated section by section, the
+sections can be scaled and ordered for minimum roundoff noise in floating
+point before quantizing the coefficients.
+"""
+import os
+import math
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import logging
+logger = logging.getLogger(__name__)
+
+import numpy as np
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """ Dummy decorator returning the undecorated function without numba """
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+QUANT = {'floor':0, 'round':1, 'fix':2} #: codes for requantization methods
+
+#------------------------------------------------------------------------------
+def requant_par(QI, QO):
+    """
+    Return a tuple `(dWF, quant, W_i, W_o, sat)` with the parameters for
+    requantizing from format `QI` to format `QO` with :func:`requant_int`,
+    following the rules of :func:`pyfda.fixpoint_widgets.fixpoint_helpers.requant`:
+
+    - `dWF`: number of fractional bits to be removed (or added when negative)
+
+    - `quant`: code for ``QO['quant']``, see `QUANT`
+
+    - `W_i`: word length of the intermediate result
+
+    - `W_o`: word length of the output
+
+    - `sat`: 1 for saturation (only when the number of integer bits is reduced),
+      0 for two's complement wrap-around
+    """
+    W_i = QI['WI'] + QI['WF'] + 1
+    W_o = QO['WI'] + QO['WF'] + 1
+    dWF = QI['WF'] - QO['WF']
+    if dWF > 0 and QO['quant'] not in QUANT:
+        raise Exception(u'Unknown quantization method "%s"!'%(QO['quant']))
+    if QO['ovfl'] not in {'sat', 'wrap'}:
+        raise Exception(u'Unknown overflow method "%s"!'%(QO['ovfl']))
+    sat = int(QI['WI'] > QO['WI'] and QO['ovfl'] == 'sat')
+    return (dWF, QUANT.get(QO['quant'], 0), max(W_i, W_o), W_o, sat)
+
+#------------------------------------------------------------------------------
+@njit(cache=True)
+def wrap_int(x, W):
+    """
+    Wrap integer `x` to the range of a signed `W` bit word
+    """
+    offset = 1 << (W - 1)
+    return ((x + offset) & ((1 << W) - 1)) - offset
+
+@njit(cache=True)
+def ovfl_int(x, W, sat):
+    """
+    Saturate (`sat == 1`) or wrap integer `x` to the range of a signed `W` bit word
+    """
+    if sat:
+        MAX = (1 << (W - 1)) - 1
+        if x > MAX:
+            return MAX
+        elif x < -MAX - 1:
+            return -MAX - 1
+        return x
+    return wrap_int(x, W)
+
+@njit(cache=True)
+def requant_int(x, rq):
+    """
+    Requantize integer `x` with the parameters `rq` calculated by :func:`requant_par`
+    """
+    dWF = rq[0]
+    if dWF <= 0:
+        x = x << -dWF
+    elif rq[1] == 1: # round: add half an LSB before right shift
+        x = (x + (1 << (dWF - 1))) >> dWF
+    elif rq[1] == 2: # fix: add sign bit as LSB before right shift
+        if x < 0:
+            x = x + (1 << dWF)
+        x = x >> dWF
+    else: # floor
+        x = x >> dWF
+    return ovfl_int(wrap_int(x, rq[2]), rq[3], rq[4])
+
+#------------------------------------------------------------------------------
+@njit(cache=True)
+def _iir_df1(x, b, a, rq_b, rq_a, rq_o, W_A, sat_A, zx, zy, y):
+    """
+    Sample loop for the direct form 1: The delay lines `zx` and `zy` contain
+    past input and output samples, the result is written to `y`.
+    """
+    N = len(zx)
+    for n in range(len(x)):
+        acc = requant_int(b[0] * x[n], rq_b)
+        for k in range(N):
+            acc = ovfl_int(acc + requant_int(b[k+1] * zx[k], rq_b), W_A, sat_A)
+            acc = ovfl_int(acc - requant_int(a[k+1] * zy[k], rq_a), W_A, sat_A)
+        y[n] = requant_int(acc, rq_o)
+        for k in range(N-1, 0, -1):
+            zx[k] = zx[k-1]
+            zy[k] = zy[k-1]
+        if N > 0:
+            zx[0] = x[n]
+            zy[0] = y[n]
+    return y
+
+@njit(cache=True)
+def _iir_df2t(x, b, a, rq_b, rq_a, rq_o, W_A, sat_A, s, y):
+    """
+    Sample loop for the transposed direct form 2: The states `s` are stored
+    in accumulator format, the result is written to `y`.
+    """
+    N = len(s)
+    for n in range(len(x)):
+        acc = requant_int(b[0] * x[n], rq_b)
+        if N > 0:
+            acc = ovfl_int(acc + s[0], W_A, sat_A)
+        y[n] = requant_int(acc, rq_o)
+        for k in range(N):
+            acc = requant_int(b[k+1] * x[n], rq_b)
+            acc = ovfl_int(acc - requant_int(a[k+1] * y[n], rq_a), W_A, sat_A)
+            if k < N - 1:
+                acc = ovfl_int(acc + s[k+1], W_A, sat_A)
+            s[k] = acc
+    return y
+
+#------------------------------------------------------------------------------
+def iir_fx(p, x, structure='DF1', zi=None):
+    """
+    Calculate the bit-exact response of a fixpoint IIR filter with integer
+    coefficients for the integer stimulus `x`.
+
+    The products of coefficients and signals are requantized to the
+    accumulator format `p['QA']`, the accumulator saturates or wraps around
+    after each addition and the result is requantized to the output format
+    `p['QO']`. The quantized output is fed back. Requantization uses the same
+    rules as the migen filters (see :func:`requant_par`).
+
+    Parameters
+    ----------
+    p: dict
+        `fxqc` dict with the formats 'QI' (input), 'QCB' and 'QCA' (coefficients),
+        'QA' (accumulator) and 'QO' (output) and the integer coefficients
+        'b' and 'a'. The coefficients need to be normalized, `a[0]`
+        (representing 1) is ignored.
+
+    x: array-like of integers
+        stimulus in integer format `p['QI']`, this is wrapped to the input
+        word length like the input signal of a migen filter
+
+    structure: str
+        filter structure, 'DF1' (direct form 1) or 'DF2T' (transposed direct
+        form 2)
+
+    zi: array-like of integers or None
+        initial filter state as returned by a previous call, e.g. for
+        processing a long stimulus block by block. Use `None` for starting
+        with zero states.
+
+    Returns
+    -------
+    y : ndarray of integers
+        response in integer format `p['QO']`
+
+    zf : ndarray of integers
+        final filter state, this is only returned when `zi` is not None. For
+        'DF1', it contains the delayed input and output samples, for 'DF2T'
+        the states in accumulator format.
+
+    Examples
+    --------
+    >>> p = {'QI':{'WI':0, 'WF':7}, 'QCB':{'WI':0, 'WF':7}, 'QCA':{'WI':1, 'WF':6},
+    ...      'QA':{'WI':1, 'WF':14, 'ovfl':'wrap', 'quant':'floor'},
+    ...      'QO':{'WI':0, 'WF':7, 'ovfl':'sat', 'quant':'round'},
+    ...      'b':[64], 'a':[64, -32]} # y[n] = x[n]/2 + y[n-1]/2
+    >>> iir_fx(p, [100, 0, 0, 0])
+    array([50, 25, 13,  7])
+    """
+    b = [int(c) for c in p['b']]
+    a = [int(c) for c in p['a']]
+    N = max(len(b), len(a)) - 1
+    b += [0] * (N + 1 - len(b))
+    a += [0] * (N + 1 - len(a))
+
+    QI, QCB, QCA, QA, QO = p['QI'], p['QCB'], p['QCA'], p['QA'], p['QO']
+    # full precision formats of the feedforward and feedback products
+    QPB = {'WI':QI['WI'] + QCB['WI'] + 1, 'WF':QI['WF'] + QCB['WF']}
+    QPA = {'WI':QO['WI'] + QCA['WI'] + 1, 'WF':QO['WF'] + QCA['WF']}
+    rq_b = requant_par(QPB, QA)
+    rq_a = requant_par(QPA, QA)
+    rq_o = requant_par(QA, QO)
+    W_A = QA['WI'] + QA['WF'] + 1
+    sat_A = int(QA['ovfl'] == 'sat')
+    if QA['ovfl'] not in {'sat', 'wrap'}:
+        raise Exception(u'Unknown overflow method "%s"!'%(QA['ovfl']))
+
+    structure = structure.upper()
+    if structure == 'DF1':
+        N_z = 2 * N
+    elif structure == 'DF2T':
+        N_z = N
+    else:
+        raise Exception(u'Unknown filter structure "%s"!'%(structure))
+    if zi is None:
+        z = [0] * N_z
+    elif len(zi) != N_z:
+        raise ValueError("Initial state needs {0} elements, not {1}!".format(N_z, len(zi)))
+    else:
+        z = [int(z) for z in zi]
+
+    W_I = QI['WI'] + QI['WF'] + 1
+    x = np.asarray(x, dtype=np.int64)
+    if W_I < 64:
+        x = ((x + (1 << (W_I - 1))) & ((1 << W_I) - 1)) - (1 << (W_I - 1))
+
+    # numba needs all intermediate results (including products) to fit into int64
+    W_max = max(rq_b[2], rq_a[2], rq_o[2], W_A + 1, QPB['WI'] + QPB['WF'] + 1,
+                QPA['WI'] + QPA['WF'] + 1, rq_b[2] - rq_b[0], rq_a[2] - rq_a[0])
+    if HAS_NUMBA and W_max < 64:
+        y = np.zeros(len(x), dtype=np.int64)
+        b, a, z = (np.array(v, dtype=np.int64) for v in (b, a, z))
+        rq_b, rq_a, rq_o = (np.array(v, dtype=np.int64) for v in (rq_b, rq_a, rq_o))
+        kernels = (_iir_df1, _iir_df2t)
+    else:
+        # pure Python with (arbitrarily long) python integers
+        y = [0] * len(x)
+        x = x.tolist()
+        kernels = (getattr(_iir_df1, 'py_func', _iir_df1),
+                   getattr(_iir_df2t, 'py_func', _iir_df2t))
+
+    if structure == 'DF1':
+        zx, zy = z[:N], z[N:]
+        kernels[0](x, b, a, rq_b, rq_a, rq_o, W_A, sat_A, zx, zy, y)
+        zf = list(zx) + list(zy)
+    else:
+        kernels[1](x, b, a, rq_b, rq_a, rq_o, W_A, sat_A, z, y)
+        zf = z
+
+    if W_max < 64:
+        y = np.asarray(y, dtype=np.int64)
+        zf = np.asarray(zf, dtype=np.int64)
+    else:
+        y = np.asarray(y, dtype=object)
+        zf = np.asarray(zf, dtype=object)
+
+    if zi is None:
+        return y
+    else:
+        return y, zf
+
+#------------------------------------------------------------------------------
+def sos_fx(p, x, zi=None, stages=False):
+    """
+    Calculate the bit-exact response of a cascade of second-order sections
+    (DF1 biquads) with integer coefficients for the integer stimulus `x`.
+
+    Each section is calculated by :func:`iir_fx` with the structure 'DF1'. The
+    first section reads the input in format `p['QI']`, the last section
+    writes the output in format `p['QO']`, the signals between the sections
+    have the format `p['QS']`. All sections use the coefficient formats
+    `p['QCB']` and `p['QCA']` and the accumulator format `p['QA']`.
+
+    Parameters
+    ----------
+    p: dict
+        `fxqc` dict with the formats 'QI', 'QS', 'QO', 'QCB', 'QCA' and 'QA' and
+        the integer coefficients 'sos' (one row `[b0, b1, b2, a0, a1, a2]` per
+        section, `a0` is ignored)
+
+    x: array-like of integers
+        stimulus in integer format `p['QI']`
+
+    zi: array-like of integers or None
+        initial states of the sections (shape `(L, 4)`) as returned by a
+        previous call or `None` for starting with zero states.
+
+    stages: bool
+        When True, return a list with the responses of all sections instead of
+        the output response only
+
+    Returns
+    -------
+    y : ndarray of integers or list of ndarrays
+        response in integer format `p['QO']` (or list of section responses)
+
+    zf : ndarray of integers
+        final states of the sections, this is only returned when `zi` is not None
+    """
+    sos = p['sos']
+    L = len(sos)
+    if L == 0:
+        raise ValueError("No second-order sections!")
+    y = x
+    ys = []
+    zf = []
+    for k, s in enumerate(sos):
+        p_k = {'QI':p['QI'] if k == 0 else p['QS'], 'QO':p['QO'] if k == L - 1 else p['QS'],
+               'QCB':p['QCB'], 'QCA':p['QCA'], 'QA':p['QA'], 'b':s[:3], 'a':s[3:]}
+        if zi is None:
+            y = iir_fx(p_k, y, 'DF1')
+        else:
+            y, z = iir_fx(p_k, y, 'DF1', zi=zi[k])
+            zf.append(z)
+        ys.append(y)
+    y = ys if stages else y
+    if zi is None:
+        return y
+    else:
+        return y, np.array(zf, dtype=np.asarray(zf[0]).dtype)
+
+#------------------------------------------------------------------------------
+def _sos_freqz(sos, N_FFT):
+    """
+    Return the frequency responses of the numerators and the denominators of
+    the sections `sos` on `N_FFT` points of the unit circle (arrays of shape
+    `(L, N_FFT)`)
+    """
+    sos = np.asarray(sos, dtype=float)
+    return np.fft.fft(sos[:, :3], N_FFT, axis=1), np.fft.fft(sos[:, 3:], N_FFT, axis=1)
+
+def _sos_scale_factors(B, A, norm):
+    """
+    Return the scale factors for the numerators `B` of the sections for the
+    norm 'l2' or 'linf', see :func:`sos_scale`.
+    """
+    L = len(B)
+    s = np.ones(L)
+    G = np.ones(B.shape[1], dtype=complex)
+    for k in range(L - 1):
+        G = G * B[k] / A[k]
+        if norm == 'l2':
+            n = np.sqrt(np.mean(np.abs(G)**2)) # Parseval
+        elif norm == 'linf':
+            n = np.max(np.abs(G))
+        else:
+            raise Exception(u'Unknown norm "%s"!'%(norm))
+        s[k] = 1. / n
+        G *= s[k]
+    s[-1] = 1. / np.prod(s[:-1]) # restore overall gain
+    return s
+
+def _sos_noise_gain(B, A):
+    """
+    Return the roundoff noise gain of the cascade with numerators `B` and
+    denominators `A`, see :func:`sos_noise_gain`.
+    """
+    NG = 0.
+    G = np.ones(B.shape[1], dtype=complex)
+    for k in reversed(range(len(B))):
+        NG += np.mean(np.abs(G / A[k])**2)
+        G = G * B[k] / A[k]
+    return NG
+
+def _sos_perm_noise(args):
+    """ Return the noise gains of the scaled cascades for a list of permutations """
+    B, A, perms, norm = args
+    NG = []
+    for perm in perms:
+        B_p, A_p = B[list(perm)], A[list(perm)]
+        if norm is not None:
+            B_p = B_p * _sos_scale_factors(B_p, A_p, norm)[:, None]
+        NG.append(_sos_noise_gain(B_p, A_p))
+    return NG
+
+#------------------------------------------------------------------------------
+def sos_scale(sos, norm='l2', N_FFT=4096):
+    """
+    Scale the numerators of the second-order sections `sos` to avoid
+    overflows between the sections: The norm of the transfer function from
+    the input to the output of each section (except the last one) is set to 1,
+    the last section restores the overall gain.
+
+    Parameters
+    ----------
+    sos: array-like
+        second-order sections with shape `(L, 6)`
+
+    norm: str
+        'l2' (scaling for the signal power of white noise, tolerating occasional
+        overflows) or 'linf' (no overflows for sinusoidal signals)
+
+    N_FFT: int
+        number of frequency points for calculating the norms
+
+    Returns
+    -------
+    ndarray
+        scaled sections with the same overall transfer function
+    """
+    sos = np.array(sos, dtype=float)
+    B, A = _sos_freqz(sos, N_FFT)
+    sos[:, :3] *= _sos_scale_factors(B, A, norm.lower())[:, None]
+    return sos
+
+#------------------------------------------------------------------------------
+def sos_noise_gain(sos, N_FFT=4096):
+    """
+    Return the roundoff noise gain of a cascade of DF1 second-order sections:
+    The quantization noise injected at the accumulator of section `k` is
+    filtered by the recursive part `1/A_k` of the section and by all following
+    sections, the noise gain is the sum of the energies of the corresponding
+    impulse responses.
+    """
+    return _sos_noise_gain(*_sos_freqz(sos, N_FFT))
+
+#------------------------------------------------------------------------------
+def sos_order(sos, norm='l2', max_perm=720, N_FFT=2048, n_jobs=1):
+    """
+    Find the order of the second-order sections `sos` that minimizes the
+    roundoff noise gain (see :func:`sos_noise_gain`) after scaling with `norm`
+    (see :func:`sos_scale`, `None` for no scaling).
+
+    When the number of permutations exceeds `max_perm`, only the sections
+    ordered by increasing and by decreasing pole radius are compared.
+    Otherwise, all permutations are compared. By default, they are evaluated
+    serially, the default `max_perm = 720` only takes a fraction of a second.
+    With a larger `max_perm`, they can be distributed over a process pool with
+    `n_jobs` workers (`None`: number of CPUs, 1: no pool); up to `7! = 5040`
+    permutations are always compared without a pool as starting the pool
+    takes longer than the evaluation.
+
+    Returns
+    -------
+    tuple
+        indices of the sections in the optimized order
+    """
+    sos = np.asarray(sos, dtype=float)
+    L = len(sos)
+    if math.factorial(L) <= max_perm:
+        perms = list(itertools.permutations(range(L)))
+    else:
+        radius = [np.max(np.abs(np.roots(s[3:])), initial=0) for s in sos]
+        perm = tuple(int(k) for k in np.argsort(radius))
+        perms = [perm, perm[::-1]]
+    B, A = _sos_freqz(sos, N_FFT)
+    norm = norm.lower() if norm is not None else None
+
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    if len(perms) <= 5040: # not worth starting a process pool
+        n_jobs = 1
+    n_jobs = min(n_jobs, len(perms))
+    chunks = [perms[k::n_jobs] for k in range(n_jobs)]
+    if n_jobs > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            NG_chunks = list(pool.map(_sos_perm_noise, [(B, A, c, norm) for c in chunks]))
+    else:
+        NG_chunks = [_sos_perm_noise((B, A, perms, norm))]
+    NG, perm = min((ng, perm) for c, ngs in zip(chunks, NG_chunks) for perm, ng in zip(c, ngs))
+    logger.debug("Noise gain of optimized section order {0}: {1:.3g}".format(perm, NG))
+    return perm
@@ -13,6 +13,7 @@ numpy values and formatting reals in various formats
 #===========================================================================
 import re
 import logging
+from functools import lru_cache
 logger = logging.getLogger(__name__)
 
 import numpy as np
@@ -25,10 +26,43 @@ except ImportError:
     DS = False
 
 # TODO: Absolute value for WI is taken, no negative WI specifications possible
-# TODO: Vecorization for hex / csd functions (frmt2float)
 
 __version__ = 0.6
 
+# default parameters for synthesizing the NTF of the delta-sigma modulator
+DSM_DEFAULTS = {'order':3, 'osr':64, 'opt':1, 'H_inf':1.5}
+
+@lru_cache(maxsize=32)
+def synthesize_ntf(order=3, osr=64, opt=1, H_inf=1.5):
+    """
+    Synthesize the noise transfer function (NTF) of a delta-sigma modulator
+    with `deltasigma.synthesizeNTF()`. As this is an optimization which costs
+    far more than the modulation itself, the result is memoized for each set
+    of parameters.
+
+    Parameters
+    ----------
+    order: integer
+        order of the NTF
+
+    osr: integer
+        oversampling ratio
+
+    opt: integer
+        flag for optimized placement of NTF zeros (0 ... 4)
+
+    H_inf: float
+        maximum out-of-band gain of the NTF
+
+    Returns
+    -------
+    NTF in zpk format as returned by `synthesizeNTF()`, don't modify it!
+    """
+    if not DS:
+        raise Exception('"deltasigma" Toolbox not found.\n'
+                        'Try installing it with "pip install deltasigma".')
+    return synthesizeNTF(order=order, osr=osr, opt=opt, H_inf=H_inf)
+
 def qstr(text):
     """ carefully replace qstr() function - only needed for Py2 compatibility """
     return str(text)
@@ -213,7 +247,140 @@ def dec2csd(dec_val, WF=0):
 
     return csd_str
 
-dec2csd_vec = np.frompyfunc(dec2csd, 2, 1)
+#------------------------------------------------------------------------------
+def dec2csd_mat(dec_val, WF=0):
+    """
+    Convert the array `dec_val` to a matrix of canonical signed digits.
+
+    The values are scaled by :math:`2^{WF}` and rounded to integers. The non-adjacent
+    form (NAF) of the magnitude is calculated with integer bit operations
+    (the bits of `x ^ 3x` mark the nonzero digits), the digits are extracted
+    by shifting and masking.
+
+    Parameters
+    ----------
+
+    dec_val : scalar or array-like (integer or real)
+              decimal value(s) to be converted to CSD format, the magnitude
+              must be less than :math:`2^{63 - WF}`
+
+    WF: integer
+        number of fractional places. Default is WF = 0 (integer number)
+
+    Returns
+    -------
+    ndarray of `np.int8`
+        with the shape of `dec_val` plus a last axis for the digits with the
+        values -1, 0, +1, starting with the MSB. The last digit has the
+        weight :math:`2^{-WF}`.
+
+    Examples
+    --------
+
+    >>> dec2csd_mat([7, -6])
+    array([[ 1,  0,  0, -1],
+           [-1,  0,  1,  0]], dtype=int8)
+    """
+    x = np.rint(np.asarray(dec_val, dtype=np.float64) * 2.**WF).astype(np.int64)
+    neg = x < 0
+    # magnitude as uint64 (two's complement for negative values), this also
+    # works for x = -2**63
+    with np.errstate(over='ignore'):
+        x = x.astype(np.uint64)
+        x = np.where(neg, ~x + np.uint64(1), x)
+
+    # x + (x >> 1) = 3x/2 doesn't overflow, the digit positions are shifted
+    # down by one bit compared to 3x and x:
+    xh = x >> np.uint64(1)
+    x3 = x + xh
+    c = xh ^ x3
+    d_pos = x3 & c # bits of positive digits
+    d_neg = xh & c # bits of negative digits
+
+    # number of digits (may be overestimated by one due to float rounding)
+    P = max(int(np.max(np.frexp(np.float64(d_pos | d_neg))[1], initial=0)), 1)
+    shifts = np.arange(P - 1, -1, -1, dtype=np.uint64)
+    csd_mat = ((d_pos[..., None] >> shifts) & np.uint64(1)).astype(np.int8)\
+        - ((d_neg[..., None] >> shifts) & np.uint64(1)).astype(np.int8)
+
+    return np.where(neg[..., None], -csd_mat, csd_mat).astype(np.int8)
+
+#------------------------------------------------------------------------------
+def csd_mat2str(csd_mat, WF=0):
+    """
+    Render a matrix of canonical signed digits as created by `dec2csd_mat()`
+    to CSD strings consisting of '+', '-', '0' and '.' characters.
+
+    Leading zeros are stripped, when `WF > 0` a radix point is inserted
+    before the last `WF` digits and at least one digit is kept before the
+    radix point. Zero is returned as '0'.
+
+    Parameters
+    ----------
+
+    csd_mat : array-like of integer
+        digits (-1, 0, +1) along the last axis, MSB first
+
+    WF: integer
+        number of fractional places. Default is WF = 0 (integer number)
+
+    Returns
+    -------
+    string or ndarray of strings
+        with the shape of `csd_mat` without the last axis
+    """
+    csd_mat = np.asarray(csd_mat, dtype=np.int8)
+    shape = csd_mat.shape[:-1]
+    csd_mat = csd_mat.reshape(-1, csd_mat.shape[-1])
+    N, P = csd_mat.shape
+    if P < WF + 1: # provide at least one integer digit
+        csd_mat = np.hstack((np.zeros((N, WF + 1 - P), dtype=np.int8), csd_mat))
+        P = WF + 1
+
+    # look-up table for the characters -> '-' (index 0), '0' (1), '+' (2)
+    chars = np.frombuffer(b'-0+', dtype=np.uint8)[csd_mat + 1]
+    if WF > 0: # insert radix point
+        chars = np.hstack((chars[:, :P - WF], np.full((N, 1), ord('.'), dtype=np.uint8),
+                           chars[:, P - WF:]))
+
+    # position of the first nonzero digit, limited to the integer digit before
+    # the radix point, then shift all rows to the left
+    nonzero = csd_mat != 0
+    first = np.where(nonzero.any(axis=1), np.argmax(nonzero, axis=1), P)
+    first = np.minimum(first, P - WF - 1)
+    L = chars.shape[1]
+    idx = np.arange(L) + first[:, None]
+    chars = np.where(idx < L, np.take_along_axis(chars, np.minimum(idx, L - 1), axis=1), 0)
+    chars[~nonzero.any(axis=1)] = 0
+    chars[~nonzero.any(axis=1), 0] = ord('0')
+
+    csd_str = np.ascontiguousarray(chars).view('S{0}'.format(L)).reshape(shape).astype(str)
+    if csd_str.ndim == 0:
+        return str(csd_str)
+    return csd_str
+
+#------------------------------------------------------------------------------
+def dec2csd_vec(dec_val, WF=0):
+    """
+    Vectorized conversion of `dec_val` to CSD strings via `dec2csd_mat()` and
+    `csd_mat2str()`. The values need to be integer multiples of :math:`2^{-WF}`.
+
+    Parameters
+    ----------
+
+    dec_val : scalar or array-like (integer or real)
+              decimal value(s) to be converted to CSD format
+
+    WF: integer
+        number of fractional places. Default is WF = 0 (integer number)
+
+    Returns
+    -------
+    string or ndarray of strings
+        with the shape of `dec_val`
+    """
+    return csd_mat2str(dec2csd_mat(dec_val, WF), WF)
+
 
 def csd2dec(csd_str):
     """
@@ -265,8 +432,142 @@ def csd2dec(csd_str):
 
     return dec_val
 
-#csd2dec_vec = np.frompyfunc(csd2dec, 1, 1)
-csd2dec_vec = np.vectorize(csd2dec) # safer than np.frompyfunc()
+#------------------------------------------------------------------------------
+def csd2dec_vec(csd_str):
+    """
+    Vectorized version of `csd2dec()`: Convert the CSD string(s) `csd_str` to
+    decimal values. The strings are converted to a matrix of code points, the
+    decimal values are calculated column by column with Horner's scheme.
+
+    Parameters
+    ----------
+
+    csd_str : string or array-like of strings
+        Strings with the CSD values to be converted, consisting of '+', '-', '.'
+        and '0' characters. All other characters are regarded as zeros.
+
+    Returns
+    -------
+    ndarray of `np.float64`
+        decimal (integer) values with the shape of `csd_str`
+    """
+    csd_str = np.asarray(csd_str).astype(str)
+    shape = csd_str.shape
+    L = csd_str.dtype.itemsize // 4
+    dec_val = np.zeros(csd_str.size)
+    if L > 0 and csd_str.size > 0:
+        c = np.ascontiguousarray(csd_str.ravel()).view(np.uint32).reshape(-1, L)
+        sign = np.where(c == ord('+'), 1., np.where(c == ord('-'), -1., 0.))
+        for col in range(L): # Horner's scheme, skipping the padding at the end
+            dec_val = np.where(c[:, col] != 0, 2 * dec_val + sign[:, col], dec_val)
+    return dec_val.reshape(shape)
+
+#------------------------------------------------------------------------------
+def _cse_pairs(terms):
+    """
+    Return a dict with the non-overlapping pairs of `terms` (as index tuples)
+    for each pattern `(id_a, shift, sign, id_b)`, see :func:`csd_cse`.
+    """
+    pairs = {}
+    used = {} # indices of terms already used for each pattern
+    order = sorted(range(len(terms)), key=lambda i: -terms[i][1]) # MSB first
+    for n, i in enumerate(order):
+        for j in order[n+1:]:
+            (s_i, k_i, id_i), (s_j, k_j, id_j) = terms[i], terms[j]
+            key = (id_i, k_i - k_j, s_i * s_j, id_j)
+            u = used.setdefault(key, set())
+            if i not in u and j not in u:
+                u.update((i, j))
+                pairs.setdefault(key, []).append((i, j))
+    return pairs
+
+def csd_cse(coeffs, cse=True):
+    """
+    Decompose the multiplications of a signal `x` with the integer coefficients
+    `coeffs` into shift-and-add networks (multiple constant multiplication)
+    using the CSD digits of the coefficients.
+
+    Only the distinct odd "fundamentals" `f` of the coefficient magnitudes
+    are calculated, a coefficient `c = +/- f * 2**k` only needs a shift and
+    possibly a negation. Each non-zero CSD digit of `f` yields a shifted
+    (and possibly negated) copy of `x`.
+
+    With `cse = True`, common subexpressions are shared between (and within)
+    the fundamentals: The pair of terms with the same relative shift and sign
+    that occurs most often is replaced by a new subexpression until no pattern
+    occurs more than once (Hartley's algorithm).
+
+    Parameters
+    ----------
+    coeffs : array-like of integers
+        coefficients
+
+    cse : bool
+        eliminate common subexpressions when True
+
+    Returns
+    -------
+    subs : list of tuples
+        Definition of the subexpressions: Entry `n` in the form
+        `(id_a, shift, sign, id_b)` defines subexpression `x_{n+1} =
+        sign * (x_{id_a} << shift) + x_{id_b}` with `x_0 = x`, requiring one
+        adder (or subtractor) each.
+
+    terms : dict
+        Terms for each fundamental `f` as a list of tuples `(sign, shift, id)`,
+        `f * x = sum(sign * (x_{id} << shift))`. Summing `M` terms requires
+        `M - 1` adders.
+
+    Examples
+    --------
+    >>> subs, terms = csd_cse([45, 75, 90])
+    >>> subs
+    [(0, 4, -1, 0)]
+    >>> terms # x_1 = x - (x << 4) = -15 * x
+    {45: [(-1, 2, 1), (1, 0, 1)], 75: [(-1, 2, 1), (-1, 0, 1)]}
+    """
+    fundamentals = set()
+    for c in coeffs:
+        c = abs(int(c))
+        if c:
+            fundamentals.add(c >> ((c & -c).bit_length() - 1)) # strip trailing zeros
+    terms = {}
+    for f in sorted(fundamentals):
+        digits = dec2csd_mat(f)
+        P = len(digits)
+        terms[f] = [(int(d), P - 1 - i, 0) for i, d in enumerate(digits) if d]
+
+    subs = []
+    while cse:
+        counts = {}
+        for t in terms.values():
+            for key, p in _cse_pairs(t).items():
+                counts[key] = counts.get(key, 0) + len(p)
+        if not counts:
+            break
+        # most frequent pattern, ties are resolved deterministically
+        key = max(sorted(counts), key=lambda k: counts[k])
+        if counts[key] < 2:
+            break
+        subs.append(key)
+        new_id = len(subs)
+        for f, t in terms.items():
+            p = _cse_pairs(t).get(key, [])
+            # s_i * (x_a << k_i) + s_j * (x_b << k_j) = s_j * (x_new << k_j)
+            new_terms = [(t[j][0], t[j][1], new_id) for (_, j) in p]
+            removed = {i for pair in p for i in pair}
+            terms[f] = sorted([t[i] for i in range(len(t)) if i not in removed]
+                              + new_terms, key=lambda term: -term[1])
+    return subs, terms
+
+#------------------------------------------------------------------------------
+def csd_cse_adders(coeffs, cse=True):
+    """
+    Return the number of adders (and subtractors) required by the shift-and-add
+    network calculated by :func:`csd_cse` for the integer coefficients `coeffs`.
+    """
+    subs, terms = csd_cse(coeffs, cse=cse)
+    return len(subs) + sum(len(t) - 1 for t in terms.values())
 
 #------------------------------------------------------------------------
 class Fixed(object):
@@ -308,8 +609,19 @@ class Fixed(object):
       - 'fix': round to nearest integer towards zero ('Betragsschneiden')
       - 'ceil': smallest integer `I`, such that :math:`I \\ge x`
       - 'rint': round towards nearest int
+      - 'dsm': delta-sigma modulation, requires the `deltasigma` package
       - 'none': no quantization
 
+    * **'dsm'** : dict with parameters of the delta-sigma modulator, optional; only
+      used for `quant == 'dsm'`. Missing keys are taken from the previous setting
+      or from `DSM_DEFAULTS`. When `quant == 'dsm'`, the complete dict is written
+      to `q_obj['dsm']`.
+
+      - 'order': order of the noise transfer function (NTF), default: 3
+      - 'osr': oversampling ratio, default: 64
+      - 'opt': optimized placement of NTF zeros (0 ... 4), default: 1
+      - 'H_inf': maximum out-of-band gain of the NTF, default: 1.5
+
     * **'ovfl'** : Overflow method, optional; default = 'wrap'
 
       - 'wrap': do a two's complement wrap-around
@@ -356,6 +668,9 @@ class Fixed(object):
     quant : string
         Quantization behaviour ('floor', 'round', ...)
 
+    dsm : dict
+        parameters of the delta-sigma modulator ('order', 'osr', 'opt', 'H_inf')
+
     ovfl  : string
         Overflow behaviour ('wrap', 'sat', ...)
 
@@ -376,6 +691,10 @@ class Fixed(object):
     MSB : float
         value of most significant bit (MSB)
 
+    MIN_int, MAX_int : integer
+        minimum / maximum value in integer representation (LSB = 1), i.e.
+        `-2**(W-1)` and `2**(W-1) - 1`
+
     digits : integer
         number of digits required for selected number format and wordlength
 
@@ -388,7 +707,14 @@ class Fixed(object):
 
                         -1: negative overflow
 
-        has occured during last fixpoint conversion
+        has occured during last fixpoint conversion. When the overflow log
+        is enabled, it is only updated for scalar arguments. The array of
+        flags is reused (overwritten) by the next conversion of an array
+        with the same shape.
+
+    ovr_log : boolean
+        when True, overflows are recorded in a sparse log of (index, sign) events
+        that can be read with `get_ovr_log()`, see `enable_ovr_log()`
 
     N_over : integer
         total number of overflows
@@ -419,6 +745,8 @@ class Fixed(object):
         """
         # test if all passed keys of quantizer object are defined
         self.setQobj(q_obj)
+        self.ovr_log = False # no logging of overflow events
+        self._dsm_carry = False # don't carry over DSM state between calls
         self.resetN() # initialize overflow-counter
 
         # arguments for regex replacement with illegal characters
@@ -429,6 +757,10 @@ class Fixed(object):
                 'dec' : r'[^0-9|.|,|\-]',
                 'hex' : r'[^0-9A-Fa-f|.|,|\-]'
                         }
+        # boolean lookup tables of legal ASCII characters for vectorized string
+        # conversion, derived from the regexes above to keep both consistent
+        self.FRMT_LUT = {k: np.array([re.sub(v, '', chr(i)) != '' for i in range(128)])
+                         for k, v in self.FRMT_REGEX.items()}
 
     def setQobj(self, q_obj):
         """
@@ -438,7 +770,7 @@ class Fixed(object):
         Check the docstring of class `Fixed()` for  details.
         """
         for key in q_obj.keys():
-            if key not in ['Q','WF','WI','W','quant','ovfl','frmt','scale']:
+            if key not in ['Q','WF','WI','W','quant','ovfl','frmt','scale','dsm']:
                 raise Exception(u'Unknown Key "%s"!'%(key))
 
         q_obj_default = {'WI':0, 'WF':15, 'quant':'round', 'ovfl':'sat',
@@ -485,6 +817,17 @@ class Fixed(object):
             else:
                 raise ValueError
 
+        # parameters of the delta-sigma modulator
+        dsm = dict(getattr(self, 'dsm', DSM_DEFAULTS))
+        for key, val in q_obj.get('dsm', {}).items():
+            if key not in DSM_DEFAULTS:
+                raise Exception(u'Unknown DSM parameter "%s"!'%(key))
+            dsm[key] = val
+        self.dsm = {'order': int(dsm['order']), 'osr': int(dsm['osr']),
+                    'opt': int(dsm['opt']), 'H_inf': float(dsm['H_inf'])}
+        if self.quant == 'dsm':
+            q_obj['dsm'] = dict(self.dsm)
+
         self.q_obj = q_obj # store quant. dict in instance
 
         self.LSB = 2. ** -self.WF  # value of LSB
@@ -493,6 +836,11 @@ class Fixed(object):
         self.MAX =  2. * self.MSB - self.LSB
         self.MIN = -2. * self.MSB
 
+        # same in integer representation (value of LSB = 1) as python ints,
+        # these can be larger than int64 for W > 64
+        self.MAX_int = (1 << (self.W - 1)) - 1
+        self.MIN_int = -(1 << (self.W - 1))
+
         # Calculate required number of places for different bases from total
         # number of bits:
         if self.frmt == 'dec':
@@ -513,10 +861,27 @@ class Fixed(object):
         else:
             raise Exception(u'Unknown format "%s"!'%(self.frmt))
 
+        # Parameters for converting W bit integers to bin / hex strings in
+        # float2frmt(), calculated once per configuration:
+        # - _digit_shifts: right shifts for extracting the digits, MSB first
+        # - _digit_pad: left shift aligning the fractional bits to full digits
+        # - _digit_point: number of digits before the radix point
+        self._digit_shifts = None
+        if self.frmt in {'bin', 'hex'}:
+            bits = 1 if self.frmt == 'bin' else 4
+            n_int = -(-(self.WI + 1) // bits)
+            n_frc = -(-self.WF // bits)
+            self._digit_pad = n_frc * bits - self.WF
+            self._digit_mask = np.uint64((1 << bits) - 1)
+            self._digit_point = n_int if self.WF > 0 else None
+            if self.W + self._digit_pad <= 64: # otherwise use np.binary_repr()
+                self._digit_shifts = np.arange(n_int + n_frc - 1, -1, -1,
+                                               dtype=np.uint64) * np.uint64(bits)
+
         self.ovr_flag = 0 # initialize to allow reading when freshly initialized
 
 #------------------------------------------------------------------------------
-    def fixp(self, y, scaling='mult'):
+    def fixp(self, y, scaling='mult', out=None):
         """
         Return fixed-point integer or fractional representation for `y`
         (scalar or array-like) with the same shape as `y`.
@@ -541,11 +906,19 @@ class Fixed(object):
 
             For all other settings, `y` is transformed unscaled.
 
+        out: ndarray or None
+            Floating point array with the same shape as `y` for storing the
+            result. For array arguments, all quantization steps are performed
+            in place in one work buffer, either `out` or a newly created array.
+            Passing `out` avoids allocating this buffer on every call, `out`
+            may also be the input array `y` itself.
+
         Returns
         -------
         float scalar or ndarray
             with the same shape as `y`, in the range
-            `-2*self.MSB` ... `2*self.MSB-self.LSB`
+            `-2*self.MSB` ... `2*self.MSB-self.LSB`. When `out` is given, it
+            is returned.
 
         Examples
         --------
@@ -581,9 +954,6 @@ class Fixed(object):
             #   for speedup, test for invalid types
             SCALAR = False
             y = np.asarray(y) # convert lists / tuples / ... to numpy arrays
-            yq = np.zeros(y.shape)
-            over_pos = over_neg = np.zeros(y.shape, dtype = bool)
-            self.ovr_flag = np.zeros(y.shape, dtype = int)
 
             if np.issubdtype(y.dtype, np.number): # numpy number type
                 self.N += y.size
@@ -623,10 +993,13 @@ class Fixed(object):
                     except (TypeError, ValueError) as e:
                         logger.error("Argument '{0}' yields \n {1}".format(y,e))
                         y = 0.0
-            over_pos = over_neg = yq = 0
-            self.ovr_flag = 0
             self.N += 1
 
+        if out is not None and (SCALAR or not isinstance(out, np.ndarray)
+                or out.shape != np.shape(y) or out.dtype.kind != 'f'):
+            raise ValueError("'out' needs to be a float array with the same shape "
+                             "as the input argument!")
+
         # convert pseudo-complex (imag = 0) and complex values to real
         y = np.real_if_close(y)
         if np.iscomplexobj(y):
@@ -634,48 +1007,65 @@ class Fixed(object):
             # quantizing complex objects is not supported yet
             y = y.real
 
-        y_in = y # y before scaling / quantizing
         #======================================================================
         # (2) : INPUT SCALING
         #       Multiply by `scale` factor before requantization and saturation
-        #       when `scaling=='mult'`or 'multdiv'
+        #       when `scaling=='mult'`or 'multdiv'. Divide by LSB to obtain an
+        #       intermediate format where the quantization step size = 1. As
+        #       LSB is a power of two, both steps can be combined into one
+        #       multiplication without changing the result.
+        #       For arrays, the result is written to the work buffer `buf` which
+        #       is used for all further steps in place.
         #======================================================================
         if scaling in {'mult', 'multdiv'}:
-            y = y * self.scale
+            factor = self.scale / self.LSB
+        else:
+            factor = 1. / self.LSB
+        if SCALAR:
+            y = y * factor
+            buf = None
+        else:
+            y = buf = np.multiply(y, factor, out=out)
 
         #======================================================================
         # (3) : QUANTIZATION
-        #       Divide by LSB to obtain an intermediate format where the
-        #       quantization step size = 1.
-        #       Next, apply selected quantization method to convert
-        #       floating point inputs to "fixpoint integers".
-        #       Finally, multiply by LSB to restore original scale.
+        #       Apply selected quantization method to convert floating point
+        #       inputs to "fixpoint integers" (still of type float).
         #=====================================================================
-        y = y / self.LSB
-
-        if   self.quant == 'floor':  yq = np.floor(y)
+        if   self.quant == 'floor':  yq = np.floor(y, out=buf)
              # largest integer i, such that i <= x (= binary truncation)
-        elif self.quant == 'round':  yq = np.round(y)
+        elif self.quant == 'round':  yq = np.round(y, out=buf)
              # rounding, also = binary rounding
-        elif self.quant == 'fix':    yq = np.fix(y)
+        elif self.quant == 'fix':    yq = np.fix(y, out=buf)
              # round to nearest integer towards zero ("Betragsschneiden")
-        elif self.quant == 'ceil':   yq = np.ceil(y)
+        elif self.quant == 'ceil':   yq = np.ceil(y, out=buf)
              # smallest integer i, such that i >= x
-        elif self.quant == 'rint':   yq = np.rint(y)
+        elif self.quant == 'rint':   yq = np.rint(y, out=buf)
              # round towards nearest int
         elif self.quant == 'dsm':
             if DS:
-                # Synthesize DSM loop filter, 
-                # TODO: parameters should be adjustable via quantizer dict
-                H = synthesizeNTF(order=3, osr=64, opt=1)
+                # Synthesize DSM loop filter (memoized per parameter set)
+                H = synthesize_ntf(self.dsm['order'], self.dsm['osr'],
+                                   self.dsm['opt'], self.dsm['H_inf'])
                 # Calculate DSM stream and shift/scale it from -1 ... +1 to
-                # 0 ... 1 sequence
-                yq = (simulateDSM(y*self.LSB, H)[0]+1)/(2*self.LSB)
+                # 0 ... 1 sequence. When processing a stream block by block,
+                # start with the final modulator state of the previous block.
+                if self._dsm_carry and self.dsm_state is not None:
+                    x0 = self.dsm_state
+                else:
+                    x0 = 0.
+                v, xn, _, _ = simulateDSM(y*self.LSB, H, x0=x0)
                 # returns four ndarrays:
                 # v: quantizer output (-1 or 1)
                 # xn: modulator states.
                 # xmax: maximum value that each state reached during simulation
-                # y: The quantizer input (ie the modulator output). 
+                # y: The quantizer input (ie the modulator output).
+                if np.size(v) > 0: # xn is squeezed, restore shape (order, N)
+                    self.dsm_state = np.reshape(xn, (-1, np.size(v)))[:, -1]
+                yq = (v+1)/(2*self.LSB)
+                if buf is not None:
+                    buf[...] = yq
+                    yq = buf
             else:
                 raise Exception('"deltasigma" Toolbox not found.\n'
                                 'Try installing it with "pip install deltasigma".')
@@ -683,62 +1073,356 @@ class Fixed(object):
             # return unquantized value
         else:
             raise Exception('Unknown Requantization type "%s"!'%(self.quant))
-        yq = yq * self.LSB
-        # logger.debug("y_in={0} | y={1} | yq={2}".format(y_in, y, yq))
 
         #======================================================================
         # (4) : Handle Overflow / saturation w.r.t. to the MSB, returning a
-        #       result in the range MIN = -2*MSB ... + 2*MSB-LSB = MAX
+        #       result in the range MIN_int = -2**(W-1) ... 2**(W-1)-1 = MAX_int
+        #       (in multiples of LSB)
         #=====================================================================
-        if   self.ovfl == 'none':
-            pass
-        else:
-            # Bool. vectors with '1' for every neg./pos overflow:
-            over_neg = (yq < self.MIN)
-            over_pos = (yq > self.MAX)
-            # create flag / array of flags for pos. / neg. overflows
-            self.ovr_flag = over_pos.astype(int) - over_neg.astype(int)
-            # No. of pos. / neg. / all overflows occured since last reset:
-            self.N_over_neg += np.sum(over_neg)
-            self.N_over_pos += np.sum(over_pos)
-            self.N_over = self.N_over_neg + self.N_over_pos
+        yq = self._ovfl(yq, inplace=not SCALAR)
 
-            # Replace overflows with Min/Max-Values (saturation):
-            if self.ovfl == 'sat':
-                yq = np.where(over_pos, self.MAX, yq) # (cond, true, false)
-                yq = np.where(over_neg, self.MIN, yq)
-            # Replace overflows by two's complement wraparound (wrap)
-            elif self.ovfl == 'wrap':
-                yq = np.where(over_pos | over_neg,
-                    yq - 4. * self.MSB*np.fix((np.sign(yq) * 2 * self.MSB+yq)/(4*self.MSB)), yq)
-            else:
-                raise Exception('Unknown overflow type "%s"!'%(self.ovfl))
-                return None
         #======================================================================
         # (5) : OUTPUT SCALING
-        #       Divide result by `scale` factor when `scaling=='div'`or 'multdiv'
-        #       to obtain correct scaling for floats
+        #       Multiply by LSB to restore original scale and divide result by
+        #       `scale` factor when `scaling=='div'`or 'multdiv' to obtain
+        #       correct scaling for floats (both steps are combined again)
         #       - frmt2float() always returns float
         #       - input_coeffs when quantizing the coefficients
         #       float2frmt passes on the scaling argument
         #======================================================================
 
-        if scaling in {'div', 'multdiv'}:
-            yq = yq / self.scale
+        if SCALAR:
+            if scaling in {'div', 'multdiv'}:
+                yq = yq / (self.scale / self.LSB)
+            else:
+                yq = yq * self.LSB
+        elif scaling in {'div', 'multdiv'}:
+            yq = np.divide(yq, self.scale / self.LSB, out=buf)
+        else:
+            yq = np.multiply(yq, self.LSB, out=buf)
 
         if SCALAR and isinstance(yq, np.ndarray):
             yq = yq.item() # convert singleton array to scalar
 
         return yq
 
+#------------------------------------------------------------------------------
+    def fixp_int(self, y, WF_in=None):
+        """
+        Integer-domain version of `fixp()`: Requantize the integer (array) `y`
+        with `WF_in` fractional bits to the integer representation of the
+        format `WI.WF` (value of LSB = 1), using bit shifts for quantization,
+        `np.clip()` for saturation and bit masking for two's complement
+        wrap-around. All operations are exact, also for wordlengths
+        > 53 bits that cannot be represented by floats without loss.
+
+        Input and output fractional bits are aligned at the binary point, see
+        :func:`pyfda.fixpoint_widgets.fixpoint_helpers.requant`.
+
+        Parameters
+        ----------
+        y: integer scalar or array-like
+            input value in integer representation, converted to `np.int64`
+
+        WF_in: integer or None
+            number of fractional bits of `y`. When `WF_in` is None (default),
+            `y` is assumed to have the same number of fractional bits as
+            the output format, i.e. only overflows are handled.
+
+        Returns
+        -------
+        `np.int64` scalar or ndarray
+            with the same shape as `y`, in the range
+            `-2**(W-1)` ... `2**(W-1) - 1`
+
+        Examples
+        --------
+
+        >>> myQ = Fixed({'WI':0, 'WF':3, 'ovfl':'sat', 'quant':'floor'})
+        >>> myQ.fixp_int([-17, -3, 5, 12], WF_in=4) # Q0.4 -> Q0.3
+        array([-8, -2,  2,  6])
+        """
+        if self.W > 64:
+            raise ValueError('Integer quantization is only supported for W <= 64 '
+                             '(W = {0})!'.format(self.W))
+        y = np.asarray(y, dtype=np.int64)
+        self.N += y.size
+        if WF_in is None:
+            WF_in = self.WF
+        dWF = WF_in - self.WF # number of fractional bits to be removed
+
+        #======================================================================
+        # QUANTIZATION via right shift by dWF bits
+        #======================================================================
+        if dWF > 0:
+            if self.quant == 'floor':
+                yq = y >> dWF # arithmetic shift = truncation
+            elif self.quant in {'round', 'rint'}:
+                # round half to even, same as np.round() / np.rint() used by fixp()
+                yq = y >> dWF
+                rem = y & ((1 << dWF) - 1) # truncated bits, always >= 0
+                half = 1 << (dWF - 1)
+                yq = yq + ((rem > half) | ((rem == half) & ((yq & 1) == 1)))
+            elif self.quant == 'fix':
+                yq = np.where(y < 0, -((-y) >> dWF), y >> dWF) # towards zero
+            elif self.quant == 'ceil':
+                yq = -((-y) >> dWF)
+            else:
+                raise Exception('Requantization type "%s" is not supported in '
+                                'integer mode!'%(self.quant))
+        elif dWF < 0:
+            # add fractional bits, no quantization needed
+            lim = 1 << max(63 + dWF, 0) # |y| < lim doesn't overflow int64 when shifted
+            if y.size > 0 and (y.min() < -lim or y.max() >= lim):
+                # shift python integers to detect and handle the overflows correctly
+                yq = y.astype(object) << -dWF
+            else:
+                yq = y << -dWF
+        else:
+            yq = y
+
+        #======================================================================
+        # OVERFLOW handling
+        #======================================================================
+        yq = self._ovfl(yq, inplace=yq is not y) # don't modify the argument
+        if np.ndim(yq) == 0:
+            yq = np.int64(yq)
+        elif yq.dtype == object:
+            yq = yq.astype(np.int64)
+        return yq
+
+#------------------------------------------------------------------------------
+    def _ovfl(self, yq, inplace=False):
+        """
+        Handle overflows of `yq` (scalar or ndarray, float or integer) which is
+        given in integer representation (value of LSB = 1) w.r.t. the
+        range `MIN_int ... MAX_int`. Update the overflow flag `self.ovr_flag`
+        and the overflow counters. When the overflow log is enabled, the
+        overflow events are appended to the log instead of creating a dense
+        array of overflow flags.
+
+        Saturation uses `np.clip()`, two's complement wrap-around is calculated
+        via bit masking in the integer domain. Integer-valued floats are cast
+        to `np.int64` for this, non-finite values are not wrapped. Floats
+        exceeding the int64 range (W >= 64) are wrapped with a float modulo.
+        Object arrays of python integers are treated like integer arrays.
+
+        Arrays without overflows are detected by two reductions without
+        creating temporary arrays. When `inplace == True`, the ndarray `yq` is
+        saturated / wrapped in place, i.e. it must not be an array passed by
+        the user.
+        """
+        if self.ovr_log: # index of first sample in the log
+            idx_0 = self.N_log
+            self.N_log += np.size(yq)
+
+        if self.ovfl == 'none':
+            self._clear_ovr_flag(yq)
+            return yq
+        elif self.ovfl not in {'sat', 'wrap'}:
+            raise Exception('Unknown overflow type "%s"!'%(self.ovfl))
+
+        is_int = np.issubdtype(np.result_type(yq), np.integer)\
+            or np.result_type(yq) == object # python integers
+        if is_int:
+            MIN, MAX = self.MIN_int, self.MAX_int
+        else:
+            # use floats, python ints > int64 would create object arrays
+            MIN, MAX = float(self.MIN_int), float(self.MAX_int)
+
+        if np.size(yq) > 0 and np.ndim(yq) > 0 and yq.min() >= MIN and yq.max() <= MAX:
+            # no overflows (NaNs fail the comparisons and take the long way)
+            self._clear_ovr_flag(yq)
+            return yq
+
+        # Bool. vectors with '1' for every neg./pos overflow:
+        over_neg = (yq < MIN)
+        over_pos = (yq > MAX)
+        # No. of pos. / neg. / all overflows occured since last reset:
+        N_neg = np.count_nonzero(over_neg)
+        N_pos = np.count_nonzero(over_pos)
+        self.N_over_neg += N_neg
+        self.N_over_pos += N_pos
+        self.N_over = self.N_over_neg + self.N_over_pos
+
+        if self.ovr_log:
+            if N_neg + N_pos > 0: # log index and sign of overflows
+                idx = np.flatnonzero(over_pos | over_neg)
+                self.ovr_log_idx.append(idx + idx_0)
+                self.ovr_log_sign.append(
+                    np.where(np.ravel(over_pos)[idx], 1, -1).astype(np.int8))
+            if np.ndim(yq) > 0:
+                self.ovr_flag = 0
+            else:
+                self.ovr_flag = int(over_pos) - int(over_neg)
+        elif np.ndim(yq) > 0:
+            # create array of flags for pos. / neg. overflows
+            self._clear_ovr_flag(yq)
+            np.subtract(over_pos, over_neg, out=self.ovr_flag, dtype=int)
+        else:
+            self.ovr_flag = int(over_pos) - int(over_neg)
+
+        if self.ovfl == 'sat':
+            # Replace overflows with Min/Max-Values (saturation):
+            return np.clip(yq, MIN, MAX, out=yq if inplace else None)
+
+        # Replace overflows by two's complement wraparound (wrap)
+        ovr = over_pos | over_neg
+        if not np.any(ovr):
+            # nothing to wrap (always the case for int64 and W >= 64)
+            return yq
+        mask = (1 << self.W) - 1
+        if is_int:
+            if inplace:
+                yq -= MIN
+                yq &= mask
+                yq += MIN
+                return yq
+            return ((yq - MIN) & mask) + MIN
+        else:
+            # Only the overflowed elements are wrapped (in place). The integer
+            # part is wrapped by masking, the fractional part is kept for
+            # quant = 'none' and +/- inf is replaced by NaN.
+            yq = np.asarray(yq)
+            y_ovr = yq[ovr]
+            if self.W >= 64:
+                # int64 doesn't cover the range, wrap with a float modulo
+                with np.errstate(invalid='ignore'):
+                    y_w = np.mod(y_ovr - MIN, 2.**self.W) + MIN
+            else:
+                y_fl = np.floor(np.clip(y_ovr, -2.**62, 2.**62))
+                y_int = ((y_fl.astype(np.int64) - self.MIN_int) & mask) + self.MIN_int
+                y_w = y_int + (y_ovr - y_fl)
+            yq[ovr] = np.where(np.isinf(y_ovr), np.nan, y_w)
+            return yq
+
+#------------------------------------------------------------------------------
+    def _clear_ovr_flag(self, yq):
+        """
+        Reset the overflow flag(s) `self.ovr_flag` for the argument `yq`. For
+        arrays, the array of flags from the previous call is reused when it
+        has the same shape. No dense array is created when the overflow log is
+        enabled.
+        """
+        if self.ovr_log or np.ndim(yq) == 0:
+            self.ovr_flag = 0
+        elif isinstance(self.ovr_flag, np.ndarray) and self.ovr_flag.shape == np.shape(yq):
+            self.ovr_flag.fill(0)
+        else:
+            self.ovr_flag = np.zeros(np.shape(yq), dtype=int)
+
 #------------------------------------------------------------------------------
     def resetN(self):
-        """ Reset counter and overflow-counters of Fixed object"""
+        """ Reset counters, overflow log and DSM state of Fixed object (start a new stream)"""
         self.N = 0
         self.N_points = 0
         self.N_over = 0
         self.N_over_neg = 0
         self.N_over_pos = 0
+        # sparse overflow log: sample index of the first logged sample and
+        # lists of arrays with indices and signs of overflow events
+        self.N_log = 0
+        self.ovr_log_idx = []
+        self.ovr_log_sign = []
+        self.dsm_state = None # state of delta-sigma modulator
+
+#------------------------------------------------------------------------------
+    def process_block(self, y, scaling='mult'):
+        """
+        Quantize block `y` of a stream of samples with `fixp()`.
+
+        In contrast to `fixp()`, the state of the delta-sigma modulator
+        (`quant = 'dsm'`) is carried over from the previous block. Together with
+        the sample and overflow counters and the overflow log (see
+        `enable_ovr_log()`) which are updated cumulatively anyway, quantizing a
+        signal block by block gives the same results as quantizing it in one go.
+        Call `resetN()` to start a new stream.
+
+        Parameters
+        ----------
+        y: scalar or array-like object
+            block of samples to be quantized
+
+        scaling: String
+            scaling before and after quantization, see `fixp()`
+
+        Returns
+        -------
+        float scalar or ndarray with the same shape as `y`
+        """
+        self._dsm_carry = True
+        try:
+            return self.fixp(y, scaling=scaling)
+        finally:
+            self._dsm_carry = False
+
+#------------------------------------------------------------------------------
+    def process_stream(self, blocks, scaling='mult'):
+        """
+        Generator, quantizing an iterable of blocks (e.g. read from a file or
+        created on the fly) with `process_block()` and yielding the quantized
+        blocks. Only one block needs to be held in memory at a time.
+
+        Parameters
+        ----------
+        blocks: iterable of scalars or array-like objects
+            blocks of samples to be quantized
+
+        scaling: String
+            scaling before and after quantization, see `fixp()`
+
+        Yields
+        ------
+        float scalar or ndarray with the same shape as the current block
+
+        Examples
+        --------
+        >>> myQ = Fixed({'Q':'0.15', 'quant':'round', 'ovfl':'sat'})
+        >>> blocks = (np.random.randn(1024) for i in range(1000))
+        >>> for yq in myQ.process_stream(blocks):
+        >>>     ... # process quantized block
+        >>> print(myQ.N, myQ.N_over) # statistics of the whole stream
+        """
+        for y in blocks:
+            yield self.process_block(y, scaling=scaling)
+
+#------------------------------------------------------------------------------
+    def enable_ovr_log(self, enable=True):
+        """
+        Enable or disable the sparse overflow log and clear it.
+
+        When enabled, each overflow is recorded as an event with its sample index
+        (counted cumulatively over all calls of `fixp()` / `fixp_int()` since
+        enabling the log or calling `resetN()`) and its sign. No dense array of
+        overflow flags `ovr_flag` is created for array arguments in this mode.
+
+        Parameters
+        ----------
+        enable: bool
+            enable (default) or disable the overflow log
+        """
+        self.ovr_log = bool(enable)
+        self.N_log = 0
+        self.ovr_log_idx = []
+        self.ovr_log_sign = []
+
+#------------------------------------------------------------------------------
+    def get_ovr_log(self):
+        """
+        Return the overflow events recorded since enabling the overflow log.
+
+        Returns
+        -------
+        idx : ndarray of np.int64
+            sample indices of overflows in ascending order
+
+        sign : ndarray of np.int8
+            +1 for positive, -1 for negative overflows
+        """
+        if self.ovr_log_idx:
+            return np.concatenate(self.ovr_log_idx), np.concatenate(self.ovr_log_sign)
+        else:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int8)
 
 
 #------------------------------------------------------------------------------
@@ -759,9 +1443,13 @@ class Fixed(object):
         - Calculate fixpoint float representation `y_float = fixp(y_dec, scaling='div')`,
           dividing the result by `scale`.
 
+        Array-like inputs in the formats `dec`, `bin`, `hex` and `csd` are
+        converted in one go by `_frmt2float_vec()`, yielding the same results
+        and overflow counts as converting the elements one by one.
+
         Parameters
         ----------
-        y: scalar or string
+        y: scalar, string or array-like
             to be quantized with the numeric base specified by `frmt`.
 
         frmt: string (optional)
@@ -770,8 +1458,16 @@ class Fixed(object):
 
         Returns
         -------
-        quantized floating point (`dtype=np.float64`) representation of input string
+        quantized floating point (`dtype=np.float64`) representation of input string,
+        an ndarray with the shape of `y` for array-like inputs
         """
+        if frmt is None:
+            frmt = self.frmt
+        frmt = frmt.lower()
+
+        if np.ndim(y) > 0 and frmt in self.FRMT_REGEX:
+            return self._frmt2float_vec(y, frmt)
+
         if y == "":
             return 0
 
@@ -779,9 +1475,6 @@ class Fixed(object):
             #logger.warning("Input format 'np.str_' not supported!\n\t{0}".format(y))
             y = str(y)
 
-        if frmt is None:
-            frmt = self.frmt
-        frmt = frmt.lower()
         y_float = y_dec = None
 
         if frmt == 'float32':
@@ -912,6 +1605,163 @@ class Fixed(object):
         else:
             return 0.0
 
+#------------------------------------------------------------------------------
+    def _frmt2float_vec(self, y, frmt):
+        """
+        Vectorized version of `frmt2float()` for array-like `y` in the formats
+        `dec`, `bin`, `hex` and `csd`.
+
+        The strings are converted to a matrix of unicode code points (one row per
+        element) that is processed column-wise:
+
+        - Remove illegal characters (`self.FRMT_LUT`) and leading '0's
+        - Count fractional places for strings with exactly one radix point
+        - Parse the digits with Horner's scheme into integers (`bin`, `hex`, `csd`)
+          or convert the stripped strings in bulk to float (`dec`)
+        - Discard MSBs outside the fixpoint range and calculate the two's
+          complement as a masked array operation (`bin`, `hex`)
+        - Quantize all valid elements with a single call of `fixp(scaling='div')`
+
+        Elements that are empty or can't be parsed return 0 without being counted,
+        elements with more than 52 significant bits are passed on to the scalar
+        routine. Results and overflow counters are the same as for the scalar
+        routine.
+
+        Parameters
+        ----------
+        y: array-like
+            strings or numbers to be quantized with the numeric base specified
+            by `frmt`.
+
+        frmt: string
+            any of the formats `dec`, `bin`, `hex`, `csd`
+
+        Returns
+        -------
+        ndarray (`dtype=np.float64`) with the shape of `y`
+        """
+        y_str = np.asarray(y).astype(str)
+        shape = y_str.shape
+        y_str = np.ascontiguousarray(y_str.ravel())
+        N = y_str.size
+        L = y_str.dtype.itemsize // 4 # max. string length in characters
+        y_float = np.zeros(N)
+        if N == 0 or L == 0:
+            return y_float.reshape(shape)
+
+        c = y_str.view(np.uint32).reshape(N, L) # matrix of code points
+        c = np.where(c < 128, c, 0)
+        # remove illegal characters and leading zeros
+        keep = self.FRMT_LUT[frmt][c]
+        keep &= np.cumsum(keep & (c != ord('0')), axis=1) > 0
+        valid = keep.any(axis=1) # empty strings return 0
+
+        is_dot = keep & ((c == ord('.')) | (c == ord(',')))
+        raw = keep & ~is_dot # integer and fractional part without radix point
+        # number of fractional places, only strings with exactly one radix point
+        # are regarded as fractional numbers
+        frc_places = np.where(is_dot.sum(axis=1) == 1,
+                              np.sum(raw & (np.cumsum(is_dot, axis=1) > 0), axis=1), 0)
+        scalar_idx = np.zeros(N, dtype=bool) # elements for the scalar routine
+
+        if frmt == 'dec':
+            c = np.where(is_dot, ord('.'), c) # ',' -> '.' for German-style numbers
+            # move all legal characters to the left and convert rows to strings
+            order = np.argsort(~keep, axis=1, kind='stable')
+            c = np.take_along_axis(np.where(keep, c, 0), order, axis=1)
+            val_str = np.ascontiguousarray(c, dtype=np.uint32).view('U{0}'.format(L)).ravel()
+            try:
+                y_dec = val_str[valid].astype(np.float64)
+            except ValueError: # at least one invalid string, convert individually
+                y_dec = np.zeros(np.count_nonzero(valid))
+                for i, s in enumerate(val_str[valid]):
+                    try:
+                        y_dec[i] = float(s)
+                    except ValueError as e:
+                        logger.error("Argument '{0}' yields \n {1}".format(str(s), e))
+
+        elif frmt in {'hex', 'bin'}:
+            base = {'bin': 2, 'hex': 16}[frmt]
+            if self.base != base: # mismatch between `frmt` and `self.frmt`
+                return np.asarray([self.frmt2float(s, frmt) for s in y_str]).reshape(shape)
+            bits = int(np.log2(base)) # bits per digit
+
+            digit_lut = np.full(128, -1, dtype=np.int64)
+            for i, d in enumerate('0123456789abcdef'):
+                digit_lut[ord(d)] = digit_lut[ord(d.upper())] = i
+            digits = digit_lut[c]
+
+            # A leading '-' denotes a negative number unless the string starts with
+            # a radix point (a '0' is prepended in this case). Strip all leading '-'
+            is_minus = raw & (c == ord('-'))
+            first_dot = is_dot[np.arange(N), np.argmax(keep, axis=1)]
+            lead_minus = raw & (np.cumsum(raw & ~is_minus, axis=1) == 0)
+            lead_minus &= ~first_dot[:, None]
+            neg_sign = lead_minus.any(axis=1)
+            is_dig = raw & ~lead_minus
+            n_dig = is_dig.sum(axis=1)
+
+            # strings with illegal characters within the digits ('-', '|', ...) or
+            # without any digits can't be converted and return 0
+            valid &= ~np.any(is_dig & ((digits < 0) | (digits >= base)), axis=1)
+            valid &= n_dig > 0
+            # avoid int64 overflow and rounding errors during float conversion
+            scalar_idx = valid & (n_dig * bits > 52)
+            valid &= ~scalar_idx
+
+            val = np.zeros(N, dtype=np.int64)
+            for col in range(L): # Horner's scheme, column by column
+                val = np.where(is_dig[:, col], val * base + digits[:, col], val)
+
+            scale = np.float64(base) ** frc_places
+            valid &= val != 0 # avoid log2(0)
+            y_dec = val[valid] / scale[valid]
+            int_bits = np.maximum(np.floor(np.log2(y_dec)).astype(np.int64) + 1, 0)
+
+            # When number is outside fixpoint range, discard MSBs
+            trunc = int_bits > self.WI + 1
+            if np.any(trunc):
+                val_t = val[valid][trunc]
+                if frmt == 'hex':
+                    n_bits = np.frexp(val_t.astype(np.float64))[1] # length of binary repr.
+                else:
+                    # string length incl. leading zeros and prepended '0'
+                    n_bits = (n_dig + first_dot)[valid][trunc]
+                keep_bits = n_bits - (int_bits[trunc] - self.WI - 1)
+                val_t &= (np.int64(1) << np.maximum(keep_bits, 0)) - 1
+                y_dec[trunc] = val_t / scale[valid][trunc]
+                # no remaining bits or zero value: return 0
+                ok = np.ones(y_dec.size, dtype=bool)
+                ok[trunc] = (keep_bits > 0) & (val_t != 0)
+                valid[valid] = ok
+                y_dec = y_dec[ok]
+                int_bits = int_bits[ok]
+                trunc = trunc[ok]
+                int_bits[trunc] = np.maximum(
+                    np.floor(np.log2(y_dec[trunc])).astype(np.int64) + 1, 0)
+
+            # calculate two's complement for negative numbers
+            twos = int_bits == self.WI + 1
+            y_dec[twos] -= np.float64(2) ** int_bits[twos]
+            y_dec = np.where(neg_sign[valid], -y_dec, y_dec)
+
+        else: # frmt == 'csd'
+            sign = np.where(c == ord('+'), 1, np.where(c == ord('-'), -1, 0))
+            n_raw = raw.sum(axis=1)
+            scalar_idx = valid & (n_raw > 52)
+            valid &= ~scalar_idx
+            val = np.zeros(N, dtype=np.int64)
+            for col in range(L): # Horner's scheme, column by column
+                val = np.where(raw[:, col], 2 * val + sign[:, col], val)
+            y_dec = val[valid] / np.float64(2) ** frc_places[valid]
+
+        if np.any(valid):
+            y_float[valid] = self.fixp(y_dec, scaling='div')
+        for i in np.flatnonzero(scalar_idx):
+            y_float[i] = self.frmt2float(str(y_str[i]), frmt)
+
+        return y_float.reshape(shape)
+
 #------------------------------------------------------------------------------
     def float2frmt(self, y):
         """
@@ -938,22 +1788,6 @@ class Fixed(object):
         digits is returned.
         """
 
-        """
-        Define vectorized functions using numpys automatic type casting:
-        Vectorized functions for inserting binary point in string `bin_str`
-        after position `pos`.
-
-        Usage:  insert_binary_point(bin_str, pos)
-
-        Parameters: bin_str : string
-                    pos     : integer
-        """
-        insert_binary_point = np.vectorize(lambda bin_str, pos:(
-                                    bin_str[:pos+1] + "." + bin_str[pos+1:]))
-
-        binary_repr_vec = np.frompyfunc(np.binary_repr, 2, 1)
-        #======================================================================
-
         if self.frmt == 'float': # return float input value unchanged (no string)
             return y
         elif self.frmt == 'float32':
@@ -980,6 +1814,14 @@ class Fixed(object):
             else: # bin or hex
                 # represent fixpoint number as integer in the range -2**(W-1) ... 2**(W-1)
                 y_fix_int = np.int64(np.round(y_fix / self.LSB))
+                if self._digit_shifts is not None:
+                    return self._int2frmt(y_fix_int)
+                # Fallback for W > 64 bits: Define vectorized functions using
+                # numpys automatic type casting
+                binary_repr_vec = np.frompyfunc(np.binary_repr, 2, 1)
+                # insert binary point in string `bin_str` after position `pos`
+                insert_binary_point = np.vectorize(lambda bin_str, pos:(
+                                            bin_str[:pos+1] + "." + bin_str[pos+1:]))
                 # convert to (array of) string with 2's complement binary
                 y_bin_str = binary_repr_vec(y_fix_int, self.W)
 
@@ -1001,6 +1843,50 @@ class Fixed(object):
             raise Exception('Unknown output format "%s"!'%(self.frmt))
             return None
 
+#------------------------------------------------------------------------------
+    def _int2frmt(self, y_int):
+        """
+        Convert integer(s) `y_int` to fixed-width two's complement strings in
+        `bin` or `hex` format with `self.W` bits and a radix point after the
+        integer bits.
+
+        The digits are extracted from the bit pattern by shifting and masking
+        with the parameters calculated by `setQobj()` and mapped to characters
+        by a `uint8` lookup table. The resulting character matrix is viewed as
+        a byte string array. Values outside the range of `W` bits are wrapped.
+
+        Parameters
+        ----------
+        y_int: integer scalar or array-like
+            fixpoint values in integer representation (LSB = 1)
+
+        Returns
+        -------
+        A string or an ndarray of strings with the same shape as `y_int`
+        """
+        if np.ndim(y_int) == 0: # scalars (e.g. table cells) via string formatting
+            y_u = (int(y_int) & ((1 << self.W) - 1)) << self._digit_pad
+            y_str = '{0:0{1}{2}}'.format(y_u, len(self._digit_shifts),
+                                         'b' if self.frmt == 'bin' else 'X')
+            if self._digit_point is not None:
+                y_str = y_str[:self._digit_point] + '.' + y_str[self._digit_point:]
+            return y_str
+
+        y_int = np.asarray(y_int, dtype=np.int64)
+        # two's complement bit pattern, fractional bits aligned to full digits
+        y_u = (y_int.astype(np.uint64) & np.uint64((1 << self.W) - 1))\
+            << np.uint64(self._digit_pad)
+        digits = (y_u[..., None] >> self._digit_shifts) & self._digit_mask
+        chars = np.frombuffer(b'0123456789ABCDEF', dtype=np.uint8)[digits]
+        if self._digit_point is not None: # insert radix point
+            chars = np.insert(chars, self._digit_point, ord('.'), axis=-1)
+
+        y_str = np.ascontiguousarray(chars).view('S{0}'.format(chars.shape[-1]))
+        y_str = y_str.reshape(y_int.shape).astype(str)
+        if y_str.ndim == 0:
+            return str(y_str)
+        return y_str
+
 ########################################
 if __name__=='__main__':
     """
@@ -13,6 +13,8 @@ Library with various general functions and variables needed by the pyfda routine
 import os, re, io
 import sys, time
 import struct
+import hashlib
+from collections import OrderedDict
 from contextlib import redirect_stdout
 import logging
 logger = logging.getLogger(__name__)
@@ -55,10 +57,10 @@ else:
 __all__ = ['cmp_version', 'mod_version',
            'set_dict_defaults', 'clean_ascii', 'qstr', 'safe_eval',
            'dB', 'lin2unit', 'unit2lin',
-           'cround', 'H_mag', 'cmplx_sort', 'unique_roots',
+           'cround', 'H_mag', 'H_mag_polar', 'cmplx_sort', 'unique_roots',
            'expand_lim', 'format_ticks', 'fil_save', 'fil_convert', 'sos2zpk',
            'round_odd', 'round_even', 'ceil_odd', 'floor_odd','ceil_even', 'floor_even',
-           'to_html', 'calc_Hcomplex']
+           'to_html', 'calc_Hcomplex', 'calc_Hcomplex_zoom', 'resp_hash', 'resp_cache']
 
 PY32_64 = struct.calcsize("P") * 8 # yields 32 or 64, depending on 32 or 64 bit Python
 
@@ -97,6 +99,12 @@ except ImportError:
 
 MODULES.update({'yosys':{'V_YO':dirs.YOSYS_VER}})
 
+try:
+    from numba import __version__ as V_NUMBA
+    MODULES.update({'numba': {'V_NUMBA':V_NUMBA}})
+except ImportError:
+    pass
+
 try:
     from docutils import __version__ as V_DOC
     MODULES.update({'docutils': {'V_DOC':V_DOC}})
@@ -950,6 +958,92 @@ def H_mag(num, den, z, H_max, H_min = None, log = False, div_by_0 = 'ignore'):
     # clip result to H_min / H_max
     return np.clip(H_val, H_min, H_max)
 
+#------------------------------------------------------------------------------
+def H_mag_polar(num, den, r, N_phi, H_max, H_min = None, log = False, endpoint = True):
+    """
+    Calculate `\|H(z)\|` like :func:`H_mag` on the polar grid
+    `z = r * exp(j phi)` with the radii `r` and the angles
+    `phi = np.linspace(0, 2 pi, N_phi, endpoint=endpoint)`.
+
+    Instead of evaluating the polynomials at each point of the grid, they are
+    evaluated ring by ring: For each radius, the values along the ring are the
+    FFT of the coefficients scaled by `r^k`. The unclipped magnitude is
+    memoized in :data:`resp_cache`, keyed by the coefficients and the grid.
+
+    Parameters
+    ----------
+    num : float or array-like
+        The numerator polynome of H(z).
+    den : float or array-like
+        The denominator polynome of H(z).
+    r : float or array-like
+        The radii of the polar grid
+    N_phi : int
+        The number of angles of the polar grid
+    H_max : float
+        The maximum value to which the result is clipped
+    H_min : float, optional
+        The minimum value to which the result is clipped (default: 0)
+    log : boolean, optional
+        When true, return 20 * log10 (\|H(z)\|). The clipping limits have to
+        be given as dB in this case.
+    endpoint : boolean, optional
+        When true (default), the last angle is 2 pi.
+
+    Returns
+    -------
+    H_mag : ndarray
+        The magnitude `\|H(z)\|` with the shape `(N_phi, len(r))`, i.e. the same
+        shape as the grid created by `np.meshgrid(r, phi)`.
+    """
+    key = resp_hash('H_mag_polar', num, den, r, N_phi, endpoint)
+    H_val, = resp_cache.get(key, lambda: (_H_abs_polar(num, den, r, N_phi, endpoint),))
+
+    if log:
+        olderr = np.geterr()
+        np.seterr(divide = 'ignore')
+        H_val = 20 * np.log10(H_val)
+        np.seterr(**olderr)
+
+    # clip result to H_min / H_max
+    return np.clip(H_val, H_min, H_max)
+
+def _H_abs_polar(num, den, r, N_phi, endpoint):
+    """
+    Calculate `|num(z) / den(z)|` on the polar grid without caching,
+    see :func:`H_mag_polar`
+    """
+    N = N_phi - 1 if endpoint else N_phi # number of distinct angles
+    olderr = np.geterr()
+    np.seterr(divide = 'ignore', invalid = 'ignore')
+    H_val = np.nan_to_num(abs(_polyval_polar(num, r, N)) / abs(_polyval_polar(den, r, N)))
+    np.seterr(**olderr)
+
+    H_val = H_val.T # shape (N, len(r))
+    if endpoint:
+        H_val = np.concatenate((H_val, H_val[:1]))
+    return H_val
+
+def _polyval_polar(p, r, N):
+    """
+    Evaluate the polynomial `p` like `np.polyval()` at the points
+    `z = r_i * exp(j 2 pi n / N)` for n = 0 ... N-1, returning an array with
+    the shape `(len(r), N)`:
+
+    With the coefficients `c = p[::-1]`, the value on ring `r_i` is
+    `sum_k c_k r_i^k exp(j 2 pi n k / N)`, i.e. `N * ifft(c_k r_i^k)`.
+    As the exponential term is periodic in k with N, coefficients are folded
+    modulo N when the polynomial is longer than the ring.
+    """
+    c = np.atleast_1d(p)[::-1]
+    r = np.atleast_1d(r)
+    C = c * np.power.outer(r, np.arange(len(c))) # scale coefficients by r^k, ring by ring
+    L = -(-len(c) // N) * N # length rounded up to a multiple of N
+    if L > len(c):
+        C = np.concatenate((C, np.zeros((len(r), L - len(c)))), axis=1)
+    C = C.reshape(len(r), L // N, N).sum(axis=1)
+    return np.fft.ifft(C, axis=1) * N
+
 #----------------------------------------------
 # from scipy.sig.signaltools.py:
 def cmplx_sort(p):
@@ -1583,7 +1677,72 @@ def floor_even(x):
 
 
 #------------------------------------------------------------------------------
+def resp_hash(*args):
+    """
+    Return a hex digest identifying a filter response, calculated from `args`,
+    e.g. the type of response, coefficients or second-order sections, the
+    number of points and the frequency range. Array-like arguments are hashed
+    with their dtype, shape and data, all other arguments with their `repr()`.
+    """
+    h = hashlib.sha1()
+    for arg in args:
+        if arg is None or isinstance(arg, (str, bool, int, float, complex)):
+            h.update(repr(arg).encode('utf8'))
+        else:
+            a = np.ascontiguousarray(arg)
+            h.update("{0}{1}".format(a.dtype.str, a.shape).encode('utf8'))
+            if a.dtype == object: # no raw data buffer
+                h.update(repr(a.tolist()).encode('utf8'))
+            else:
+                h.update(a.tobytes())
+        h.update(b'|')
+    return h.hexdigest()
+
+#------------------------------------------------------------------------------
+class Resp_Cache(object):
+    """
+    Memory cache for filter responses (tuples of arrays like `(W, H)`), using
+    keys calculated by :func:`resp_hash`. The least recently used entries are
+    removed when the total size of the arrays exceeds `max_bytes`.
 
+    The plotting widgets calculate the same responses repeatedly, e.g. when
+    switching tabs after a filter design; identical responses are only
+    calculated once.
+    """
+    def __init__(self, max_bytes=32 * 2**20):
+        self.max_bytes = max_bytes
+        self.N_bytes = 0
+        self.cache = OrderedDict()
+
+    def get(self, key, calc):
+        """
+        Return a copy of the response stored under `key`. Otherwise, calculate
+        it by calling `calc()` and store it. Copies are returned as the callers
+        are free to modify the arrays.
+        """
+        resp = self.cache.get(key)
+        if resp is None:
+            resp = tuple(np.asarray(r) for r in calc())
+            N_bytes = sum(r.nbytes for r in resp)
+            if N_bytes <= self.max_bytes:
+                self.cache[key] = resp
+                self.N_bytes += N_bytes
+                while self.N_bytes > self.max_bytes:
+                    _, old = self.cache.popitem(last=False)
+                    self.N_bytes -= sum(r.nbytes for r in old)
+        else:
+            self.cache.move_to_end(key)
+        return tuple(r.copy() for r in resp)
+
+    def clear(self):
+        """ Clear the cache """
+        self.cache.clear()
+        self.N_bytes = 0
+
+# global cache instance for the responses of all widgets
+resp_cache = Resp_Cache()
+
+#------------------------------------------------------------------------------
 def calc_Hcomplex(fil_dict, worN, wholeF, fs = 2*np.pi):
     """
     A wrapper around `signal.freqz()` for calculating the complex frequency
@@ -1616,11 +1775,28 @@ def calc_Hcomplex(fil_dict, worN, wholeF, fs = 2*np.pi):
     h: ndarray
         The frequency response, as complex numbers.
 
+    The response is memoized in :data:`resp_cache`, keyed by the causal and
+    anticausal coefficients, `worN`, `wholeF` and `fs`. Repeated calls with
+    the same arguments (e.g. from different plotting widgets) only copy the
+    cached arrays.
+
     Examples
     --------
 
     """
+    if 'rpk' in fil_dict:
+        baA = fil_dict['baA']
+    else:
+        baA = (None, None)
+    key = resp_hash('Hcomplex', fil_dict['ba'][0], fil_dict['ba'][1], baA[0], baA[1],
+                    worN, wholeF, fs)
+    return resp_cache.get(key, lambda: _calc_Hcomplex(fil_dict, worN, wholeF, fs))
 
+def _calc_Hcomplex(fil_dict, worN, wholeF, fs):
+    """
+    Calculate the complex frequency response without caching, see
+    :func:`calc_Hcomplex`
+    """
     # causal poles/zeros
     bc  = fil_dict['ba'][0]
     ac  = fil_dict['ba'][1]
@@ -1651,6 +1827,88 @@ def calc_Hcomplex(fil_dict, worN, wholeF, fs = 2*np.pi):
 
     return (W, H)
 
+#------------------------------------------------------------------------------
+def calc_Hcomplex_zoom(fil_dict, W_range, N):
+    """
+    Calculate the complex frequency response H(f) of causal and antiCausal
+    systems at `N` equidistant frequencies in the interval `W_range` using the
+    chirp-z transform. This yields the details of a zoomed frequency range at
+    screen resolution with a fraction of the effort needed for a global FFT
+    grid of the same resolution.
+
+    Parameters
+    ----------
+
+    fil_dict: dict
+        dictionary with filter data (coefficients etc.)
+
+    W_range: tuple of float
+        lower and upper frequency `(W_lo, W_hi)` of the interval (normalized
+        to W = 2 pi for f = f_S), both frequencies are included.
+
+    N: int
+        number of frequency points
+
+    Returns
+    -------
+
+    w: ndarray
+        The frequencies at which h was computed (normalized to 2 pi)
+
+    h: ndarray
+        The frequency response, as complex numbers.
+
+    Like :func:`calc_Hcomplex`, the response is memoized in :data:`resp_cache`.
+    `signal.freqz()` is used for the frequency vector when the chirp-z transform
+    is not available (scipy < 1.8).
+    """
+    if 'rpk' in fil_dict:
+        baA = fil_dict['baA']
+    else:
+        baA = (None, None)
+    key = resp_hash('Hcomplex_zoom', fil_dict['ba'][0], fil_dict['ba'][1], baA[0],
+                    baA[1], float(W_range[0]), float(W_range[1]), int(N))
+    return resp_cache.get(key, lambda: _calc_Hcomplex_zoom(fil_dict, W_range, N))
+
+def _calc_Hcomplex_zoom(fil_dict, W_range, N):
+    """
+    Calculate the complex frequency response in the interval `W_range`
+    without caching, see :func:`calc_Hcomplex_zoom`
+    """
+    W_lo = W_range[0]
+    dW = (W_range[1] - W_range[0]) / max(N - 1, 1)
+    W = W_lo + dW * np.arange(N)
+
+    H = _czt_freqz(fil_dict['ba'][0], fil_dict['ba'][1], W_lo, dW, N)
+
+    if ('rpk' in fil_dict):
+        # anticausal part: conjugate a and b prior to the call and h after it
+        ba = np.conjugate(fil_dict['baA'][0])
+        aa = np.conjugate(fil_dict['baA'][1])
+        H = H * _czt_freqz(ba, aa, W_lo, dW, N).conjugate()
+
+    return (W, H)
+
+def _czt_freqz(b, a, W_lo, dW, N):
+    """
+    Frequency response of the transfer function b(z) / a(z) at the `N`
+    frequencies W_lo + k * dW, evaluated with the chirp-z transform:
+    The points z_k = exp(j W_lo) * exp(-j dW)^-k are on the unit circle.
+    """
+    b = np.atleast_1d(b)
+    a = np.atleast_1d(a)
+    if not hasattr(sig, 'czt'): # chirp-z transform is available from scipy 1.8
+        return sig.freqz(b, a, worN=W_lo + dW * np.arange(N))[1]
+
+    w = np.exp(-1j * dW)
+    z_0 = np.exp(1j * W_lo)
+    H = sig.czt(b, N, w, z_0)
+    if len(a) > 1:
+        H = H / sig.czt(a, N, w, z_0)
+    else:
+        H = H / a[0]
+    return H
+
 #------------------------------------------------------------------------------
 
 if __name__=='__main__':
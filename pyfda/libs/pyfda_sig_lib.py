@@ -17,6 +17,7 @@ from numpy import pi
 import scipy.signal as sig
 
 import pyfda.filterbroker as fb
+from pyfda.libs.pyfda_lib import resp_hash, resp_cache
 
 
 def impz(b, a=1, FS=1, N=0, step = False):
@@ -94,6 +95,103 @@ Examples
 
     return hn, td
 
+#==================================================================
+class RunningStats(object):
+#==================================================================
+    """
+    Statistics of a signal that is passed block by block with `update()`,
+    only the accumulated moments are stored. Mean and variance are combined
+    with the numerically stable pairwise update by Chan et al., the results
+    don't depend on the block size.
+
+    Attributes
+    ----------
+    N : int
+        number of processed samples
+
+    mean : float or complex
+        mean value
+
+    var : float
+        variance (of the magnitude for complex signals)
+
+    min, max : float
+        minimum and maximum of the (real part of the) signal
+
+    Examples
+    --------
+    >>> stats = RunningStats()
+    >>> for x in blocks:
+    >>>     stats.update(x)
+    >>> print(stats.mean, stats.rms)
+    """
+    def __init__(self):
+        self.N = 0
+        self.mean = 0.
+        self.M2 = 0. # sum of squared deviations from the mean
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, x):
+        """
+        Update the statistics with the block `x`
+        """
+        x = np.asarray(x)
+        N_x = x.size
+        if N_x == 0:
+            return
+        mean_x = np.mean(x)
+        M2_x = np.sum(np.square(np.abs(x - mean_x)))
+        N = self.N + N_x
+        delta = mean_x - self.mean
+        self.mean = self.mean + delta * N_x / N
+        self.M2 = self.M2 + M2_x + np.abs(delta)**2 * self.N * N_x / N
+        self.N = N
+        self.min = min(self.min, np.min(x.real))
+        self.max = max(self.max, np.max(x.real))
+
+    @property
+    def var(self):
+        return self.M2 / self.N if self.N > 0 else 0.
+
+    @property
+    def rms(self):
+        """ root mean square, including the mean value """
+        return np.sqrt(self.var + np.abs(self.mean)**2)
+
+#==================================================================
+class AvgSpectrum(object):
+#==================================================================
+    """
+    Averaged magnitude spectrum of a signal that is passed in segments with
+    the length of the window `win` (Welch's method without overlap). Only the
+    accumulated power spectrum is stored.
+
+    `spectrum()` returns the square root of the averaged power spectrum, scaled
+    like the FFT of a single windowed segment divided by the segment length.
+    The total power calculated from the spectrum is the average power of the
+    segments.
+    """
+    def __init__(self, win):
+        self.win = np.asarray(win)
+        self.N_avg = 0
+        self.P = np.zeros(len(self.win))
+
+    def update(self, x):
+        """
+        Add the power spectrum of segment `x` with the length of the window
+        """
+        X = np.fft.fft(np.asarray(x) * self.win) / len(self.win)
+        self.P += np.square(np.abs(X))
+        self.N_avg += 1
+
+    def spectrum(self):
+        """
+        Return the averaged magnitude spectrum, zeros when no segment has been
+        processed yet
+        """
+        return np.sqrt(self.P / max(self.N_avg, 1))
+
 #==================================================================
 def div_safe(num, den, n_eps=1, i_scale=1, verbose=False):
 #==================================================================
@@ -131,13 +229,15 @@ def div_safe(num, den, n_eps=1, i_scale=1, verbose=False):
     ratio : array_like
             The ratio of num and den (zero at singularities)
 
+    `num` and `den` can be multi-dimensional, the index `i` of the
+    singularities refers to the last axis then.
     """
-    singular = np.where(~np.isfinite(den) | ~np.isfinite(num) |
-                        (abs(den) < n_eps * np.spacing(1)))[0] 
+    singular = ~np.isfinite(den) | ~np.isfinite(num) |\
+                    (abs(den) < n_eps * np.spacing(1))
 
     if verbose and np.any(singular):
         logger.warning('div_safe singularity -> setting to 0 at:')
-        for i in singular:
+        for i in np.nonzero(singular)[-1]:
             logger.warning('i = {0} '.format(i * i_scale))
     
     num[singular] = 0
@@ -147,7 +247,7 @@ def div_safe(num, den, n_eps=1, i_scale=1, verbose=False):
                     
 #==================================================================
 def group_delay(b, a=1, nfft=512, whole=False, analog=False, verbose=True, fs=2.*pi, 
-                sos=False, alg="scipy", n_eps=100):
+                sos=False, alg="scipy", n_eps=100, zpk=False):
 #==================================================================
     """
 Calculate group delay of a discrete time filter, specified by
@@ -178,6 +278,12 @@ nfft :  integer (optional, default: 512)
 
 fs : float (optional, default: fs = 2*pi)
      Sampling frequency.
+
+sos : boolean (optional, default : False)
+     When True, `b` contains the second-order sections of the filter
+
+zpk : boolean (optional, default : False)
+     When True, `b` is a list `[z, p, k]` with zeros, poles and gain of the filter
      
 alg : str (default: "scipy")
       The algorithm for calculating the group delay:
@@ -186,6 +292,8 @@ alg : str (default: "scipy")
             the frequency response is calculated with the FFT instead of polyval
           - "diff": Group delay is calculated by differentiating the phase
           - "Shpakh": Group delay is calculated from second-order sections
+          - "zpk": Group delay is calculated as the sum of the group delays of
+            the individual zeros and poles (selected by "auto" for `zpk = True`)
           
 n_eps : integer (optional, default : 100)
         Minimum value in the calculation of intermediate values before tau_g is set 
@@ -494,13 +602,35 @@ Examples
             logger.warning("sos!")
             alg = "shpak"
 
+        elif zpk:
+            alg = "zpk"
+
         elif fb.fil[0]['ft'] == 'IIR':
             alg = 'jos' # TODO: use 'shpak' here as well?
         else:
             alg = 'jos'
 
-    if sos and alg != "shpak":
+    tau_0 = 0 # delay in samples lost when converting `(b, a)` to zpk format
+    if alg == "zpk":
+        if sos:
+            # find the roots of each section: sos2zpk pads the missing zeros of
+            # sections with b0 = 0 at the origin, losing their delay
+            sos_ = np.atleast_2d(b)
+            z = np.concatenate([np.roots(s[:3]) for s in sos_])
+            p = np.concatenate([np.roots(s[3:]) for s in sos_])
+            k = np.prod([np.trim_zeros(s[:3], 'f')[0] / np.trim_zeros(s[3:], 'f')[0]
+                         for s in sos_])
+        elif zpk:
+            z, p, k = b
+        else:
+            # H(z) = B(z^-1) / A(z^-1) = z^(len(a) - len(b)) * H_zpk(z), tf2zpk
+            # also strips leading zero coefficients
+            z, p, k = sig.tf2zpk(b, a)
+            tau_0 = len(np.atleast_1d(b)) - len(np.atleast_1d(a))
+    elif sos and alg != "shpak":
         b,a = sig.sos2tf(b)
+    elif zpk:
+        b, a = sig.zpk2tf(*b)
 
     time_0 = time.perf_counter_ns()
 
@@ -599,7 +729,15 @@ Examples
             w, tau_g = sos_group_delayz(b, w, fs=fs)
         else:
             w, tau_g = group_delayz(b,a, w, fs=fs)
-            
+
+    # ---------------------
+    elif alg == "zpk":
+        w, tau_g = zpk_group_delay(z, p, k, w, fs=fs)
+        tau_g += tau_0 * 2 * pi / fs
+        if not whole:
+            tau_g = tau_g[0:nfft//2]
+            w = w[0:nfft//2]
+
     else:
         logger.error('Unknown algorithm "{0}"!'.format(alg))
         tau_g = np.zeros_like(w)
@@ -642,7 +780,8 @@ def group_delayz(b, a, w, plot=None, fs=2*np.pi):
         # scipy.signal.group_delay returns gd in samples thus scaled by 1/fs
         gd = sig.group_delay((b, a), w=w, fs=fs)[1] # / fs
     else:
-        sos = sig.tf2sos(b, a)
+        # conversion to second-order sections is expensive, reuse cached sos
+        sos = resp_cache.get(resp_hash('tf2sos', b, a), lambda: (sig.tf2sos(b, a),))[0]
         gd = sos_group_delayz(sos, w, plot, fs)[1]
     if plot is not None:
         plot(w, gd)
@@ -684,13 +823,30 @@ def sos_group_delayz(sos, w, plot=None, fs=2*np.pi):
     gd : ndarray
         The group delay in seconds.
     """
-    sos, n_sections = sig.filter_design._validate_sos(sos)
+    # the private scipy helper `_validate_sos` is not available in newer versions
+    sos = np.atleast_2d(sos)
+    if sos.ndim != 2 or sos.shape[1] != 6:
+        raise ValueError('sos array must be shape (n_sections, 6)')
+    n_sections = sos.shape[0]
     if n_sections == 0:
         raise ValueError('Cannot compute group delay with no sections')
-    gd = 0
-    for biquad in sos:
-        gd += quadfilt_group_delayz(biquad[:3], w, fs)[1]
-        gd -= quadfilt_group_delayz(biquad[3:], w, fs)[1]
+    # Evaluate the terms of quadfilt_group_delayz() for the numerators and
+    # denominators of all sections at once, the cosine tables are only
+    # calculated once. The coefficients are column vectors, yielding arrays
+    # with the shape (2 * n_sections, len(w)).
+    W = 2 * pi * np.asarray(w) / fs
+    c1 = np.cos(W)
+    c2 = np.cos(2*W)
+    b = np.concatenate((sos[:, :3], sos[:, 3:]))[:, :, np.newaxis]
+    u0, u1, u2 = b.transpose(1, 0, 2)**2 # b[0]**2, b[1]**2, b[2]**2
+    v0, v1, v2 = (b * np.roll(b, -1, axis=1)).transpose(1, 0, 2) # b[0]*b[1], b[1]*b[2], b[2]*b[0]
+    num = (u1+2*u2) + (v0+3*v1)*c1 + 2*v2*c2
+    den = (u0+u1+u2) + 2*(v0+v1)*c1 + 2*v2*c2
+
+    ratio = div_safe(num, den, n_eps=100, verbose=False)
+
+    # sum of numerator minus sum of denominator group delays
+    gd = 2 * pi / fs * (ratio[:n_sections].sum(axis=0) - ratio[n_sections:].sum(axis=0))
     if plot is not None:
         plot(w, gd)
     return w, gd
@@ -729,7 +885,7 @@ def quadfilt_group_delayz(b, w, fs=2*np.pi):
     return w, 2 * pi / fs * ratio
 
 
-def zpk_group_delay(z, p, k, w, plot=None, fs=2*np.pi):
+def zpk_group_delay(z, p, k, w, plot=None, fs=2*np.pi, n_max=2**20):
     """
     Compute group delay of digital filter in zpk format.
 
@@ -748,6 +904,10 @@ def zpk_group_delay(z, p, k, w, plot=None, fs=2*np.pi):
         `w` and `gd` are passed to plot.
     fs : float, optional
         The sampling frequency of the digital system.
+    n_max : int, optional
+        Maximum number of elements of the intermediate arrays: The group
+        delays of all roots are evaluated on the frequency grid with array
+        operations in chunks of `n_max // len(w)` roots and accumulated.
 
     Returns
     -------
@@ -755,12 +915,44 @@ def zpk_group_delay(z, p, k, w, plot=None, fs=2*np.pi):
         The frequencies at which `gd` was computed.
     gd : ndarray
         The group delay in seconds.
+
+    The transfer function is `H(z) = k prod(z - z_i) / prod(z - p_i)`, its
+    degree difference contributes the pure delay `len(p) - len(z)`. For zeros
+    and poles of coefficients `(b, a)` in powers of `z^-1` as returned by
+    ``scipy.signal.tf2zpk(b, a)``, the delay `len(b) - len(a)` has to be added.
+    Each zero or pole `r * exp(j phi)` contributes the group delay of
+    :func:`zorp_group_delayz`, `(r^2 - r cos(W - phi)) / (r^2 + 1 - 2 r cos(W - phi))`
+    with `r cos(W - phi) = Re{root} cos(W) + Im{root} sin(W)`, hence the
+    trigonometric tables are only calculated once. Singularities (roots on
+    the unit circle at one of the frequency points) are set to zero.
     """
-    gd = 0
-    for z_i in z:
-        gd += zorp_group_delayz(z_i, w)[1]
-    for p_i in p:
-        gd -= zorp_group_delayz(p_i, w)[1]
+    roots = np.concatenate((np.atleast_1d(z), np.atleast_1d(p))).astype(complex)
+    signs = np.concatenate((np.ones(np.size(z)), -np.ones(np.size(p))))
+    W = 2 * pi * np.atleast_1d(w) / fs
+    cos_W = np.cos(W)
+    sin_W = np.sin(W)
+    gd = np.full(W.shape, float(np.size(p) - np.size(z))) # delay of z^(len(z) - len(p))
+
+    N_chunk = max(1, min(len(roots), n_max // max(len(W), 1))) # roots per chunk
+    rcos = np.empty((N_chunk, len(W)))
+    ratio = np.empty((N_chunk, len(W)))
+    for i in range(0, len(roots), N_chunk):
+        r_i = roots[i:i + N_chunk, np.newaxis]
+        r2 = np.abs(r_i)**2
+        n = len(r_i)
+        np.multiply(r_i.real, cos_W, out=rcos[:n])
+        np.multiply(r_i.imag, sin_W, out=ratio[:n])
+        rcos[:n] += ratio[:n] # r cos(W - phi)
+        np.subtract(r2, rcos[:n], out=ratio[:n]) # numerator
+        rcos[:n] *= -2
+        rcos[:n] += r2 + 1 # denominator
+        singular = rcos[:n] < 100 * np.spacing(1)
+        rcos[:n][singular] = 1
+        ratio[:n][singular] = 0
+        ratio[:n] /= rcos[:n]
+        gd += signs[i:i + n] @ ratio[:n] # add group delays of zeros, subtract poles
+
+    gd *= 2 * pi / fs
     if plot is not None:
         plot(w, gd)
     return w, gd
@@ -13,6 +13,7 @@ toolbar.
 import logging
 logger = logging.getLogger(__name__)
 import sys
+import numpy as np
 from pyfda.libs.pyfda_lib import cmp_version
 
 # do not import matplotlib.pyplot - pyplot brings its own GUI, event loop etc!!!
@@ -63,6 +64,32 @@ def no_plot(x, y, ax=None, bottom=0, label=None, **kwargs):
     """
     pass
 
+#------------------------------------------------------------------------------
+def zoom_grid(ax, x):
+    """
+    Return the visible x-interval of `ax` (limited to the range of the data
+    grid `x`) and the number of points required for evaluating a curve at
+    screen resolution (one point per pixel) as a tuple `(x_lo, x_hi, N)`.
+
+    Return `None` when `x` already provides this resolution in the interval.
+    """
+    x_lo, x_hi = sorted(ax.get_xlim())
+    x_lo = max(x_lo, x[0])
+    x_hi = min(x_hi, x[-1])
+    N = max(int(ax.bbox.width), 2)
+    if x_hi <= x_lo or np.count_nonzero((x >= x_lo) & (x <= x_hi)) >= N:
+        return None
+    return x_lo, x_hi, N
+
+def zoom_splice(x, y, x_z, y_z):
+    """
+    Replace the section of the curve `(x, y)` covered by the zoomed curve
+    `(x_z, y_z)` by the latter, return the spliced curve as a tuple `(x, y)`.
+    """
+    lo = x < x_z[0]
+    hi = x > x_z[-1]
+    return np.concatenate((x[lo], x_z, x[hi])), np.concatenate((y[lo], y_z, y[hi]))
+
 #------------------------------------------------------------------------------
 class MplWidget(QWidget):
     """
@@ -180,6 +207,7 @@ class MplWidget(QWidget):
             if ax.get_navigate():
                 ax.autoscale()
         self.redraw()
+        self.mplToolbar.emit_zoomed()
 #------------------------------------------------------------------------------
     def get_full_extent(self, ax, pad=0.0):
         """
@@ -280,6 +308,10 @@ class MplToolbar(NavigationToolbar):
 
         #self.canvas = canv
         self.mpl_widget = mpl_widget
+        # emit `{'zoomed':''}` when the view limits have been changed by
+        # zooming / panning, enabled by plotting widgets that evaluate the
+        # zoomed range at a higher resolution
+        self.zoom_signal = False
 
 
 #------------------------------------------------------------------------------
@@ -470,6 +502,44 @@ class MplToolbar(NavigationToolbar):
         self.sig_tx.emit({'sender':__name__, 'home':''}) # only the key is used by the slot
         self.mpl_widget.redraw()
 
+#------------------------------------------------------------------------------
+    def emit_zoomed(self):
+        """
+        Signal that the view limits have been changed by zooming, panning or
+        navigating the view history when `self.zoom_signal` is set.
+        """
+        if self.zoom_signal:
+            self.sig_tx.emit({'sender':__name__, 'zoomed':''})
+
+    def release_zoom(self, event):
+        """
+        Finish zoom to rectangle, shadows `release_zoom()` inherited from
+        NavigationToolbar.
+        """
+        NavigationToolbar.release_zoom(self, event)
+        self.emit_zoomed()
+
+    def release_pan(self, event):
+        """
+        Finish panning, shadows `release_pan()` inherited from NavigationToolbar.
+        """
+        NavigationToolbar.release_pan(self, event)
+        self.emit_zoomed()
+
+    def back(self, *args):
+        """
+        Back to previous view, shadows `back()` inherited from NavigationToolbar.
+        """
+        NavigationToolbar.back(self, *args)
+        self.emit_zoomed()
+
+    def forward(self, *args):
+        """
+        Forward to next view, shadows `forward()` inherited from NavigationToolbar.
+        """
+        NavigationToolbar.forward(self, *args)
+        self.emit_zoomed()
+
 #------------------------------------------------------------------------------
     def help(self):
         """
@@ -22,7 +22,7 @@ import scipy.signal as sig
 
 import pyfda.filterbroker as fb
 from pyfda.pyfda_rc import params
-from pyfda.libs.pyfda_lib import H_mag, mod_version, safe_eval
+from pyfda.libs.pyfda_lib import H_mag, H_mag_polar, mod_version, safe_eval, resp_hash, resp_cache
 from pyfda.libs.pyfda_qt_lib import qget_cmb_box
 from pyfda.plot_widgets.mpl_widget import MplWidget
 
@@ -284,7 +284,8 @@ class Plot_3D(QWidget):
 #------------------------------------------------------------------------------
     def _init_grid(self):
         """ Initialize (x,y,z) coordinate grid + (re)draw plot."""
-        phi_UC = np.linspace(0, 2*pi, 400, endpoint=True) # angles for unit circle
+        self.N_UC = 400 # number of points for unit circle
+        phi_UC = np.linspace(0, 2*pi, self.N_UC, endpoint=True) # angles for unit circle
         self.xy_UC = np.exp(1j * phi_UC) # x,y coordinates of unity circle
 
         steps = 100              # number of steps for x, y, r, phi
@@ -299,9 +300,11 @@ class Plot_3D(QWidget):
         dx = (self.xmax - self.xmin) / steps
         dy = (self.ymax - self.ymin) / steps # grid size cartesian range
 
-        if self.chk_plot_in_UC.isChecked(): # # Plot circular range in 3D-Plot
-            [r, phi] = np.meshgrid(np.arange(rmin, rmax, dr),
-                            np.linspace(0, 2 * pi, steps, endpoint=True))
+        self.polar = self.chk_plot_in_UC.isChecked()
+        if self.polar: # # Plot circular range in 3D-Plot
+            self.r = np.arange(rmin, rmax, dr)
+            self.N_phi = steps
+            [r, phi] = np.meshgrid(self.r, np.linspace(0, 2 * pi, steps, endpoint=True))
             self.x = r * cos(phi)
             self.y = r * sin(phi)
         else: # cartesian grid
@@ -450,7 +453,8 @@ class Plot_3D(QWidget):
         #-----------------------------------------------------------------------------
 
 
-        [w, H] = sig.freqz(bb, aa, worN=N_FFT, whole=True)
+        [w, H] = resp_cache.get(resp_hash('freqz', bb, aa, N_FFT, True),
+                                lambda: sig.freqz(bb, aa, worN=N_FFT, whole=True))
         H = np.nan_to_num(H) # replace nans and inf by finite numbers
 
         H_abs = abs(H)
@@ -501,9 +505,14 @@ class Plot_3D(QWidget):
                 plevel_btm = top
 
         # calculate H(jw)| along the unity circle and |H(z)|, each clipped
-        # between bottom and top
-        H_UC = H_mag(bb, aa, self.xy_UC, top, H_min=bottom, log=self.chkLog.isChecked())
-        Hmag = H_mag(bb, aa, self.z, top, H_min=bottom, log=self.chkLog.isChecked())
+        # between bottom and top. Polar grids are evaluated ring by ring via FFT.
+        H_UC = H_mag_polar(bb, aa, 1., self.N_UC, top, H_min=bottom,
+                           log=self.chkLog.isChecked())[:, 0]
+        if self.polar:
+            Hmag = H_mag_polar(bb, aa, self.r, self.N_phi, top, H_min=bottom,
+                               log=self.chkLog.isChecked())
+        else:
+            Hmag = H_mag(bb, aa, self.z, top, H_min=bottom, log=self.chkLog.isChecked())
 
 
         #===============================================================
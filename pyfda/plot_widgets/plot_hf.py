@@ -25,8 +25,8 @@ from matplotlib.ticker import AutoMinorLocator
 
 import pyfda.filterbroker as fb
 from pyfda.pyfda_rc import params
-from pyfda.plot_widgets.mpl_widget import MplWidget
-from pyfda.libs.pyfda_lib import calc_Hcomplex, pprint_log, safe_eval
+from pyfda.plot_widgets.mpl_widget import MplWidget, zoom_grid, zoom_splice
+from pyfda.libs.pyfda_lib import calc_Hcomplex, calc_Hcomplex_zoom, pprint_log, safe_eval
 
 classes = {'Plot_Hf':'|H(f)|'} #: Dict containing class name : display name
 
@@ -66,6 +66,8 @@ class Plot_Hf(QWidget):
             if 'view_changed' in dict_sig or self.needs_draw:
                 self.update_view()
                 self.needs_draw = False
+            elif 'zoomed' in dict_sig:
+                self.draw_zoom()
         else:
             if 'data_changed' in dict_sig or 'specs_changed' in dict_sig:
                 self.needs_calc = True
@@ -170,6 +172,7 @@ class Plot_Hf(QWidget):
         self.mplwidget.layVMainMpl.setContentsMargins(*params['wdg_margins'])
         self.mplwidget.mplToolbar.a_he.setEnabled(True)
         self.mplwidget.mplToolbar.a_he.info = "manual/plot_hf.html"
+        self.mplwidget.mplToolbar.zoom_signal = True
         self.setLayout(self.mplwidget.layVMainMpl)
 
         self.init_axes()
@@ -537,8 +540,10 @@ class Plot_Hf(QWidget):
             # replace nan and inf by finite values, otherwise np.unwrap yields
             # an array full of nans
             phi = np.angle(np.nan_to_num(self.H_c))
+            self.scale_p = scale
+            self.phi_plt = np.unwrap(phi) * scale
         #-----------------------------------------------------------
-            self.ax_p.plot(self.F,np.unwrap(phi)*scale,
+            self.line_p, = self.ax_p.plot(self.F, self.phi_plt,
                                'g-.', label = "Phase")
         #-----------------------------------------------------------
             self.ax_p.set_ylabel(phi_str)
@@ -639,18 +644,14 @@ class Plot_Hf(QWidget):
             # use H and F as calculated
             self.H_c = self.H_cmplx
 
-        # now calculate mag / real / imaginary part of H_c:
         if self.chkZerophase.isChecked(): # remove the linear phase
-            self.H_c = self.H_c * np.exp(1j * self.W[0:len(self.F)] * fb.fil[0]["N"]/2.)
+            self.H_c = self.remove_linphase(self.F, self.H_c)
 
         if self.cmbShowH.currentIndex() == 0: # show magnitude of H
-            H = abs(self.H_c)
             H_str = r'$|H(\mathrm{e}^{\mathrm{j} \Omega})|$'
         elif self.cmbShowH.currentIndex() == 1: # show real part of H
-            H = self.H_c.real
             H_str = r'$\Re \{H(\mathrm{e}^{\mathrm{j} \Omega})\}$'
         else:  # show imag. part of H
-            H = self.H_c.imag
             H_str = r'$\Im \{H(\mathrm{e}^{\mathrm{j} \Omega})\}$'
 
         #================ Main Plotting Routine =========================
@@ -662,12 +663,13 @@ class Plot_Hf(QWidget):
                                          self.log_bottom, return_type='float',
                                          sign='neg')
                 self.led_log_bottom.setText(str(self.log_bottom))
+            # now calculate mag / real / imaginary part of H_c in the selected unit:
+            self.H_plt = self.calc_H_plt(self.F, self.H_c)
 
-                self.H_plt = np.maximum(20*np.log10(abs(H)), self.log_bottom)
+            if self.unitA == 'dB':
                 A_lim = [self.log_bottom, 2]
                 H_str += ' in dB ' + r'$\rightarrow$'
             elif self.unitA == 'V': #  'lin'
-                self.H_plt = H
                 if self.cmbShowH.currentIndex() != 0: # H can be less than zero
                     A_min = max(self.lin_neg_bottom, np.nanmin(self.H_plt[np.isfinite(self.H_plt)]))
                 else:
@@ -677,14 +679,13 @@ class Plot_Hf(QWidget):
                 self.ax.axhline(linewidth=1, color='k') # horizontal line at 0
             else: # unit is W
                 A_lim = [0, (1.03 + A_max)**2.]
-                self.H_plt = H * H.conj()
                 H_str += ' in W ' + r'$\rightarrow $'
 
             #logger.debug("lim: {0}, min: {1}, max: {2} - {3}".format(A_lim, A_min, A_max, self.H_plt[0]))
 
             #-----------------------------------------------------------
             self.ax.clear()
-            self.ax.plot(self.F, self.H_plt, label = 'H(f)')
+            self.line_H, = self.ax.plot(self.F, self.H_plt, label = 'H(f)')
             # TODO: self.draw_inset() # this gives an infinite recursion
             self.draw_phase(self.ax)
             #-----------------------------------------------------------
@@ -710,6 +711,67 @@ class Plot_Hf(QWidget):
             np.seterr(**old_settings_seterr)
 
         self.redraw()
+        self.draw_zoom() # zoom range is restored when zoom is locked
+
+#------------------------------------------------------------------------------
+    def remove_linphase(self, F, H_c):
+        """
+        Remove the linear phase corresponding to a delay of N/2 samples from
+        the complex response `H_c` at the frequencies `F`
+        """
+        return H_c * np.exp(1j * 2 * np.pi * F / self.f_max * fb.fil[0]["N"]/2.)
+
+    def calc_H_plt(self, F, H_c):
+        """
+        Return magnitude, real or imaginary part of the complex response `H_c`
+        at the frequencies `F` in the selected unit.
+        """
+        if self.cmbShowH.currentIndex() == 0: # magnitude of H
+            H = abs(H_c)
+        elif self.cmbShowH.currentIndex() == 1: # real part of H
+            H = H_c.real
+        else:  # imag. part of H
+            H = H_c.imag
+
+        if self.unitA == 'dB':
+            return np.maximum(20*np.log10(abs(H)), self.log_bottom)
+        elif self.unitA == 'V':
+            return H
+        else: # unit is W
+            return H * H.conj()
+
+#------------------------------------------------------------------------------
+    def draw_zoom(self):
+        """
+        When the global frequency grid is too coarse for the visible frequency
+        range (e.g. after zooming into the passband), evaluate H(f) in this
+        range at screen resolution with the chirp-z transform and splice it
+        into the magnitude and phase curves.
+        """
+        if not hasattr(self, 'line_H') or not self.ax.get_navigate():
+            return
+        zoom = zoom_grid(self.ax, self.F)
+        if zoom is None:
+            return
+        old_settings_seterr = np.seterr()
+        np.seterr(divide='ignore')
+
+        W, H_c = calc_Hcomplex_zoom(fb.fil[0], (2 * np.pi * zoom[0] / self.f_max,
+                                                2 * np.pi * zoom[1] / self.f_max), zoom[2])
+        F = W / (2 * np.pi) * self.f_max
+        if self.chkZerophase.isChecked():
+            H_c = self.remove_linphase(F, H_c)
+        self.line_H.set_data(*zoom_splice(self.F, self.H_plt, F, self.calc_H_plt(F, H_c)))
+
+        if hasattr(self, 'ax_p'):
+            phi = np.unwrap(np.angle(np.nan_to_num(H_c))) * self.scale_p
+            # align the unwrapped phase with the phase on the global grid
+            two_pi = 2 * np.pi * self.scale_p
+            phi += np.round((np.interp(F[0], self.F, self.phi_plt) - phi[0]) / two_pi) * two_pi
+            self.line_p.set_data(*zoom_splice(self.F, self.phi_plt, F, phi))
+
+        np.seterr(**old_settings_seterr)
+        self.mplwidget.canvas.draw()
 
 #------------------------------------------------------------------------------
     def redraw(self):
@@ -28,6 +28,8 @@ from pyfda.libs.pyfda_lib import (to_html, safe_eval, pprint_log, np_type, calc_
         rect_bl, sawtooth_bl, triang_bl, comb_bl, calc_Hcomplex, safe_numexpr_eval)
 from pyfda.libs.pyfda_qt_lib import (qget_cmb_box, qset_cmb_box, qstyle_widget,
                                      qadd_item_cmb_box, qdel_item_cmb_box)
+from pyfda.libs.pyfda_fft_windows_lib import calc_window_function
+from pyfda.libs.pyfda_sig_lib import RunningStats, AvgSpectrum
 from pyfda.pyfda_rc import params # FMT string for QLineEdit fields, e.g. '{:.3g}'
 from pyfda.plot_widgets.mpl_widget import MplWidget, stems, no_plot
 
@@ -61,6 +63,15 @@ class Plot_Impz(QWidget):
         # initial setting for fixpoint simulation:
         self.fx_sim = qget_cmb_box(self.ui.cmb_sim_select, data=False) == 'Fixpoint'
         self.fx_sim_old = self.fx_sim
+        self.fx_running = False # a fixpoint simulation is running in the background
+        # interpolation and decimation factor (L, M) of the fixpoint response
+        self.fx_rate = (1, 1)
+        self.blk_sim = False # results have been calculated block by block
+        self.N_dec = 1 # decimation of the stored signals (block simulation)
+        self.x_q = None # quantized stimulus, also used as buffer for requantization
+        # indices and signs of overflows during stimulus quantization
+        self.ovr_idx = np.zeros(0, dtype=np.int64)
+        self.ovr_sign = np.zeros(0, dtype=np.int8)
         self.tool_tip = "Impulse and transient response"
         self.tab_label = "y[n]"
         self.active_tab = 0 # index for active tab
@@ -216,7 +227,10 @@ class Plot_Impz(QWidget):
                 qstyle_widget(self.ui.but_run, "changed")
                 self.fx_select("Fixpoint")
                 if self.isVisible():
-                    self.calc_stimulus()
+                    # The stimulus is passed synchronously to the fixpoint widget which
+                    # starts the simulation thread or reports an error in the meantime
+                    if self.calc_stimulus() and not self.error:
+                        self.fx_set_running(True)
 
             elif dict_sig['fx_sim'] == 'set_results':
                 """
@@ -227,6 +241,7 @@ class Plot_Impz(QWidget):
                 self.draw_response_fx(dict_sig=dict_sig)
 
             elif dict_sig['fx_sim'] == 'error':
+                self.fx_set_running(False)
                 self.needs_calc = True
                 self.error = True
                 qstyle_widget(self.ui.but_run, "error")
@@ -324,7 +339,10 @@ class Plot_Impz(QWidget):
                                             and self.ui.DC == 0)
 
         self.fx_select() # check for fixpoint setting and update if needed
-        if type(arg) == bool: # but_run has been pressed
+        if type(arg) == bool and self.fx_running: # but_run acts as "Cancel" button
+            self.sig_tx.emit({'sender':__name__, 'fx_sim':'cancel'})
+            return
+        elif type(arg) == bool: # but_run has been pressed
             self.needs_calc = True # force recalculation when but_run is pressed
         elif not self.ui.chk_auto_run.isChecked():
             return
@@ -335,8 +353,11 @@ class Plot_Impz(QWidget):
                 self.sig_tx.emit({'sender':__name__, 'fx_sim':'init'})
                 return
 
-            self.calc_stimulus()
-            self.calc_response()
+            if self.ui.blk and not self.fx_sim:
+                self.calc_blocks()
+            else:
+                self.calc_stimulus()
+                self.calc_response()
 
             if self.error:
                 return
@@ -392,6 +413,10 @@ class Plot_Impz(QWidget):
         self.ui.lbl_plt_time_stmq.setVisible(self.fx_sim)
         self.ui.chk_fx_scale.setVisible(self.fx_sim)
         self.ui.chk_fx_limits.setVisible(self.fx_sim)
+        # block simulation is only implemented for floating point
+        if self.ui.chk_blk.isEnabled() == self.fx_sim:
+            self.ui.chk_blk.setEnabled(not self.fx_sim)
+            self.ui.update_N(emit=False)
 
         if self.fx_sim:
             qadd_item_cmb_box(self.ui.cmb_plt_time_spgr, "x_q[n]")
@@ -408,22 +433,64 @@ class Plot_Impz(QWidget):
 #------------------------------------------------------------------------------
     def calc_stimulus(self):
         """
-        (Re-)calculate stimulus `self.x`
+        (Re-)calculate stimulus `self.x`. Return True when a fixpoint stimulus
+        has been sent to the fixpoint simulation.
         """
         self.n = np.arange(self.ui.N_end)
+        self.N_dec = 1 # all samples are kept
+        self.blk_sim = False
+        x = self.calc_stimulus_block(self.n, first=True)
+        if x is None:
+            return False
+        self.x = x
+
+        if self.fx_sim:
+            self.title_str = r'$Fixpoint$ ' + self.title_str
+            self.q_i = fx.Fixed(fb.fil[0]['fxqc']['QI']) # setup quantizer for input quantization
+            self.q_i.setQobj({'frmt':'dec'})    # always use integer decimal format
+            if np.any(np.iscomplex(self.x)):
+                logger.warning("Complex stimulus: Only its real part will be processed by the fixpoint filter!")
+
+            # record overflows of input quantization in a sparse log
+            self.q_i.enable_ovr_log()
+            # quantize in place into the array of the previous run when possible
+            if self.x_q is None or self.x_q.shape != self.x.shape:
+                self.x_q = np.empty(self.x.shape)
+            self.q_i.fixp(self.x.real, out=self.x_q)
+            self.ovr_idx, self.ovr_sign = self.q_i.get_ovr_log()
+            self.q_i.enable_ovr_log(False)
+
+            # x_q only contains multiples of the LSB, scaling with 2**WF is exact
+            self.sig_tx.emit({'sender':__name__, 'fx_sim':'send_stimulus',
+                    'fx_stimulus':(self.x_q * (1 << self.q_i.WF)).astype(int)})
+            logger.debug("fx stimulus sent")
+
+        self.needs_redraw[:] = [True] * 2
+        return self.fx_sim
+
+#------------------------------------------------------------------------------
+    def calc_stimulus_block(self, n, first=True):
+        """
+        Calculate and return the stimulus for the sample indices `n`, i.e. for
+        the whole simulation or for one block of a block-by-block simulation.
+        The state of MLS and brownian noise is carried over from the previous
+        block unless `first == True`. Return `None` for an unknown stimulus.
+        """
+        if first:
+            self.noi_state = None
+            # calculate index from T1 entry for creating stimulus vectors, shifted
+            # by T1. Limit the value to N_end - 1.
+            self.T1_int = min(int(np.round(self.ui.T1)), self.ui.N_end-1)
         phi1 = self.ui.phi1 / 180 * pi
         phi2 = self.ui.phi2 / 180 * pi
         #T_S = fb.fil[0]['T_S']
-        # calculate index from T1 entry for creating stimulus vectors, shifted
-        # by T1. Limit the value to N_end - 1.
-        self.T1_int = min(int(np.round(self.ui.T1)), self.ui.N_end-1)
 
         # calculate stimuli x[n] ==============================================
         self.H_str = ''
         self.title_str = ""
 
         if self.ui.stim == "None":
-            self.x = np.zeros(self.ui.N_end)
+            x = np.zeros(len(n))
             self.title_str = r'Zero Input System Response'
             self.H_str = r'$h_0[n]$' # default
 
@@ -433,19 +500,19 @@ class Plot_Impz(QWidget):
             else:
                 A_type = float
 
-            self.x = np.zeros(self.ui.N_end, dtype=A_type)
-            self.x[self.T1_int] = self.ui.A1 # create dirac impulse as input signal
+            x = np.zeros(len(n), dtype=A_type)
+            x[n == self.T1_int] = self.ui.A1 # create dirac impulse as input signal
             self.title_str = r'Impulse Response'
             self.H_str = r'$h[n]$' # default
 
         elif self.ui.stim == "Sinc":
-            self.x = self.ui.A1 * sinc(2 * (self.n - self.ui.N//2 - self.ui.T1) * self.ui.f1 ) +\
-                self.ui.A2 * sinc(2 * (self.n - self.ui.N//2 - self.ui.T2) * self.ui.f2)
+            x = self.ui.A1 * sinc(2 * (n - self.ui.N//2 - self.ui.T1) * self.ui.f1 ) +\
+                self.ui.A2 * sinc(2 * (n - self.ui.N//2 - self.ui.T2) * self.ui.f2)
             self.title_str += r'Sinc Signal '
 
         elif self.ui.stim == "Gauss":
-            self.x = self.ui.A1 * sig.gausspulse((self.n - self.ui.N//2 - self.ui.T1), fc=self.ui.f1 ) +\
-                self.ui.A2 * sig.gausspulse((self.n - self.ui.N//2 - self.ui.T2), fc=self.ui.f2)
+            x = self.ui.A1 * sig.gausspulse((n - self.ui.N//2 - self.ui.T1), fc=self.ui.f1 ) +\
+                self.ui.A2 * sig.gausspulse((n - self.ui.N//2 - self.ui.T2), fc=self.ui.f2)
             self.title_str += r'Gaussian Pulse '
 
         elif self.ui.stim == "Rect":
@@ -453,16 +520,19 @@ class Plot_Impz(QWidget):
             n_max = int(np.round(self.ui.N/2 + self.ui.T1/2))
 
             self.title_str += r'Rect Pulse '
-            if self.ui.chk_stim_bl.isChecked():
-                self.x = self.ui.A1 * np.abs(np.fft.fftshift(
-                    np.fft.ifft(sinc(self.n * self.ui.T1/self.ui.N)))) * np.sqrt(2) * self.ui.T1
+            if self.ui.chk_stim_bl.isChecked() and len(n) < self.ui.N_end:
+                logger.warning("Bandlimited rect pulse is not available for "
+                               "block simulation, using rect pulse instead.")
+            if self.ui.chk_stim_bl.isChecked() and len(n) == self.ui.N_end:
+                x = self.ui.A1 * np.abs(np.fft.fftshift(
+                    np.fft.ifft(sinc(n * self.ui.T1/self.ui.N)))) * np.sqrt(2) * self.ui.T1
             else:
-                self.x = self.ui.A1 * np.where((self.n >= n_min) & (self.n <= n_max), 1,0)
+                x = self.ui.A1 * np.where((n >= n_min) & (n <= n_max), 1,0)
 
 
         elif self.ui.stim == "Step":
-            self.x = self.ui.A1 * np.ones(self.ui.N_end) # create step function
-            self.x[0:self.T1_int].fill(0)
+            x = self.ui.A1 * np.ones(len(n)) # create step function
+            x[n < self.T1_int] = 0
             if self.ui.chk_step_err.isChecked():
                 self.title_str = r'Settling Error'
                 self.H_str = r'$h_{\epsilon, \infty} - h_{\epsilon}[n]$'
@@ -472,13 +542,13 @@ class Plot_Impz(QWidget):
 
 
         elif self.ui.stim == "Cos":
-            self.x = self.ui.A1 * np.cos(2*pi * self.n * self.ui.f1 + phi1) +\
-                self.ui.A2 * np.cos(2*pi * self.n * self.ui.f2 + phi2)
+            x = self.ui.A1 * np.cos(2*pi * n * self.ui.f1 + phi1) +\
+                self.ui.A2 * np.cos(2*pi * n * self.ui.f2 + phi2)
             self.title_str += r'Cosine Signal'
 
         elif self.ui.stim == "Sine":
-            self.x = self.ui.A1 * np.sin(2*pi * self.n * self.ui.f1 + phi1) +\
-                self.ui.A2 * np.sin(2*pi * self.n * self.ui.f2 + phi2)
+            x = self.ui.A1 * np.sin(2*pi * n * self.ui.f1 + phi1) +\
+                self.ui.A2 * np.sin(2*pi * n * self.ui.f2 + phi2)
             self.title_str += r'Sinusoidal Signal '
 
 
@@ -488,113 +558,104 @@ class Plot_Impz(QWidget):
                 T_end = self.ui.N_end
             else:
                 T_end = self.ui.T2
-            self.x = self.ui.A1 * sig.chirp(self.n, self.ui.f1, T_end, self.ui.f2,
+            x = self.ui.A1 * sig.chirp(n, self.ui.f1, T_end, self.ui.f2,
                                             method=self.ui.chirp_type.lower(), phi=phi1)
             self.title_str += self.ui.chirp_type + ' Chirp Signal'
 
         elif self.ui.stim == "Triang":
             if self.ui.chk_stim_bl.isChecked():
-                self.x = self.ui.A1 * triang_bl(2*pi * self.n * self.ui.f1 + phi1)
+                x = self.ui.A1 * triang_bl(2*pi * n * self.ui.f1 + phi1)
                 self.title_str += r'Bandlim. Triangular Signal'
             else:
-                self.x = self.ui.A1 * sig.sawtooth(2*pi * self.n * self.ui.f1 + phi1, width=0.5)
+                x = self.ui.A1 * sig.sawtooth(2*pi * n * self.ui.f1 + phi1, width=0.5)
                 self.title_str += r'Triangular Signal'
 
         elif self.ui.stim == "Saw":
             if self.ui.chk_stim_bl.isChecked():
-                self.x = self.ui.A1 * sawtooth_bl(2*pi * self.n * self.ui.f1 + phi1)
+                x = self.ui.A1 * sawtooth_bl(2*pi * n * self.ui.f1 + phi1)
                 self.title_str += r'Bandlim. Sawtooth Signal'
             else:
-                self.x = self.ui.A1 * sig.sawtooth(2*pi * self.n * self.ui.f1 + phi1)
+                x = self.ui.A1 * sig.sawtooth(2*pi * n * self.ui.f1 + phi1)
                 self.title_str += r'Sawtooth Signal'
 
         elif self.ui.stim == "Square":
             if self.ui.chk_stim_bl.isChecked():
-                self.x = self.ui.A1 * rect_bl(2*pi * self.n * self.ui.f1 + phi1,
+                x = self.ui.A1 * rect_bl(2*pi * n * self.ui.f1 + phi1,
                                               duty=self.ui.stim_par1)
                 self.title_str += r'Bandlimited Rect. Signal'
             else:
-                self.x = self.ui.A1 * sig.square(2*pi * self.n * self.ui.f1 + phi1,
+                x = self.ui.A1 * sig.square(2*pi * n * self.ui.f1 + phi1,
                                                  duty=self.ui.stim_par1)
                 self.title_str += r'Rect. Signal'
 
         elif self.ui.stim == "Comb":
-            self.x = self.ui.A1 * comb_bl(2*pi * self.n * self.ui.f1 + phi1)
+            x = self.ui.A1 * comb_bl(2*pi * n * self.ui.f1 + phi1)
             self.title_str += r'Bandlim. Comb Signal'
 
 
         elif self.ui.stim == "AM":
-            self.x = self.ui.A1 * np.sin(2*pi * self.n * self.ui.f1 + phi1)\
-                * self.ui.A2 * np.sin(2*pi * self.n * self.ui.f2 + phi2)
+            x = self.ui.A1 * np.sin(2*pi * n * self.ui.f1 + phi1)\
+                * self.ui.A2 * np.sin(2*pi * n * self.ui.f2 + phi2)
             self.title_str += r'AM Signal $A_1 \sin(2 \pi n f_1 + \varphi_1) \cdot A_2 \sin(2 \pi n f_2 + \varphi_2)$'
         elif self.ui.stim == "PM / FM":
-            self.x = self.ui.A1 * np.sin(2*pi * self.n * self.ui.f1 + phi1 +\
-                self.ui.A2 * np.sin(2*pi * self.n * self.ui.f2 + phi2))
+            x = self.ui.A1 * np.sin(2*pi * n * self.ui.f1 + phi1 +\
+                self.ui.A2 * np.sin(2*pi * n * self.ui.f2 + phi2))
             self.title_str += r'PM / FM Signal $A_1 \sin(2 \pi n f_1 + \varphi_1 + A_2 \sin(2 \pi n f_2 + \varphi_2))$'
         elif self.ui.stim == "Formula":
             param_dict = {"A1":self.ui.A1, "A2":self.ui.A2,
                           "f1":self.ui.f1, "f2":self.ui.f2,
                           "phi1":self.ui.phi1, "phi2":self.ui.phi2,
-                          "f_S":fb.fil[0]['f_S'], "n":self.n}
+                          "f_S":fb.fil[0]['f_S'], "n":n}
 
-            self.x = safe_numexpr_eval(self.ui.stim_formula, (self.ui.N_end,), param_dict)
+            x = safe_numexpr_eval(self.ui.stim_formula, (len(n),), param_dict)
             self.title_str += r'Formula Defined Signal'
         else:
             logger.error('Unknown stimulus format "{0}"'.format(self.ui.stim))
-            return
+            return None
 
         # Add noise to stimulus
         noi = 0
         if self.ui.noise == "none":
             pass
         elif self.ui.noise == "gauss":
-            noi = self.ui.noi * np.random.randn(len(self.x))
+            noi = self.ui.noi * np.random.randn(len(n))
             self.title_str += r' + Gaussian Noise'
         elif self.ui.noise == "uniform":
-            noi = self.ui.noi * (np.random.rand(len(self.x))-0.5)
+            noi = self.ui.noi * (np.random.rand(len(n))-0.5)
             self.title_str += r' + Uniform Noise'
         elif self.ui.noise == "prbs":
-            noi = self.ui.noi * 2 * (np.random.randint(0, 2, len(self.x))-0.5)
+            noi = self.ui.noi * 2 * (np.random.randint(0, 2, len(n))-0.5)
             self.title_str += r' + PRBS Noise'
         elif self.ui.noise == "mls":
-            # max_len_seq returns `sequence, state`. The state is not stored here,
-            # hence, an identical sequence is created every time.
-            noi = self.ui.noi * 2 * (sig.max_len_seq(int(np.ceil(np.log2(len(self.x)))),
-                                        length=len(self.x), state=None)[0] - 0.5)
+            # max_len_seq returns `sequence, state`. The state is only carried
+            # over between blocks, hence, an identical sequence is created every time.
+            mls, self.noi_state = sig.max_len_seq(int(np.ceil(np.log2(self.ui.N_end))),
+                                        length=len(n), state=self.noi_state)
+            noi = self.ui.noi * 2 * (mls - 0.5)
             self.title_str += r' + max. length sequence'
         elif self.ui.noise == "brownian":
             # brownian noise
-            noi = np.cumsum(self.ui.noi * np.random.randn(len(self.x)))
+            noi = np.cumsum(self.ui.noi * np.random.randn(len(n)))
+            if self.noi_state is not None: # continue random walk of previous block
+                noi += self.noi_state
+            self.noi_state = noi[-1] if len(noi) > 0 else self.noi_state
             self.title_str += r' + Brownian Noise'
         else:
             logger.error('Unknown kind of noise "{}"'.format(self.ui.noise))
         if type(self.ui.noi) == complex:
-            self.x = self.x.astype(complex) + noi
+            x = x.astype(complex) + noi
         else:
-            self.x += noi
+            x += noi
         # Add DC to stimulus when visible / enabled
         if self.ui.ledDC.isVisible:
             if type(self.ui.DC) == complex:
-                self.x = self.x.astype(complex) + self.ui.DC
+                x = x.astype(complex) + self.ui.DC
             else:
-                self.x += self.ui.DC
+                x += self.ui.DC
             if self.ui.DC != 0:
                 self.title_str += r' + DC'
 
-        if self.fx_sim:
-            self.title_str = r'$Fixpoint$ ' + self.title_str
-            self.q_i = fx.Fixed(fb.fil[0]['fxqc']['QI']) # setup quantizer for input quantization
-            self.q_i.setQobj({'frmt':'dec'})    # always use integer decimal format
-            if np.any(np.iscomplex(self.x)):
-                logger.warning("Complex stimulus: Only its real part will be processed by the fixpoint filter!")
-
-            self.x_q = self.q_i.fixp(self.x.real)
-
-            self.sig_tx.emit({'sender':__name__, 'fx_sim':'send_stimulus',
-                    'fx_stimulus':np.round(self.x_q * (1 << self.q_i.WF)).astype(int)})
-            logger.debug("fx stimulus sent")
-
-        self.needs_redraw[:] = [True] * 2
+        return x
 
 #------------------------------------------------------------------------------
     def calc_response(self):
@@ -631,38 +692,184 @@ class Plot_Impz(QWidget):
             y[self.T1_int:] = y[self.T1_int:] - abs(dc[1])
 
         self.y = np.real_if_close(y, tol=1e3)  # tol specified in multiples of machine eps
+        self.fx_rate = (1, 1)
 
         self.needs_redraw[:] = [True] * 2
 
         # Calculate imag. and real components from response
         self.cmplx = np.any(np.iscomplex(self.y)) or np.any(np.iscomplex(self.x))
         self.ui.lbl_stim_cmplx_warn.setVisible(self.cmplx)
+#------------------------------------------------------------------------------
+    def calc_blocks(self):
+        """
+        Calculate stimulus and response block by block with the block length
+        `self.ui.N_win` for long simulations with bounded memory. The filter
+        state `zi` is carried over from block to block.
+
+        - Only every `self.N_dec`-th sample of stimulus and response is kept
+          for plotting, at most `params['N_preview']` samples.
+
+        - The spectra `self.X` and `self.Y` are averaged over all complete
+          blocks in the interval `N_start ... N_end` using the FFT window.
+
+        - Running statistics of stimulus and response in the interval
+          `N_start ... N_end` are stored in `self.stats_x` and `self.stats_y`.
+        """
+        self.bb = np.asarray(fb.fil[0]['ba'][0])
+        self.aa = np.asarray(fb.fil[0]['ba'][1])
+        if min(len(self.aa), len(self.bb)) < 2:
+            logger.error('No proper filter coefficients: len(a), len(b) < 2 !')
+            return
+        if 'zpkA' in fb.fil[0]:
+            logger.error("Block simulation is not possible for anticausal filters!")
+            self.error = True
+            return
+
+        sos = np.asarray(fb.fil[0]['sos'])
+        if len(sos) > 0:
+            zi = np.zeros((len(sos), 2))
+        else:
+            zi = np.zeros(max(len(self.aa), len(self.bb)) - 1)
+        step_err = self.ui.stim == "Step" and self.ui.chk_step_err.isChecked()
+        if step_err:
+            dc = abs(sig.freqz(self.bb, self.aa, [0])[1]) # DC response of the system
+
+        N_start, N_end, N_blk = self.ui.N_start, self.ui.N_end, self.ui.N_win
+        self.N_dec = D = max(-(-N_end // params['N_preview']), 1)
+        self.stats_x = RunningStats()
+        self.stats_y = RunningStats()
+        spec_x = AvgSpectrum(self.ui.win)
+        spec_y = AvgSpectrum(self.ui.win)
+        n_prv, x_prv, y_prv = [], [], []
+        # blocks are aligned to N_start to use complete blocks for the spectra
+        blocks = [(n0, min(n0 + N_blk, N_start)) for n0 in range(0, N_start, N_blk)]\
+            + [(n0, min(n0 + N_blk, N_end)) for n0 in range(N_start, N_end, N_blk)]
+
+        for n0, n1 in blocks:
+            n = np.arange(n0, n1)
+            x = self.calc_stimulus_block(n, first=(n0 == 0))
+            if x is None:
+                self.error = True
+                return
+            if len(sos) > 0:
+                y, zi = sig.sosfilt(sos, x, zi=zi)
+            else:
+                y, zi = sig.lfilter(self.bb, self.aa, x, zi=zi)
+            if step_err:
+                y[n >= self.T1_int] -= dc # subtract DC (final) value from response
+
+            if n0 >= N_start:
+                self.stats_x.update(x)
+                self.stats_y.update(y)
+                if n1 - n0 == N_blk:
+                    spec_x.update(x)
+                    spec_y.update(y)
+            # keep samples with indices n = 0, D, 2D, ...
+            i0 = -n0 % D
+            n_prv.append(n[i0::D])
+            x_prv.append(x[i0::D])
+            y_prv.append(y[i0::D])
+
+        self.n = np.concatenate(n_prv)
+        self.x = np.concatenate(x_prv)
+        self.y = np.real_if_close(np.concatenate(y_prv), tol=1e3)
+        self.X = spec_x.spectrum()
+        self.Y = spec_y.spectrum()
+        self.nenbw_x = self.nenbw_y = self.ui.nenbw
+        self.fx_rate = (1, 1)
+        self.blk_sim = True
+
+        logger.info("Block simulation: {0} blocks, {1} averaged spectra, preview decimated by {2}\n"
+                    "\tx: mean = {3:.4g}, rms = {4:.4g}, min = {5:.4g}, max = {6:.4g}\n"
+                    "\ty: mean = {7:.4g}, rms = {8:.4g}, min = {9:.4g}, max = {10:.4g}"
+                    .format(len(blocks), spec_y.N_avg, D,
+                            self.stats_x.mean, self.stats_x.rms, self.stats_x.min, self.stats_x.max,
+                            self.stats_y.mean, self.stats_y.rms, self.stats_y.min, self.stats_y.max))
+
+        self.needs_redraw[:] = [True] * 2
+        self.cmplx = np.any(np.iscomplex(self.y)) or np.any(np.iscomplex(self.x))
+        self.ui.lbl_stim_cmplx_warn.setVisible(self.cmplx)
+
 #------------------------------------------------------------------------------
     def draw_response_fx(self, dict_sig=None):
         """
         Get Fixpoint results and plot them
+
+        While the simulation is running in the background, `dict_sig` contains
+        the partial results and the key 'fx_progress'. Missing samples of the
+        response are set to zero for plotting and `self.needs_calc` remains
+        True. The same applies when the simulation has been cancelled
+        ('fx_cancelled':True).
+
+        The response of multirate filters has `L / M` times the number of
+        stimulus samples with the interpolation and decimation factors
+        `(L, M)` passed as 'fx_rate'.
         """
         if self.needs_calc:
             self.needs_redraw = [True] * 2
             #t_draw_start = time.process_time()
-            self.y = np.asarray(dict_sig['fx_results'])
-            if self.y is None:
+            if dict_sig['fx_results'] is None:
+                self.fx_set_running(False)
                 qstyle_widget(self.ui.but_run, "error")
                 self.needs_calc = True
-            else:
-                self.needs_calc = False
+                return
 
+            self.y = np.asarray(dict_sig['fx_results'])
+            self.fx_rate = dict_sig.get('fx_rate', (1, 1))
+            L, M = self.fx_rate
+            N_y = -(-len(self.x) * L // M) # ceil(len(x) * L / M)
+            partial = 'fx_progress' in dict_sig or dict_sig.get('fx_cancelled', False)
+            if partial and len(self.y) < N_y:
+                self.y = np.concatenate((self.y, np.zeros(N_y - len(self.y),
+                                                          dtype=self.y.dtype)))
+            if 'fx_progress' in dict_sig:
+                self.fx_set_running(True, dict_sig['fx_progress'])
                 self.draw()
-                qstyle_widget(self.ui.but_run, "normal")
+                return
+
+            self.fx_set_running(False)
+            self.needs_calc = partial
+            self.draw()
+            qstyle_widget(self.ui.but_run, "changed" if partial else "normal")
 
-                self.sig_tx.emit({'sender':__name__, 'fx_sim':'finish'})
+            self.sig_tx.emit({'sender':__name__, 'fx_sim':'finish'})
+
+#------------------------------------------------------------------------------
+    def fx_set_running(self, running, progress=None):
+        """
+        Set the flag `self.fx_running` and turn `but_run` into a "Cancel" button
+        showing the `progress` (0 ... 1) of a running fixpoint simulation. The
+        button is always enabled during the simulation, even in autorun mode.
+        """
+        self.fx_running = running
+        if running:
+            self.ui.but_run.setEnabled(True)
+            if progress is None:
+                self.ui.but_run.setText("Cancel")
+            else:
+                self.ui.but_run.setText("Cancel {0:d}%".format(int(progress * 100)))
+            self.ui.but_run.setToolTip("Cancel fixpoint simulation")
+        else:
+            self.ui.but_run.setEnabled(not self.ui.chk_auto_run.isChecked())
+            self.ui.but_run.setText("RUN")
+            self.ui.but_run.setToolTip("Run simulation")
 
 #------------------------------------------------------------------------------
     def calc_fft(self):
         """
         (Re-)calculate FFTs of stimulus `self.X`, quantized stimulus `self.X_q`
         and response `self.Y` using the window function `self.ui.win`.
+
+        For multirate fixpoint filters, the FFT of the response is calculated
+        from the `N * L / M` response samples of the same time interval with a
+        window of the same type and the corresponding NENBW `self.nenbw_y`.
+
+        Nothing is done for block simulations, the spectra have already been
+        averaged by `calc_blocks()`.
         """
+        if self.blk_sim:
+            return
+        self.nenbw_x = self.ui.nenbw
         # calculate FFT of stimulus / response
         if self.x is None or len(self.x) < self.ui.N_end:
             self.X = np.zeros(self.ui.N_end-self.ui.N_start) # dummy result
@@ -680,20 +887,33 @@ class Plot_Impz(QWidget):
 
             if self.fx_sim:
                 # same for fixpoint simulation
-                x_q_win = self.q_i.fixp(self.x[self.ui.N_start:self.ui.N_end]) * self.ui.win
+                # the stimulus has already been quantized by calc_stimulus()
+                x_q_win = self.x_q[self.ui.N_start:self.ui.N_end] * self.ui.win
                 self.X_q = np.fft.fft(x_q_win) / self.ui.N
                 #self.X_q[0] = self.X_q[0] * np.sqrt(2) # correct value at DC
 
-        if self.y is None or len(self.y) < self.ui.N_end:
-            self.Y = np.zeros(self.ui.N_end-self.ui.N_start) # dummy result
+        L, M = self.fx_rate
+        N_y = max(self.ui.N * L // M, 1) # number of response samples for the FFT
+        N_start_y = -(-self.ui.N_start * L // M)
+        if (L, M) == (1, 1):
+            win_y = self.ui.win
+            self.nenbw_y = self.ui.nenbw
+        else:
+            win_y = calc_window_function(self.ui.win_dict, self.ui.window_name,
+                                         N=N_y, sym=False)
+            self.nenbw_y = N_y * np.sum(np.square(win_y)) / (np.square(np.sum(win_y)))
+            win_y = win_y * N_y / np.sum(win_y) # correct gain for periodic signals
+
+        if self.y is None or len(self.y) < N_start_y + N_y:
+            self.Y = np.zeros(N_y) # dummy result
             if self.y is None:
                 logger.warning("Transient response is 'None', FFT cannot be calculated.")
             else:
                 logger.warning("Length of transient response is {0} < N = {1}, FFT cannot be calculated."
-                               .format(len(self.y), self.ui.N_end))
+                               .format(len(self.y), N_start_y + N_y))
         else:
-            y_win = self.y[self.ui.N_start:self.ui.N_end] * self.ui.win
-            self.Y = np.fft.fft(y_win) / self.ui.N
+            y_win = self.y[N_start_y:N_start_y + N_y] * win_y
+            self.Y = np.fft.fft(y_win) / N_y
             #self.Y[0] = self.Y[0] * np.sqrt(2) # correct value at DC
 
 #        if self.ui.chk_win_freq.isChecked():
@@ -742,6 +962,15 @@ class Plot_Impz(QWidget):
         self.ui.lbl_TU2.setText(to_html(t_unit, frmt=unit_frmt))
 
         self.t = self.n * fb.fil[0]['T_S']
+        # time axis and first displayed sample of the response, the response
+        # of multirate filters has L / M times the sampling rate of the stimulus
+        # For block simulations, only every N_dec-th sample has been stored.
+        L, M = self.fx_rate
+        D = self.N_dec
+        N_y = len(self.y) if self.y is not None else 0
+        self.t_y = np.arange(N_y) * fb.fil[0]['T_S'] * D * M / L
+        self.N_start_y = -(-self.ui.N_start * L // (M * D))
+        self.N_start_x = min(-(-self.ui.N_start // D), len(self.t) - 1)
 #        self.ui.load_fs()
 
         self.scale_i = self.scale_o = 1
@@ -1039,25 +1268,31 @@ class Plot_Impz(QWidget):
         if self.ui.chk_fx_limits.isChecked() and self.fx_sim:
             self.ax_r.axhline(fx_max, 0, 1, color='k', linestyle='--')
             self.ax_r.axhline(fx_min, 0, 1, color='k', linestyle='--')
+            # mark overflows of the input quantizer on the fixpoint limits
+            ovr = (self.ovr_idx >= self.ui.N_start) & (self.ovr_idx < len(self.t))
+            if np.any(ovr):
+                self.ax_r.plot(self.t[self.ovr_idx[ovr]],
+                               np.where(self.ovr_sign[ovr] > 0, fx_max, fx_min),
+                               'x', color='k', label='$x_Q$ overflow')
 
         # --------------- Stimulus plot ----------------------------------
-        self.draw_data(self.plt_time_stim, self.ax_r, self.t[self.ui.N_start:],
-              x_r[self.ui.N_start:], label=lbl_x_r, bottom=bottom_t,
+        self.draw_data(self.plt_time_stim, self.ax_r, self.t[self.N_start_x:],
+              x_r[self.N_start_x:], label=lbl_x_r, bottom=bottom_t,
               plt_fmt=self.fmt_plot_stim, mkr=self.plt_time_stim_mkr, mkr_fmt=self.fmt_mkr_stim)
 
         #-------------- Stimulus <q> plot --------------------------------
         if x_q is not None and self.plt_time_stmq != "none":
-            self.draw_data(self.plt_time_stmq, self.ax_r, self.t[self.ui.N_start:],
-                  x_q[self.ui.N_start:], label='$x_q[n]$', bottom=bottom_t,
+            self.draw_data(self.plt_time_stmq, self.ax_r, self.t[self.N_start_x:],
+                  x_q[self.N_start_x:], label='$x_q[n]$', bottom=bottom_t,
                   plt_fmt=self.fmt_plot_stmq, mkr=self.plt_time_stmq_mkr, mkr_fmt=self.fmt_mkr_stmq)
 
         # --------------- Response plot ----------------------------------
-        self.draw_data(self.plt_time_resp, self.ax_r, self.t[self.ui.N_start:],
-              y_r[self.ui.N_start:], label=lbl_y_r, bottom=bottom_t,
+        self.draw_data(self.plt_time_resp, self.ax_r, self.t_y[self.N_start_y:],
+              y_r[self.N_start_y:], label=lbl_y_r, bottom=bottom_t,
               plt_fmt=self.fmt_plot_resp, mkr=self.plt_time_resp_mkr, mkr_fmt=self.fmt_mkr_resp)
 
         # --------------- Window plot ----------------------------------
-        if self.ui.chk_win_time.isChecked():
+        if self.ui.chk_win_time.isChecked() and not self.blk_sim:
             self.ax_r.plot(self.t[self.ui.N_start:], win, c="gray", label=self.ui.window_name)
 
         # --------------- LEGEND (real part) ----------------------------------
@@ -1068,14 +1303,14 @@ class Plot_Impz(QWidget):
         if self.cmplx and (self.plt_time_resp != "none" or self.plt_time_stim != "none"):
 
             # --- imag. part of response -----
-            self.draw_data(self.plt_time_resp, self.ax_i, self.t[self.ui.N_start:],
-                  y_i[self.ui.N_start:], label=lbl_y_i, bottom=bottom_t,
+            self.draw_data(self.plt_time_resp, self.ax_i, self.t_y[self.N_start_y:],
+                  y_i[self.N_start_y:], label=lbl_y_i, bottom=bottom_t,
                   plt_fmt=self.fmt_plot_resp, mkr=self.plt_time_resp_mkr, mkr_fmt=self.fmt_mkr_resp,
                   marker=mkfmt_i)
 
             # --- imag. part of stimulus -----
-            self.draw_data(self.plt_time_stim, self.ax_i, self.t[self.ui.N_start:],
-                  x_i[self.ui.N_start:], label=lbl_x_i, bottom=bottom_t,
+            self.draw_data(self.plt_time_stim, self.ax_i, self.t[self.N_start_x:],
+                  x_i[self.N_start_x:], label=lbl_x_i, bottom=bottom_t,
                   plt_fmt=self.fmt_plot_stim, mkr=self.plt_time_stim_mkr, mkr_fmt=self.fmt_mkr_stim,
                   marker=mkfmt_i)
 
@@ -1093,15 +1328,17 @@ class Plot_Impz(QWidget):
 
         # --------------- Spectrogram -----------------------------------------
         if self.spgr:
+            f_S_spgr = fb.fil[0]['f_S'] / self.N_dec
             if self.plt_time_spgr == "x[n]":
-                s = x[self.ui.N_start:]
+                s = x[self.N_start_x:]
                 sig_lbl = 'X'
             elif self.plt_time_spgr == "x_q[n]":
-                s = self.x_q[self.ui.N_start:]
+                s = self.x_q[self.N_start_x:]
                 sig_lbl = 'X_Q'
             elif self.plt_time_spgr == "y[n]":
-                s = y[self.ui.N_start:]
+                s = y[self.N_start_y:]
                 sig_lbl = 'Y'
+                f_S_spgr *= self.fx_rate[0] / self.fx_rate[1]
             else:
                 s = None
                 sig_lbl = 'None'
@@ -1158,7 +1395,7 @@ class Plot_Impz(QWidget):
                 scale = 'linear'
                 bottom_spgr = 0
 
-            t_range = (self.t[self.ui.N_start], self.t[-1])
+            t_range = (self.t[self.N_start_x], self.t[-1])
             # hidden images: https://scipython.com/blog/hidden-images-in-spectrograms/
 
 # =============================================================================
@@ -1168,7 +1405,7 @@ class Plot_Impz(QWidget):
 #                                         scaling='density',mode='psd')
 #             # mode: 'psd', 'complex','magnitude','angle', 'phase'
 # =============================================================================
-            Sxx,f,t,im = self.ax_s.specgram(s, Fs=fb.fil[0]['f_S'], NFFT=self.ui.nfft_spgr_time,
+            Sxx,f,t,im = self.ax_s.specgram(s, Fs=f_S_spgr, NFFT=self.ui.nfft_spgr_time,
                                         noverlap=self.ui.ovlp_spgr_time, pad_to=None, xextent=t_range,
                                         sides=sides, scale_by_freq=self.ui.chk_byfs_spgr_time.isChecked(),
                                         mode=mode, scale=scale, vmin=bottom_spgr, cmap=None)
@@ -1206,7 +1443,7 @@ class Plot_Impz(QWidget):
         # --------------- Title and common labels ----------------------------
         self.axes_time[-1].set_xlabel(fb.fil[0]['plt_tLabel'])
         self.axes_time[0].set_title(self.title_str)
-        self.ax_r.set_xlim([self.t[self.ui.N_start], self.t[self.ui.N_end-1]])
+        self.ax_r.set_xlim([self.t[self.N_start_x], self.t[-1]])
         #expand_lim(self.ax_r, 0.02)
 
         self.redraw() # redraw currently active mplwidget
@@ -1298,21 +1535,28 @@ class Plot_Impz(QWidget):
 
 
             F_range = fb.fil[0]['freqSpecsRange']
+            N_x = len(self.X) # FFT length, N or block length N_blk
 
             if fb.fil[0]['freq_specs_unit'] == 'k':
                 # By default, k = params['N_FFT'] which is used for the calculation
                 # of the non-transient tabs and for F_id / H_id here.
                 # Here, the frequency axes must be scaled to fit the number of
                 # frequency points self.ui.N
-                F_range = [f * self.ui.N / fb.fil[0]['f_max'] for f in F_range]
-                f_max = self.ui.N
+                F_range = [f * N_x / fb.fil[0]['f_max'] for f in F_range]
+                f_max = N_x
             else:
                 f_max = fb.fil[0]['f_max']
 
             # freqz-based ideal frequency response:
             F_id, H_id = calc_Hcomplex(fb.fil[0], params['N_FFT'], True, fs=f_max)
             # frequency vector for FFT-based frequency plots:
-            F = np.fft.fftfreq(self.ui.N, d=1. / f_max)
+            F = np.fft.fftfreq(N_x, d=1. / f_max)
+            # frequency vector for the response, its sampling rate is L / M times
+            # the sampling rate of the stimulus for multirate filters
+            L, M = self.fx_rate
+            f_max_y = f_max * L / M
+            N_y = len(self.Y)
+            F_y = np.fft.fftfreq(N_y, d=1. / f_max_y)
         #-----------------------------------------------------------------
         # Scale frequency response and calculate power
         #-----------------------------------------------------------------
@@ -1324,28 +1568,28 @@ class Plot_Impz(QWidget):
             if self.ui.chk_scale_impz_f.isEnabled() and self.ui.stim == "Impulse"\
                 and self.ui.chk_scale_impz_f.isChecked():
                 freq_resp = True # calculate frequency response from impulse response
-                scale_impz = self.ui.N
+                scale_impz = N_x
             else:
                 freq_resp = False
                 scale_impz = 1.
 
             if plt_stimulus:
                 # scale display of frequency response
-                Px = np.sum(np.square(np.abs(self.X))) * scale_impz / self.ui.nenbw
+                Px = np.sum(np.square(np.abs(self.X))) * scale_impz / self.nenbw_x
                 if fb.fil[0]['freqSpecsRangeType'] == 'half' and not freq_resp:
                     X = calc_ssb_spectrum(self.X) * self.scale_i * scale_impz
                 else:
                     X = self.X * self.scale_i * scale_impz
 
             if plt_stimulus_q:
-                Pxq = np.sum(np.square(np.abs(self.X_q))) * scale_impz / self.ui.nenbw
+                Pxq = np.sum(np.square(np.abs(self.X_q))) * scale_impz / self.nenbw_x
                 if fb.fil[0]['freqSpecsRangeType'] == 'half' and not freq_resp:
                     X_q = calc_ssb_spectrum(self.X_q) * self.scale_i * scale_impz
                 else:
                     X_q = self.X_q * self.scale_i * scale_impz
 
             if plt_response:
-                Py = np.sum(np.square(np.abs(self.Y * self.scale_o))) * scale_impz / self.ui.nenbw
+                Py = np.sum(np.square(np.abs(self.Y * self.scale_o))) * scale_impz / self.nenbw_y
                 if fb.fil[0]['freqSpecsRangeType'] == 'half' and not freq_resp:
                     Y = calc_ssb_spectrum(self.Y) * self.scale_o * scale_impz
                 else:
@@ -1366,6 +1610,7 @@ class Plot_Impz(QWidget):
                     X_q = np.fft.fftshift(X_q)
 
                 F    = np.fft.fftshift(F)
+                F_y  = np.fft.fftshift(F_y)
 
                 # shift H_id and F_id by f_S/2
                 F_id -= f_max/2
@@ -1376,19 +1621,21 @@ class Plot_Impz(QWidget):
             elif fb.fil[0]['freqSpecsRangeType'] == 'half':
                 # display 0 ... f_S/2 -> only use the first half of X, Y and F
                 if plt_response:
-                    Y = Y[0:self.ui.N//2]
+                    Y = Y[0:N_y//2]
                 if plt_stimulus:
-                    X = X[0:self.ui.N//2]
+                    X = X[0:N_x//2]
                 if plt_stimulus_q:
-                    X_q = X_q[0:self.ui.N//2]
+                    X_q = X_q[0:N_x//2]
 
-                F    = F[0:self.ui.N//2]
+                F    = F[0:N_x//2]
+                F_y  = F_y[0:N_y//2]
                 F_id = F_id[0:params['N_FFT']//2]
                 H_id = H_id[0:params['N_FFT']//2]
 
             else: # fb.fil[0]['freqSpecsRangeType'] == 'whole'
                 # display 0 ... f_S -> shift frequency axis
                 F    = np.fft.fftshift(F) + f_max/2.
+                F_y  = np.fft.fftshift(F_y) + f_max_y/2.
                 if not freq_resp:
                     H_id /= 2
 
@@ -1403,7 +1650,7 @@ class Plot_Impz(QWidget):
                 H_F_pre = "|"
                 H_F_post = "|"
 
-                nenbw = 10 * np.log10(self.ui.nenbw)
+                nenbw = 10 * np.log10(self.nenbw_x)
                 cgain = 20 * np.log10(self.ui.cgain)
 
                 if plt_stimulus:
@@ -1474,7 +1721,7 @@ class Plot_Impz(QWidget):
                 unit_P = "W"
                 unit_nenbw = "bins"
                 unit_cgain = ""
-                nenbw = self.ui.nenbw
+                nenbw = self.nenbw_x
                 cgain = self.ui.cgain
 
             if en_re_im_f:
@@ -1528,13 +1775,13 @@ class Plot_Impz(QWidget):
                 if en_re_im_f:
                     label_re = "$Y_r$" + ejO_str
                     label_im = "$Y_i$" + ejO_str
-                    self.draw_data(self.plt_freq_resp, self.ax_f2, F, Y_i,
+                    self.draw_data(self.plt_freq_resp, self.ax_f2, F_y, Y_i,
                         label=label_im, bottom=self.ui.bottom_f, plt_fmt=self.fmt_plot_resp,
                         mkr=self.plt_freq_resp_mkr, mkr_fmt=self.fmt_mkr_resp)
                 if show_info:
                     label_re += ":\t$P$ = {0:.3g} {1}".format(Py, unit_P)
 
-                self.draw_data(self.plt_freq_resp, self.ax_f1, F, Y_r,
+                self.draw_data(self.plt_freq_resp, self.ax_f1, F_y, Y_r,
                     label=label_re, bottom=self.ui.bottom_f, plt_fmt=self.fmt_plot_resp,
                     mkr=self.plt_freq_resp_mkr, mkr_fmt=self.fmt_mkr_resp)
 
@@ -1574,12 +1821,13 @@ class Plot_Impz(QWidget):
             self.axes_f[-1].set_xlabel(fb.fil[0]['plt_fLabel'])
             self.ax_f1.set_ylabel(H_Fr_str)
             #self.ax_f1.set_xlim(fb.fil[0]['freqSpecsRange'])
-            self.ax_f1.set_xlim(F_range)
+            # show the full spectrum of interpolated responses
+            self.ax_f1.set_xlim([f * max(L / M, 1) for f in F_range])
             self.ax_f1.set_title("Spectrum of " + self.title_str)
 
             if self.ui.chk_log_freq.isChecked():
                 # scale second axis for noise power
-                corr = 10*np.log10(self.ui.N / self.ui.nenbw)
+                corr = 10*np.log10(N_x / self.nenbw_x)
                 mn, mx = self.ax_f1.get_ylim()
                 self.ax_f1_noise.set_ylim(mn+corr, mx+corr)
                 self.ax_f1_noise.set_ylabel(r'$P_N$ in dBW')
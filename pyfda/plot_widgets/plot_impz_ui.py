@@ -57,6 +57,9 @@ class PlotImpz_UI(QWidget):
         self.N_start = 0
         self.N_user = 0
         self.N = 0
+        self.blk = False # block-by-block simulation
+        self.N_blk = 4096 # block length for block-by-block simulation
+        self.N_win = 0 # length of FFT window, N or N_blk
 
         # time
         self.plt_time_resp = "Stem"
@@ -174,6 +177,20 @@ class PlotImpz_UI(QWidget):
         self.led_N_start.setText(str(self.N_start))
         self.led_N_start.setToolTip("<span>First point to plot.</span>")
 
+        self.chk_blk = QCheckBox("Blocks", self)
+        self.chk_blk.setObjectName("chk_blk")
+        self.chk_blk.setToolTip("<span>Simulate long stimuli block by block with bounded memory: "
+                                "Only a decimated preview of the signals is kept for plotting, "
+                                "spectra are averaged over blocks of length <i>N<sub>blk</sub></i>. "
+                                "Not available for fixpoint simulation.</span>")
+        self.chk_blk.setChecked(self.blk)
+
+        self.lbl_N_blk = QLabel(to_html("N_blk", frmt='bi') + " =", self)
+        self.led_N_blk = QLineEdit(self)
+        self.led_N_blk.setText(str(self.N_blk))
+        self.led_N_blk.setToolTip("<span>Block length and FFT length for block-by-block "
+                                  "simulation.</span>")
+
         self.chk_fx_scale = QCheckBox("Int. scale", self)
         self.chk_fx_scale.setObjectName("chk_fx_scale")
         self.chk_fx_scale.setToolTip("<span>Display data with integer (fixpoint) scale.</span>")
@@ -208,6 +225,9 @@ class PlotImpz_UI(QWidget):
         layH_ctrl_run.addWidget(self.led_N_start)
         layH_ctrl_run.addWidget(self.lbl_N_points)
         layH_ctrl_run.addWidget(self.led_N_points)
+        layH_ctrl_run.addWidget(self.chk_blk)
+        layH_ctrl_run.addWidget(self.lbl_N_blk)
+        layH_ctrl_run.addWidget(self.led_N_blk)
         layH_ctrl_run.addStretch(2)
         layH_ctrl_run.addWidget(self.chk_fx_scale)
         layH_ctrl_run.addStretch(2)
@@ -334,7 +354,8 @@ class PlotImpz_UI(QWidget):
 
         self.chk_fx_limits = QCheckBox("Min/max.", self)
         self.chk_fx_limits.setObjectName("chk_fx_limits")
-        self.chk_fx_limits.setToolTip("<span>Display limits of fixpoint range.</span>")
+        self.chk_fx_limits.setToolTip("<span>Display limits of fixpoint range and "
+                                      "mark overflows of input quantization.</span>")
         self.chk_fx_limits.setChecked(False)
 
         layH_ctrl_time = QHBoxLayout()
@@ -770,6 +791,8 @@ class PlotImpz_UI(QWidget):
         # --- run control ---
         self.led_N_start.editingFinished.connect(self.update_N)
         self.led_N_points.editingFinished.connect(self.update_N)
+        self.chk_blk.clicked.connect(lambda: self.update_N()) # don't pass the state as `emit`
+        self.led_N_blk.editingFinished.connect(self.update_N)
 
         # --- frequency control ---
         # careful! currentIndexChanged passes the current index to _update_win_fft
@@ -1113,6 +1136,9 @@ class PlotImpz_UI(QWidget):
         """
         Update values for self.N and self.N_start from the QLineEditWidget,
         update the window and fire "ui_changed"
+
+        For block-by-block simulation, the FFT window has the block length
+        `self.N_blk` (at most `self.N`), otherwise the length `self.N`.
         """
         if not isinstance(emit, bool):
             logger.error("update N: emit={0}".format(emit))
@@ -1131,6 +1157,14 @@ class PlotImpz_UI(QWidget):
 
         self.N_end = self.N + self.N_start # total number of points to be calculated: N + N_start
 
+        self.blk = self.chk_blk.isChecked() and self.chk_blk.isEnabled()
+        self.N_blk = safe_eval(self.led_N_blk.text(), self.N_blk,
+                               return_type='int', sign='pos')
+        self.led_N_blk.setText(str(self.N_blk)) # update widget
+        self.lbl_N_blk.setVisible(self.blk)
+        self.led_N_blk.setVisible(self.blk)
+        self.N_win = min(self.N_blk, self.N) if self.blk else self.N
+
         # recalculate displayed freq. index values when freq. unit == 'k'
         if fb.fil[0]['freq_specs_unit'] == 'k':
             self.update_freqs()
@@ -1180,7 +1214,7 @@ class PlotImpz_UI(QWidget):
             logger.error("update win: emit={0}".format(emit))
         self.window_name = qget_cmb_box(self.cmb_win_fft, data=False)
         self.win = calc_window_function(self.win_dict, self.window_name,
-                                        N=self.N, sym=False)
+                                        N=self.N_win, sym=False)
 
         n_par = self.win_dict['n_par']
 
@@ -1200,9 +1234,9 @@ class PlotImpz_UI(QWidget):
             self.ledWinPar2.setToolTip(self.win_dict['par'][1]['tooltip'])
 
 
-        self.nenbw = self.N * np.sum(np.square(self.win)) / (np.square(np.sum(self.win)))
+        self.nenbw = self.N_win * np.sum(np.square(self.win)) / (np.square(np.sum(self.win)))
 
-        self.cgain = np.sum(self.win) / self.N # coherent gain
+        self.cgain = np.sum(self.win) / self.N_win # coherent gain
         self.win /= self.cgain # correct gain for periodic signals
 
         # only emit a signal for local triggers to prevent infinite loop:
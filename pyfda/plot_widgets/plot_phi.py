@@ -17,9 +17,9 @@ import numpy as np
 
 import pyfda.filterbroker as fb
 from pyfda.pyfda_rc import params
-from pyfda.plot_widgets.mpl_widget import MplWidget
+from pyfda.plot_widgets.mpl_widget import MplWidget, zoom_grid, zoom_splice
 from matplotlib.ticker import AutoMinorLocator
-from pyfda.libs.pyfda_lib import calc_Hcomplex, pprint_log
+from pyfda.libs.pyfda_lib import calc_Hcomplex, calc_Hcomplex_zoom, pprint_log
 from pyfda.libs.pyfda_qt_lib import qget_cmb_box
 
 classes = {'Plot_Phi':'\u03C6(f)'} #: Dict containing class name : display name
@@ -58,6 +58,8 @@ class Plot_Phi(QWidget):
             elif 'view_changed' in dict_sig or self.needs_draw:
                 self.update_view()
                 self.needs_draw = False
+            elif 'zoomed' in dict_sig:
+                self.draw_zoom()
             # elif ('ui_changed' in dict_sig and dict_sig['ui_changed'] == 'resized')\
             #     or self.needs_redraw:
             #     self.redraw()
@@ -115,6 +117,7 @@ class Plot_Phi(QWidget):
         self.mplwidget.layVMainMpl.setContentsMargins(*params['wdg_margins'])
         self.mplwidget.mplToolbar.a_he.setEnabled(True)
         self.mplwidget.mplToolbar.a_he.info = "manual/plot_phi.html"
+        self.mplwidget.mplToolbar.zoom_signal = True
         self.setLayout(self.mplwidget.layVMainMpl)
 
         self.init_axes()
@@ -211,14 +214,13 @@ class Plot_Phi(QWidget):
         fb.fil[0]['plt_phiLabel'] = y_str
         fb.fil[0]['plt_phiUnit'] = self.unitPhi
 
-        if self.chkWrap.isChecked():
-            phi_plt = np.angle(H) * scale
-        else:
-            phi_plt = np.unwrap(np.angle(H)) * scale
+        self.F = F
+        self.scale = scale
+        self.phi_plt = self.calc_phi_plt(H)
 
         #---------------------------------------------------------
         self.ax.clear() # need to clear, doesn't overwrite
-        line_phi, = self.ax.plot(F, phi_plt)
+        self.line_phi, = self.ax.plot(F, self.phi_plt)
         #---------------------------------------------------------
 
         self.ax.xaxis.set_minor_locator(AutoMinorLocator()) # enable minor ticks
@@ -229,6 +231,43 @@ class Plot_Phi(QWidget):
         self.ax.set_xlim(fb.fil[0]['freqSpecsRange'])
 
         self.redraw()
+        self.draw_zoom() # zoom range is restored when zoom is locked
+
+#------------------------------------------------------------------------------
+    def calc_phi_plt(self, H):
+        """
+        Return the wrapped or unwrapped phase of `H` in the selected unit
+        """
+        if self.chkWrap.isChecked():
+            return np.angle(H) * self.scale
+        else:
+            return np.unwrap(np.angle(H)) * self.scale
+
+#------------------------------------------------------------------------------
+    def draw_zoom(self):
+        """
+        When the global frequency grid is too coarse for the visible frequency
+        range (e.g. after zooming into the passband), evaluate H(f) in this
+        range at screen resolution with the chirp-z transform and splice its
+        phase into the phase curve.
+        """
+        if not hasattr(self, 'line_phi'):
+            return
+        zoom = zoom_grid(self.ax, self.F)
+        if zoom is None:
+            return
+        f_S = fb.fil[0]['f_max']
+        W, H = calc_Hcomplex_zoom(fb.fil[0], (2 * np.pi * zoom[0] / f_S,
+                                              2 * np.pi * zoom[1] / f_S), zoom[2])
+        F = W / (2 * np.pi) * f_S
+        phi = self.calc_phi_plt(np.nan_to_num(H))
+        if not self.chkWrap.isChecked():
+            # align the unwrapped phase with the phase on the global grid
+            two_pi = 2 * np.pi * self.scale
+            phi += np.round((np.interp(F[0], self.F, self.phi_plt) - phi[0]) / two_pi) * two_pi
+
+        self.line_phi.set_data(*zoom_splice(self.F, self.phi_plt, F, phi))
+        self.mplwidget.canvas.draw()
 
 #------------------------------------------------------------------------------
     def redraw(self):
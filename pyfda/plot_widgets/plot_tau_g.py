@@ -16,6 +16,7 @@ from pyfda.libs.compat import (Qt, QCheckBox, QWidget, QFrame, QComboBox,
                                QHBoxLayout, pyqtSignal, pyqtSlot)
 from pyfda.libs.pyfda_sig_lib import group_delay, group_delayz
 from pyfda.libs.pyfda_qt_lib import qset_cmb_box
+from pyfda.libs.pyfda_lib import resp_hash, resp_cache
 
 import numpy as np
 
@@ -61,7 +62,8 @@ class Plot_tau_g(QWidget):
  
         self.cmbAlgorithm = QComboBox(self)
         for t in [(self.tr("Auto"),"auto"),(self.tr("Scipy"),"scipy"), (self.tr("JOS"), "jos"),
-                  (self.tr("Diff"), "diff"), (self.tr("Shpak"), "shpak")]: # text, data
+                  (self.tr("Diff"), "diff"), (self.tr("Shpak"), "shpak"),
+                  (self.tr("ZPK"), "zpk")]: # text, data
             self.cmbAlgorithm.addItem(*t)
         qset_cmb_box(self.cmbAlgorithm, self.algorithm,data=True)
         self.cmbAlgorithm.setToolTip(self.tr("<span>Select algorithm for calculating "
@@ -73,7 +75,10 @@ class Plot_tau_g(QWidget):
         self.cmbAlgorithm.setItemData(3, self.tr("<span>Textbook-style, differentiate "
                                       "the phase.</span>"),Qt.ToolTipRole)
         self.cmbAlgorithm.setItemData(4, self.tr("<span>Shpak's algorithm for SOS and other "
-                                      "IIR filters.</span>"),Qt.ToolTipRole)        
+                                      "IIR filters.</span>"),Qt.ToolTipRole)
+        self.cmbAlgorithm.setItemData(5, self.tr("<span>Sum of the group delays of the "
+                                      "individual zeros and poles, auto-selected for "
+                                      "filters designed in zpk format.</span>"),Qt.ToolTipRole)
 
         #self.chkScipy = QCheckBox("Scipy", self)
         #self.chkScipy.setChecked(False)
@@ -148,14 +153,27 @@ class Plot_tau_g(QWidget):
         # calculate H_cmplx(W) (complex) for W = 0 ... 2 pi:
         # scipy: self.W, self.tau_g = group_delay((bb, aa), w=params['N_FFT'], whole = True)
 
+        alg = self.cmbAlgorithm.currentData()
         if fb.fil[0]['creator'][0] == 'sos': # one of 'sos', 'zpk', 'ba'
-            self.W, self.tau_g = group_delay(fb.fil[0]['sos'], nfft=params['N_FFT'], sos=True,
-                                         whole=True, verbose=self.chkWarnings.isChecked(),
-                                         alg=self.cmbAlgorithm.currentData())
+            sos = fb.fil[0]['sos']
+            self.W, self.tau_g = resp_cache.get(
+                resp_hash('tau_g', sos, params['N_FFT'], alg),
+                lambda: group_delay(sos, nfft=params['N_FFT'], sos=True,
+                                    whole=True, verbose=self.chkWarnings.isChecked(),
+                                    alg=alg))
+        elif fb.fil[0]['creator'][0] == 'zpk':
+            zpk = fb.fil[0]['zpk']
+            self.W, self.tau_g = resp_cache.get(
+                resp_hash('tau_g', zpk[0], zpk[1], zpk[2], params['N_FFT'], alg),
+                lambda: group_delay(zpk, nfft=params['N_FFT'], zpk=True,
+                                    whole=True, verbose=self.chkWarnings.isChecked(),
+                                    alg=alg))
         else:
-            self.W, self.tau_g = group_delay(bb, aa, nfft=params['N_FFT'], whole=True,
-                                         verbose=self.chkWarnings.isChecked(),
-                                         alg=self.cmbAlgorithm.currentData()) # self.chkWarnings.isChecked())
+            self.W, self.tau_g = resp_cache.get(
+                resp_hash('tau_g', bb, aa, params['N_FFT'], alg),
+                lambda: group_delay(bb, aa, nfft=params['N_FFT'], whole=True,
+                                    verbose=self.chkWarnings.isChecked(),
+                                    alg=alg))
 
         # Zero phase filters have no group delay (Causal+AntiCausal)
         if 'baA' in fb.fil[0]:
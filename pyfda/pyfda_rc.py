@@ -53,6 +53,8 @@ params = {'N_FFT':  2048,   # number of FFT points for plot commands (freqz etc.
                   }, 
           'FMT_ba': 4,      # number of digits for coefficient table
           'FMT_pz': 5,      # number of digits for Pole/Zero table
+          'fx_cache_disk': False, # cache Verilog code of fixpoint filters in <conf dir>/fx_cache/<version id>
+          'N_preview': 100000, # max. number of samples kept for plotting in block simulations
           'P_Marker': [mpl_ms, 'r'], # size and color for poles' marker
           'Z_Marker': [mpl_ms, 'b'], # size and color for zeros' marker
           'wdg_margins' : (2,1,2,0),  # R, T, L, B widget margins
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the pyFDA project hosted at https://github.com/chipmuenk/pyfda
+#
+# Copyright © pyFDA Project Contributors
+# Licensed under the terms of the MIT License
+# (see file LICENSE in root directory for details)
+
+"""
+Test suite for fir_csd and the CSD shift-and-add decomposition in pyfda_fix_lib
+"""
+
+import unittest
+import numpy as np
+from numpy.testing import assert_array_equal
+from migen import run_simulation
+import pyfda.filterbroker as fb
+from pyfda.libs.pyfda_fix_lib import csd_cse, csd_cse_adders
+from pyfda.fixpoint_widgets.fir_df import fir_np, fir_latency
+from pyfda.fixpoint_widgets.fir_csd import FIR_CSD
+
+
+class TestSequenceFunctions(unittest.TestCase):
+
+    def setUp(self):
+        self.fxqc = fb.fil[0]['fxqc']
+        fb.fil[0]['fxqc'] = {
+            'QI': {'WI':0, 'WF':7, 'W':8},
+            'QCB': {'WI':0, 'WF':9, 'W':10},
+            'QA': {'WI':2, 'WF':12, 'W':15, 'ovfl':'wrap', 'quant':'round'},
+            'QO': {'WI':0, 'WF':6, 'W':7, 'ovfl':'sat', 'quant':'floor'},
+            'b': [], 'pipe':0}
+        self.stim = np.random.RandomState(3).randint(-128, 128, 200)
+        b = list(np.random.RandomState(5).randint(-512, 512, 7))
+        self.coeffs = {'sym': b + [0, 256] + b[::-1],
+                       'asym': list(np.random.RandomState(6).randint(-512, 512, 15)),
+                       'shifted': [3, -6, 12, 0, -96, 5]}
+
+    def tearDown(self):
+        fb.fil[0]['fxqc'] = self.fxqc
+
+    def test_csd_cse(self):
+        """
+        Check that the shift-and-add networks calculate the fundamentals and
+        that sharing subexpressions reduces the number of adders
+        """
+        for seed in range(20):
+            b = np.random.RandomState(seed).randint(-5000, 5000, 30)
+            for cse in [True, False]:
+                subs, terms = csd_cse(b, cse=cse)
+                vals = [1]
+                for id_a, shift, sign, id_b in subs:
+                    vals.append(sign * (vals[id_a] << shift) + vals[id_b])
+                for f, t in terms.items():
+                    self.assertEqual(f % 2, 1)
+                    self.assertEqual(sum(s * (vals[i] << k) for s, k, i in t), f)
+            self.assertLess(csd_cse_adders(b), csd_cse_adders(b, cse=False))
+        # fundamentals are only calculated once, powers of two need no adder
+        self.assertEqual(csd_cse_adders([3, -6, 12, 0, -96, 64]), 1)
+        self.assertEqual(csd_cse([45, 75, 90]), ([(0, 4, -1, 0)],
+                         {45: [(-1, 2, 1), (1, 0, 1)], 75: [(-1, 2, 1), (-1, 0, 1)]}))
+
+    def test_fir_csd(self):
+        """
+        Compare the migen simulation of the multiplierless filter to the NumPy model
+        """
+        for name, b in self.coeffs.items():
+            fb.fil[0]['fxqc']['b'] = b
+            assert_array_equal(self.run_fir(), fir_np(fb.fil[0]['fxqc'],
+                               self.stim, latency=fir_latency(fb.fil[0]['fxqc'], 1)),
+                               err_msg=name)
+
+    def run_fir(self):
+        """
+        Simulate migen filter with settings from `fb.fil[0]['fxqc']` and return
+        the output response
+        """
+        dut = FIR_CSD()
+        response = []
+        def tb():
+            for x in self.stim:
+                yield dut.i.eq(int(x))
+                response.append((yield dut.o))
+                yield
+        run_simulation(dut, tb())
+        return response
+
+
+if __name__=='__main__':
+    unittest.main()
+
+# run tests with python -m pyfda.tests.test_fir_csd
@@ -12,8 +12,11 @@ Test suite for fir_df
 
 import unittest
 import numpy as np
+from numpy.testing import assert_array_equal
+from migen import run_simulation
+import pyfda.filterbroker as fb
 from pyfda.libs import pyfda_fix_lib as fx
-from pyfda.fixpoint_widgets.fir_df import FIR_DF_wdg
+from pyfda.fixpoint_widgets.fir_df import FIR_DF_wdg, FIR, fir_np, FIR_LATENCY, fir_latency
 
 
 class TestSequenceFunctions(unittest.TestCase):
@@ -135,6 +138,102 @@ class TestSequenceFunctions(unittest.TestCase):
         yq_list = list(self.myQ.fixp(y_string))
         self.assertEqual(yq_list, yq_list_goal)
 
+    def test_fir_np(self):
+        """
+        Compare the response of the NumPy model of the FIR filter to the migen
+        simulation, including overflows in the accumulator and the output.
+        """
+        fxqc = fb.fil[0]['fxqc']
+        try:
+            fb.fil[0]['fxqc'] = {
+                'QI': {'WI':0, 'WF':7, 'W':8},
+                'QCB': {'WI':0, 'WF':5, 'W':6},
+                'QA': {'WI':1, 'WF':9, 'W':11, 'ovfl':'wrap', 'quant':'round'},
+                'QO': {'WI':0, 'WF':6, 'W':7, 'ovfl':'sat', 'quant':'fix'},
+                'b': [-32, 31, 17, -5, 9]}
+            stim = np.random.RandomState(3).randint(-128, 128, 300)
+            assert_array_equal(fir_np(fb.fil[0]['fxqc'], stim), self.run_fir(stim)['QO'])
+
+            # compare all stages for a window of the stimulus, starting the
+            # migen simulation one settling time earlier
+            model = fir_np(fb.fil[0]['fxqc'], stim, stages=True)
+            N_settle = len(fb.fil[0]['fxqc']['b']) + FIR_LATENCY - 1
+            response = self.run_fir(stim[100 - N_settle:200])
+            for k in ['QP', 'QA', 'QO']:
+                assert_array_equal(model[k][100:200], response[k][N_settle:])
+        finally:
+            fb.fil[0]['fxqc'] = fxqc
+
+    def test_fir_pipe(self):
+        """
+        Pipeline registers in the adder tree only delay the response, the NumPy
+        model accounts for the additional latency.
+        """
+        fxqc = fb.fil[0]['fxqc']
+        try:
+            fb.fil[0]['fxqc'] = {
+                'QI': {'WI':0, 'WF':7, 'W':8},
+                'QCB': {'WI':0, 'WF':5, 'W':6},
+                'QA': {'WI':1, 'WF':9, 'W':11, 'ovfl':'wrap', 'quant':'round'},
+                'QO': {'WI':0, 'WF':6, 'W':7, 'ovfl':'sat', 'quant':'fix'},
+                'b': list(np.random.RandomState(4).randint(-32, 32, 13)), 'pipe':0}
+            stim = np.random.RandomState(3).randint(-128, 128, 100)
+            y_0 = self.run_fir(stim)['QO']
+            for pipe in [1, 2, 3, 8]:
+                fb.fil[0]['fxqc']['pipe'] = pipe
+                N_pipe = min(pipe, 3) # 13 taps -> 4 adder levels
+                self.assertEqual(fir_latency(fb.fil[0]['fxqc']), FIR_LATENCY + N_pipe)
+                y = self.run_fir(stim)['QO']
+                self.assertEqual(y[N_pipe:], y_0[:len(stim) - N_pipe])
+                assert_array_equal(fir_np(fb.fil[0]['fxqc'], stim), y)
+        finally:
+            fb.fil[0]['fxqc'] = fxqc
+
+    def test_run_sim_progress(self):
+        """
+        Check that the migen simulation reports its progress and can be
+        cancelled, returning the response calculated so far.
+        """
+        fxqc = fb.fil[0]['fxqc']
+        try:
+            fb.fil[0]['fxqc'] = {
+                'QI': {'WI':0, 'WF':7, 'W':8},
+                'QCB': {'WI':0, 'WF':5, 'W':6},
+                'QA': {'WI':1, 'WF':9, 'W':11, 'ovfl':'wrap', 'quant':'round'},
+                'QO': {'WI':0, 'WF':6, 'W':7, 'ovfl':'sat', 'quant':'fix'},
+                'b': [-32, 31, 17, -5, 9]}
+            stim = np.random.RandomState(5).randint(-128, 128, 100)
+            y_goal = self.run_fir(stim)['QO']
+
+            steps = []
+            def progress(n, response):
+                steps.append((n, len(response)))
+                return n < 40
+            # use the testbench of the widget without instantiating the widget
+            wdg = type('wdg', (), {'fixp_filter':FIR()})()
+            y = []
+            run_simulation(wdg.fixp_filter,
+                           self.dut.tb_wdg_stim(wdg, stim, y, progress=progress))
+            self.assertEqual(steps, [(n, n) for n in range(41)])
+            self.assertEqual(y, y_goal[:40])
+        finally:
+            fb.fil[0]['fxqc'] = fxqc
+
+    def run_fir(self, stim):
+        """
+        Simulate migen FIR filter with settings from `fb.fil[0]['fxqc']` and
+        return the responses of all stages
+        """
+        dut = FIR()
+        response = {k:[] for k in dut.stages}
+        def tb():
+            for x in stim:
+                yield dut.i.eq(int(x))
+                for k in response:
+                    response[k].append((yield dut.stages[k]))
+                yield
+        run_simulation(dut, tb())
+        return response
 
 
 if __name__=='__main__':
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the pyFDA project hosted at https://github.com/chipmuenk/pyfda
+#
+# Copyright © pyFDA Project Contributors
+# Licensed under the terms of the MIT License
+# (see file LICENSE in root directory for details)
+
+"""
+Test suite for fir_poly
+"""
+
+import unittest
+import numpy as np
+from numpy.testing import assert_array_equal
+from migen import run_simulation
+import pyfda.filterbroker as fb
+from pyfda.fixpoint_widgets.fir_df import fir_np
+from pyfda.fixpoint_widgets.fir_poly import (FIR_Decim, FIR_Interp, decim_np,
+                                             interp_np, poly_mults)
+
+
+class TestSequenceFunctions(unittest.TestCase):
+
+    def setUp(self):
+        self.fxqc = fb.fil[0]['fxqc']
+        fb.fil[0]['fxqc'] = {
+            'QI': {'WI':0, 'WF':7, 'W':8},
+            'QCB': {'WI':0, 'WF':5, 'W':6},
+            'QA': {'WI':2, 'WF':8, 'W':11, 'ovfl':'wrap', 'quant':'round'},
+            'QO': {'WI':0, 'WF':6, 'W':7, 'ovfl':'sat', 'quant':'floor'},
+            'b': list(np.random.RandomState(5).randint(-32, 32, 11)),
+            'M':1, 'L':1}
+        self.stim = np.random.RandomState(3).randint(-128, 128, 100)
+
+    def tearDown(self):
+        fb.fil[0]['fxqc'] = self.fxqc
+
+    def test_poly_mults(self):
+        """
+        Check the number of multipliers
+        """
+        self.assertEqual(poly_mults(range(11), 1), 11)
+        self.assertEqual(poly_mults(range(11), 4), 3)
+        self.assertEqual(poly_mults(range(12), 4), 3)
+        self.assertEqual(poly_mults(range(3), 5), 1)
+
+    def test_fir_decim(self):
+        """
+        Compare the migen simulation of the decimator to the NumPy model and
+        to the decimated response of the direct form model
+        """
+        p = fb.fil[0]['fxqc']
+        y_df = fir_np(p, self.stim, latency=0)
+        for M in [1, 2, 3, 4, 5, 12]:
+            p['M'] = M
+            y = self.run_fir(FIR_Decim)[3 % M::M]
+            assert_array_equal(y, decim_np(p, self.stim), err_msg=str(M))
+            assert_array_equal(y[3 // M:], y_df[::M][:len(y) - 3 // M], err_msg=str(M))
+
+    def test_fir_interp(self):
+        """
+        Compare the migen simulation of the interpolator to the NumPy model and
+        to the response of the direct form model for the upsampled stimulus
+        """
+        p = fb.fil[0]['fxqc']
+        for L in [1, 2, 3, 4, 12]:
+            p['L'] = L
+            y = self.run_fir(FIR_Interp, np.repeat(self.stim, L))
+            assert_array_equal(y, interp_np(p, self.stim), err_msg=str(L))
+            x_up = np.zeros(len(self.stim) * L, dtype=int)
+            x_up[::L] = self.stim
+            assert_array_equal(y, fir_np(p, x_up), err_msg=str(L))
+
+    def run_fir(self, fir_class, stim=None):
+        """
+        Simulate migen filter `fir_class` with settings from `fb.fil[0]['fxqc']`
+        and return the output for every clock cycle
+        """
+        if stim is None:
+            stim = self.stim
+        dut = fir_class()
+        response = []
+        def tb():
+            for x in stim:
+                yield dut.i.eq(int(x))
+                response.append((yield dut.o))
+                yield
+        run_simulation(dut, tb())
+        return response
+
+
+if __name__=='__main__':
+    unittest.main()
+
+# run tests with python -m pyfda.tests.test_fir_poly
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the pyFDA project hosted at https://github.com/chipmuenk/pyfda
+#
+# Copyright © pyFDA Project Contributors
+# Licensed under the terms of the MIT License
+# (see file LICENSE in root directory for details)
+
+"""
+Test suite for fir_sym
+"""
+
+import unittest
+import numpy as np
+from numpy.testing import assert_array_equal
+from migen import run_simulation
+import pyfda.filterbroker as fb
+from pyfda.fixpoint_widgets.fir_df import fir_np, fir_latency
+from pyfda.fixpoint_widgets.fir_sym import (FIR_Sym, FIR_TF, fir_symmetry,
+                                            fir_sym_mults, fir_tf_mults)
+
+
+class TestSequenceFunctions(unittest.TestCase):
+
+    def setUp(self):
+        self.fxqc = fb.fil[0]['fxqc']
+        fb.fil[0]['fxqc'] = {
+            'QI': {'WI':0, 'WF':7, 'W':8},
+            'QCB': {'WI':0, 'WF':5, 'W':6},
+            'QA': {'WI':2, 'WF':8, 'W':11, 'ovfl':'wrap', 'quant':'round'},
+            'QO': {'WI':0, 'WF':6, 'W':7, 'ovfl':'sat', 'quant':'floor'},
+            'b': [], 'pipe':0}
+        self.stim = np.random.RandomState(3).randint(-128, 128, 200)
+        rs = np.random.RandomState(5)
+        b = list(rs.randint(-32, 32, 6))
+        self.coeffs = {'sym_even': b + b[::-1],
+                       'sym_odd': b + [17] + b[::-1],
+                       'antisym_even': b + [-c for c in b[::-1]],
+                       'antisym_odd': b + [0] + [-c for c in b[::-1]],
+                       'asym': list(rs.randint(-32, 32, 9))}
+
+    def tearDown(self):
+        fb.fil[0]['fxqc'] = self.fxqc
+
+    def test_symmetry(self):
+        """
+        Check detection of symmetry and number of multipliers
+        """
+        for name, sym, mults in [('sym_even', 1, 6), ('sym_odd', 1, 7),
+                                 ('antisym_even', -1, 6), ('antisym_odd', -1, 6),
+                                 ('asym', 0, 9)]:
+            self.assertEqual(fir_symmetry(self.coeffs[name]), sym)
+            self.assertEqual(fir_sym_mults(self.coeffs[name]), mults)
+        self.assertEqual(fir_tf_mults([3, -5, 0, 5, 3]), 2)
+
+    def test_fir_sym(self):
+        """
+        Compare the migen simulation of the folded structure to the NumPy model
+        """
+        for name, b in self.coeffs.items():
+            for pipe in [0, 1, 2]:
+                fb.fil[0]['fxqc'].update({'b':b, 'pipe':pipe})
+                latency = fir_latency(fb.fil[0]['fxqc'], fir_sym_mults(b))
+                assert_array_equal(self.run_fir(FIR_Sym), fir_np(fb.fil[0]['fxqc'],
+                                   self.stim, latency=latency), err_msg=name)
+
+    def test_fir_tf(self):
+        """
+        Compare the migen simulation of the transposed structure to the NumPy model
+        """
+        for name, b in self.coeffs.items():
+            fb.fil[0]['fxqc'].update({'b':b, 'pipe':2}) # pipe is ignored
+            assert_array_equal(self.run_fir(FIR_TF), fir_np(fb.fil[0]['fxqc'],
+                               self.stim, latency=fir_latency(fb.fil[0]['fxqc'], 1)),
+                               err_msg=name)
+
+    def run_fir(self, fir_class):
+        """
+        Simulate migen filter `fir_class` with settings from `fb.fil[0]['fxqc']`
+        and return the output response
+        """
+        dut = fir_class()
+        response = []
+        def tb():
+            for x in self.stim:
+                yield dut.i.eq(int(x))
+                response.append((yield dut.o))
+                yield
+        run_simulation(dut, tb())
+        return response
+
+
+if __name__=='__main__':
+    unittest.main()
+
+# run tests with python -m pyfda.tests.test_fir_sym
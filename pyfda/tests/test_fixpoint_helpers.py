@@ -11,12 +11,15 @@ Test suite for fixpoint_helpers.py
 """
 
 import unittest
+import tempfile
 import numpy as np
 from numpy.testing import assert_array_equal
 from pyfda.libs import pyfda_fix_lib as fx
 try:
     from migen import Cat, If, Replicate, Signal, Module, run_simulation
-    from pyfda.fixpoint_widgets.fixpoint_helpers import requant
+    from migen.fhdl import verilog
+    from pyfda.fixpoint_widgets.fixpoint_helpers import requant, requant_np, fx_hash, FX_Cache,\
+        fx_generator_id
     HAS_MIGEN = True
 except ImportError:
     HAS_MIGEN = False
@@ -156,7 +159,61 @@ class TestSequenceFunctions(unittest.TestCase):
         assert_array_equal(self.myQ.fixp(self.stim/8)[:-1],response[1:])
         # compare target list to migen fixpoint quantization:
         assert_array_equal(targ_out[:-1], response[1:])
-        
+
+    def test_requant_np(self):
+        """
+        Compare NumPy model of requant routine to migen fixpoint quantization
+        """
+        stim = np.arange(-512, 512)
+        q_in =  {'WI':4, 'WF':5, 'W':10}
+        for WI, WF in [(1, 3), (4, 2), (6, 7), (2, 9)]:
+            for quant in ['round', 'floor', 'fix']:
+                for ovfl in ['wrap', 'sat']:
+                    q_out = {'WI':WI, 'WF':WF, 'W':WI + WF + 1,
+                             'ovfl':ovfl, 'quant':quant}
+                    self.dut = DUT(q_in, q_out)
+                    response = self.run_sim(stim)
+                    assert_array_equal(requant_np(stim, q_in, q_out)[:-1], response[1:])
+
+    def test_fx_cache(self):
+        """
+        Test hashing of fixpoint settings and caching of modules and Verilog code
+        """
+        q_out = {'WI':2, 'WF':3, 'W':6, 'ovfl':'sat', 'quant':'fix'}
+        key = fx_hash('DUT', {'QI':self.q_in, 'QO':q_out, 'b':[np.int64(3), 5]})
+        self.assertEqual(key, fx_hash('DUT', {'b':[3, 5], 'QO':dict(q_out), 'QI':self.q_in}))
+        self.assertNotEqual(key, fx_hash('DUT', {'QI':self.q_in, 'QO':q_out, 'b':[3, 6]}))
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = FX_Cache(cache_dir)
+            mods = []
+            def construct():
+                mods.append(DUT(self.q_in, q_out))
+                return mods[-1]
+            def convert():
+                dut = cache.get_module(key, construct)
+                return verilog.convert(dut, ios={dut.i, dut.o})
+            # module is reused until it has been converted or simulated
+            self.assertIs(cache.get_module(key, construct), cache.get_module(key, construct))
+            code = cache.get_verilog(key, convert)
+            self.assertEqual(len(mods), 1)
+            self.assertEqual(cache.get_verilog(key, convert), code)
+            self.assertEqual(len(mods), 1)
+            self.assertIsNot(cache.get_module(key, construct), mods[0])
+            self.assertEqual(len(mods), 2)
+            # read code from disk without conversion
+            cache.clear()
+            self.assertEqual(cache.get_verilog(key, None), code)
+            self.assertIn("module top", code)
+            # code generated by other versions of the generators is not used
+            self.assertNotEqual(fx_generator_id(), '')
+            cache_v = FX_Cache(cache_dir, version=fx_generator_id())
+            self.assertEqual(cache_v.get_verilog(key, lambda: "module v"), "module v")
+            self.assertEqual(FX_Cache(cache_dir, version='other').get_verilog(
+                key, lambda: "module other"), "module other")
+            self.assertEqual(FX_Cache(cache_dir, version=fx_generator_id()).get_verilog(
+                key, None), "module v")
+
 
 ###############################################################################
 # migen class for testing requant operation
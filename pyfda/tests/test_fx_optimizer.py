@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the pyFDA project hosted at https://github.com/chipmuenk/pyfda
+#
+# Copyright © pyFDA Project Contributors
+# Licensed under the terms of the MIT License
+# (see file LICENSE in root directory for details)
+
+"""
+Test suite for the word length optimization in fx_optimizer
+"""
+
+import unittest
+import numpy as np
+import scipy.signal as sig
+from pyfda.fixpoint_widgets.fx_optimizer import (optimize_fxqc, ovfl_free_WI, output_snr,
+                                                 quant_coeffs, stop_bands, stopband_excess)
+
+
+class TestSequenceFunctions(unittest.TestCase):
+
+    def setUp(self):
+        self.p = {
+            'QI': {'WI':0, 'WF':11, 'W':12},
+            'QCB': {'WI':0, 'WF':15, 'W':16, 'ovfl':'sat', 'quant':'round'},
+            'QA': {'WI':2, 'WF':26, 'W':29, 'ovfl':'wrap', 'quant':'floor'},
+            'QO': {'WI':0, 'WF':11, 'W':12, 'ovfl':'sat', 'quant':'round'},
+            'b': [], 'pipe':0}
+        self.coeffs = sig.remez(41, [0, .1, .2, .5], [1, 0])
+        self.fil_dict = {'rt':'LP', 'F_SB':0.2, 'A_SB':1e-3} # 60 dB attenuation
+
+    def test_ovfl_free_WI(self):
+        """
+        Check that the integer bits are sufficient for worst-case input signals
+        and that one bit less overflows
+        """
+        p = self.p
+        p.update({'b':[10000, -7000, 15000, 15000, -7000, 10000]})
+        p['QO'].update({'WF':26, 'W':27}) # full precision
+        WI_A, WI_O = ovfl_free_WI(p)
+        self.assertEqual((WI_A, WI_O), (1, 1)) # sum of |b| = 1.95
+        x_max = (1 << 11) - 1
+        x = np.array([x_max if c > 0 else -x_max - 1 for c in p['b'][::-1]] * 2
+                     + [-x_max - 1 if c > 0 else x_max for c in p['b'][::-1]] * 2)
+        p['QA'].update({'WI':WI_A, 'W':WI_A + p['QA']['WF'] + 1})
+        p['QO'].update({'WI':WI_O, 'W':WI_O + p['QO']['WF'] + 1, 'ovfl':'wrap'})
+        self.assertEqual(output_snr(p, x), np.inf) # no overflow, no quantization
+        p['QA'].update({'WI':WI_A - 1, 'W':WI_A + p['QA']['WF']})
+        self.assertLess(output_snr(p, x), 20)
+
+    def test_optimize(self):
+        """
+        Check that the optimized formats meet the targets and that they are
+        minimal
+        """
+        r = optimize_fxqc(self.p, self.coeffs, self.fil_dict, SNR=60, n_jobs=1)
+        bands = stop_bands(self.fil_dict)
+        limit = max(stopband_excess(self.coeffs, bands), 0) + 1
+        self.assertLessEqual(stopband_excess(np.array(r['b']) * 2.**-r['QCB']['WF'],
+                                             bands), limit)
+        x = np.random.RandomState(0).randint(-2048, 2048, 4096)
+        self.assertGreaterEqual(output_snr(r, x), 60)
+        self.assertEqual(ovfl_free_WI(r), (r['QA']['WI'], r['QO']['WI']))
+        self.assertLess(r['QCB']['W'], self.p['QCB']['W'])
+
+        # one fractional bit less fails the targets
+        r1 = optimize_fxqc(self.p, self.coeffs, self.fil_dict, SNR=None, n_jobs=1)
+        r1['QCB']['WF'] -= 1
+        b = np.array(quant_coeffs(r1['QCB'], self.coeffs)) * 2.**-r1['QCB']['WF']
+        self.assertGreater(stopband_excess(b, bands), limit)
+        r['QO']['WF'] -= 1
+        self.assertLess(output_snr(r, x), 60)
+
+        # same results with a process pool
+        r_pool = optimize_fxqc(self.p, self.coeffs, self.fil_dict, SNR=60, n_jobs=2)
+        r['QO']['WF'] += 1
+        for k in ('QCB', 'QA', 'QO'):
+            self.assertEqual(r_pool[k], r[k])
+        self.assertEqual(r_pool['b'], r['b'])
+        self.assertEqual(self.p['QCB']['WF'], 15) # input dict is not modified
+
+
+if __name__=='__main__':
+    unittest.main()
+
+# run tests with python -m pyfda.tests.test_fx_optimizer
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the pyFDA project hosted at https://github.com/chipmuenk/pyfda
+#
+# Copyright © pyFDA Project Contributors
+# Licensed under the terms of the MIT License
+# (see file LICENSE in root directory for details)
+
+"""
+Test suite for iir_sos
+"""
+
+import unittest
+import numpy as np
+from numpy.testing import assert_array_equal
+import scipy.signal as sig
+from migen import run_simulation
+import pyfda.filterbroker as fb
+from pyfda.libs.pyfda_fix_iir_lib import sos_scale
+from pyfda.fixpoint_widgets.iir_sos import (IIR_SOS, sos_np, sos_quant_coeffs, sos_latency,
+                                            sos_settling_time)
+
+
+class TestSequenceFunctions(unittest.TestCase):
+
+    def setUp(self):
+        self.fxqc = fb.fil[0]['fxqc']
+        fb.fil[0]['fxqc'] = {
+            'QI': {'WI':0, 'WF':9, 'W':10},
+            'QCB': {'WI':1, 'WF':10, 'W':12, 'ovfl':'sat', 'quant':'round'},
+            'QCA': {'WI':1, 'WF':10, 'W':12, 'ovfl':'sat', 'quant':'round'},
+            'QS': {'WI':1, 'WF':9, 'W':11, 'ovfl':'sat', 'quant':'round'},
+            'QA': {'WI':3, 'WF':14, 'W':18, 'ovfl':'sat', 'quant':'floor'},
+            'QO': {'WI':0, 'WF':9, 'W':10, 'ovfl':'sat', 'quant':'fix'},
+            'sos': []}
+        self.stim = np.random.RandomState(3).randint(-512, 512, 300)
+        self.stim[100:150] = 511 # drive sections into saturation
+        sos = sos_scale(sig.ellip(6, 1, 50, 0.3, output='sos'), 'linf')
+        p = fb.fil[0]['fxqc']
+        p['sos'] = sos_quant_coeffs(sos, p['QCB'], p['QCA'])
+
+    def tearDown(self):
+        fb.fil[0]['fxqc'] = self.fxqc
+
+    def test_sos_quant_coeffs(self):
+        """
+        Test quantization and saturation of the section coefficients
+        """
+        Q = {'WI':1, 'WF':3, 'ovfl':'sat', 'quant':'round'}
+        self.assertEqual(sos_quant_coeffs([[0.3, -2.5, 1, 1, -1.26, 0.5]], Q, Q),
+                         [[2, -16, 8, 8, -10, 4]])
+
+    def test_iir_sos(self):
+        """
+        Compare the migen simulation of the cascade to the NumPy model for all
+        sections and for wrap-around / saturation of the accumulator
+        """
+        for ovfl in ['sat', 'wrap']:
+            fb.fil[0]['fxqc']['QA']['ovfl'] = ovfl
+            stages = self.run_sos()
+            stages_np = sos_np(fb.fil[0]['fxqc'], self.stim, stages=True)
+            self.assertEqual(list(stages), list(stages_np))
+            for k in stages:
+                assert_array_equal(stages[k], stages_np[k], err_msg=ovfl + ':' + k)
+        L = sos_latency(fb.fil[0]['fxqc'])
+        self.assertTrue(np.any(stages_np['QO'][L:]))
+
+    def test_sos_settling_time(self):
+        """
+        The response of the model starting one settling time before a window of
+        the stimulus matches the response for the complete stimulus. The
+        estimate is capped at `N_max`.
+        """
+        p = fb.fil[0]['fxqc']
+        N = sos_settling_time(p)
+        self.assertEqual(sos_settling_time(p, N_max=100), 100)
+        stim = np.random.RandomState(4).randint(-512, 512, N + 500)
+        y = sos_np(p, stim)
+        s = N + 200
+        assert_array_equal(sos_np(p, stim[s - N:s + 300])[N:], y[s:s + 300])
+
+    def run_sos(self):
+        """
+        Simulate migen filter with settings from `fb.fil[0]['fxqc']` and return
+        the outputs of all sections
+        """
+        dut = IIR_SOS()
+        stages = {k:[] for k in dut.stages}
+        def tb():
+            for x in self.stim:
+                yield dut.i.eq(int(x))
+                for k in stages:
+                    stages[k].append((yield dut.stages[k]))
+                yield
+        run_simulation(dut, tb())
+        return stages
+
+
+if __name__=='__main__':
+    unittest.main()
+
+# run tests with python -m pyfda.tests.test_iir_sos
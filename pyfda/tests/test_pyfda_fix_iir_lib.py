@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the pyFDA project hosted at https://github.com/chipmuenk/pyfda
+#
+# Copyright © pyFDA Project Contributors
+# Licensed under the terms of the MIT License
+# (see file LICENSE in root directory for details)
+
+"""
+Test suite for the bit-exact fixpoint IIR filter simulation in pyfda_fix_iir_lib
+"""
+
+import unittest
+import numpy as np
+from numpy.testing import assert_array_equal
+import scipy.signal as sig
+from pyfda.libs.pyfda_fix_iir_lib import (iir_fx, requant_int, requant_par, sos_fx,
+                                          sos_scale, sos_order, sos_noise_gain)
+
+
+class TestSequenceFunctions(unittest.TestCase):
+
+    def setUp(self):
+        # 2nd order lowpass with poles at 0.9 * exp(+/- j pi/8) and DC gain ~ 2.9
+        self.p = {'QI':{'WI':0, 'WF':11}, 'QCB':{'WI':0, 'WF':11}, 'QCA':{'WI':1, 'WF':10},
+                  'QA':{'WI':6, 'WF':18, 'ovfl':'wrap', 'quant':'round'},
+                  'QO':{'WI':0, 'WF':11, 'ovfl':'sat', 'quant':'floor'},
+                  'b':[212, 424, 212], 'a':[1024, -1703, 829]}
+        self.x = np.random.RandomState(7).randint(-2048, 2048, 500)
+        self.x[200:300] = 2047 # drive the output into saturation
+
+    def test_requant_int(self):
+        """
+        Test requantization rules for scalar integers
+        """
+        QI = {'WI':2, 'WF':4}
+        for quant, goal in [('round', [-2, -3, -2, 0, 1, 2, 3]),
+                            ('floor', [-3, -4, -3, -1, 0, 1, 2]),
+                            ('fix', [-2, -3, -2, 0, 0, 1, 2])]:
+            QO = {'WI':2, 'WF':2, 'ovfl':'wrap', 'quant':quant}
+            rq = requant_par(QI, QO)
+            self.assertEqual([requant_int(x, rq) for x in [-9, -13, -10, -1, 2, 6, 11]],
+                             goal)
+        # saturation and wrap-around when integer bits are removed
+        QO = {'WI':0, 'WF':4, 'ovfl':'sat', 'quant':'floor'}
+        self.assertEqual([requant_int(x, requant_par(QI, QO)) for x in [-40, 20, 7]],
+                         [-16, 15, 7])
+        QO['ovfl'] = 'wrap'
+        self.assertEqual([requant_int(x, requant_par(QI, QO)) for x in [-40, 20, 7]],
+                         [-8, -12, 7])
+
+    def test_iir_first_order(self):
+        """
+        Test a first order recursive filter y[n] = x[n]/2 + y[n-1]/2
+        """
+        p = {'QI':{'WI':0, 'WF':7}, 'QCB':{'WI':0, 'WF':7}, 'QCA':{'WI':1, 'WF':6},
+             'QA':{'WI':1, 'WF':14, 'ovfl':'wrap', 'quant':'floor'},
+             'QO':{'WI':0, 'WF':7, 'ovfl':'sat', 'quant':'round'},
+             'b':[64], 'a':[64, -32]}
+        for structure in ['DF1', 'DF2T']:
+            assert_array_equal(iir_fx(p, [100, 0, 0, 0, 127, 127, 127], structure),
+                               [50, 25, 13, 7, 67, 97, 112])
+
+    def test_df1_df2t(self):
+        """
+        Both structures yield the same results as long as the accumulator
+        doesn't overflow, also with quantized products and output saturation
+        """
+        y_df1 = iir_fx(self.p, self.x, 'DF1')
+        y_df2t = iir_fx(self.p, self.x, 'DF2T')
+        assert_array_equal(y_df1, y_df2t)
+        self.assertTrue(np.any(y_df1 == (1 << 11) - 1)) # saturation has occurred
+
+        self.p['QA']['WF'] = 6
+        assert_array_equal(iir_fx(self.p, self.x, 'DF1'), iir_fx(self.p, self.x, 'DF2T'))
+
+    def test_zi(self):
+        """
+        Test that processing the stimulus block by block with carried over
+        states yields the same result as processing it in one go
+        """
+        for structure, N_z in [('DF1', 4), ('DF2T', 2)]:
+            y_goal = iir_fx(self.p, self.x, structure)
+            zi = np.zeros(N_z, dtype=int)
+            y = []
+            for i in range(0, len(self.x), 64):
+                y_i, zi = iir_fx(self.p, self.x[i:i + 64], structure, zi=zi)
+                y.append(y_i)
+            assert_array_equal(np.concatenate(y), y_goal)
+
+    def test_long_words(self):
+        """
+        Accumulators wider than 64 bits use python integers; additional
+        fractional bits of the accumulator don't change the result when the
+        products are not quantized.
+        """
+        self.p['QA']['WF'] = 22
+        y_goal = iir_fx(self.p, self.x[:100])
+        self.p['QA']['WF'] = 80
+        y = iir_fx(self.p, self.x[:100])
+        self.assertEqual(y.dtype, object)
+        assert_array_equal(y, y_goal)
+
+    def test_sos_fx(self):
+        """
+        A cascade of sections yields the same result as chaining the sections
+        with :func:`iir_fx`, also when processed block by block
+        """
+        p = self.p
+        p['QS'] = {'WI':2, 'WF':12, 'ovfl':'sat', 'quant':'round'}
+        p['sos'] = [[212, 424, 212, 1024, -1703, 829], [512, 0, -512, 1024, -1200, 700]]
+        y = self.x
+        for k, s in enumerate(p['sos']):
+            p_k = dict(p, QI=p['QI'] if k == 0 else p['QS'],
+                       QO=p['QO'] if k == 1 else p['QS'], b=s[:3], a=s[3:])
+            y = iir_fx(p_k, y)
+        assert_array_equal(sos_fx(p, self.x), y)
+        assert_array_equal(sos_fx(p, self.x, stages=True)[-1], y)
+
+        zi = np.zeros((2, 4), dtype=int)
+        y_blocks = []
+        for i in range(0, len(self.x), 100):
+            y_i, zi = sos_fx(p, self.x[i:i + 100], zi=zi)
+            y_blocks.append(y_i)
+        assert_array_equal(np.concatenate(y_blocks), y)
+
+    def test_sos_scale_order(self):
+        """
+        Scaling and reordering the sections doesn't change the overall transfer
+        function, scaled sections have a norm of 1 at their outputs
+        """
+        sos = sig.ellip(8, 0.5, 60, 0.2, output='sos')
+        w, H = sig.sosfreqz(sos, 512)
+        for norm in ['l2', 'linf']:
+            sos_s = sos_scale(sos, norm)
+            _, H_s = sig.sosfreqz(sos_s, 512)
+            np.testing.assert_allclose(H_s, H, atol=1e-9)
+            _, H_0 = sig.sosfreqz(sos_s[:1], 4096, whole=True)
+            n = np.sqrt(np.mean(np.abs(H_0)**2)) if norm == 'l2' else np.max(np.abs(H_0))
+            self.assertAlmostEqual(n, 1.)
+
+        perm = sos_order(sos, 'l2', n_jobs=1)
+        self.assertEqual(sorted(perm), list(range(len(sos))))
+        self.assertEqual(perm, sos_order(sos, 'l2', n_jobs=2))
+        self.assertLessEqual(sos_noise_gain(sos_scale(sos[list(perm)], 'l2')),
+                             sos_noise_gain(sos_scale(sos, 'l2')))
+
+if __name__=='__main__':
+    unittest.main()
+
+# run tests with python -m pyfda.tests.test_pyfda_fix_iir_lib
@@ -13,9 +13,9 @@ Test suite for the pyfda_fix_lib classes and methods
 import unittest
 import numpy as np
 from pyfda.libs import pyfda_fix_lib as fix_lib
-from pyfda.libs.pyfda_fix_lib import bin2hex, dec2csd, csd2dec
+from pyfda.libs.pyfda_fix_lib import (bin2hex, dec2csd, csd2dec, dec2csd_mat,
+                                      dec2csd_vec, csd2dec_vec)
 # TODO: Add test case for complex numbers
-# TODO: test csd2dec, csd2dec_vec
 
 class TestSequenceFunctions(unittest.TestCase):
 
@@ -216,6 +216,178 @@ class TestSequenceFunctions(unittest.TestCase):
         self.assertEqual(yq_list, yq_list_goal)
 
 
+    def test_fix_int(self):
+        """
+        Test integer-domain quantization with fixp_int()
+        """
+        # no quantization, saturation
+        q_obj = {'WI':3, 'WF':0, 'ovfl':'sat', 'quant':'round', 'frmt': 'dec', 'scale': 1}
+        self.myQ.setQobj(q_obj)
+        yq_list = self.myQ.fixp_int([-26, -9, -8, -1, 0, 7, 8, 26])
+        np.testing.assert_array_equal(yq_list, [-8, -8, -8, -1, 0, 7, 7, 7])
+        self.assertEqual(yq_list.dtype, np.int64)
+        # same with wrap-around
+        self.myQ.setQobj({'ovfl':'wrap'})
+        yq_list = self.myQ.fixp_int([-26, -9, -8, -1, 0, 7, 8, 26])
+        np.testing.assert_array_equal(yq_list, [6, 7, -8, -1, 0, 7, -8, -6])
+
+        # remove two fractional bits with different quantization methods
+        y_list = [-7, -6, -5, -2, -1, 1, 2, 3, 5, 6, 7]
+        q_obj = {'WI':3, 'WF':0, 'ovfl':'none'}
+        for quant in ['floor', 'round', 'fix', 'ceil', 'rint']:
+            q_obj.update({'quant': quant})
+            self.myQ.setQobj(q_obj)
+            yq_list = self.myQ.fixp_int(y_list, WF_in=2)
+            yq_list_goal = self.myQ.fixp(np.asarray(y_list) / 4, scaling='none')
+            np.testing.assert_array_equal(yq_list, yq_list_goal)
+
+        # wide accumulator format exceeding the float mantissa
+        q_obj = {'WI':1, 'WF':60, 'ovfl':'wrap', 'quant':'floor'}
+        self.myQ.setQobj(q_obj)
+        self.myQ.resetN()
+        y = np.array([(1 << 61) + 3, -(1 << 61) - 5, (1 << 60) + 1], dtype=np.int64)
+        yq_list = self.myQ.fixp_int(y)
+        np.testing.assert_array_equal(yq_list,
+                            [-(1 << 61) + 3, (1 << 61) - 5, (1 << 60) + 1])
+        self.assertEqual(self.myQ.N_over, 2)
+
+        # adding fractional bits would overflow int64 with left shifts
+        q_obj = {'WI':3, 'WF':0, 'ovfl':'sat', 'quant':'floor'}
+        self.myQ.setQobj(q_obj)
+        self.myQ.resetN()
+        y = [0, 1 << 40, -(1 << 50)]
+        np.testing.assert_array_equal(self.myQ.fixp_int(y, WF_in=-40), [0, 7, -8])
+        self.assertEqual(self.myQ.N_over, 2)
+        self.myQ.setQobj({'ovfl':'wrap'})
+        yq_list = self.myQ.fixp_int(y + [(1 << 50) + 1], WF_in=-40)
+        np.testing.assert_array_equal(yq_list, [0, 0, 0, 0])
+        self.assertEqual(yq_list.dtype, np.int64)
+
+    def test_fix_wrap_64(self):
+        """
+        Test wrap around of floats for W >= 64
+        """
+        q_obj = {'WI':63, 'WF':0, 'ovfl':'wrap', 'quant':'floor', 'frmt': 'dec', 'scale': 1}
+        self.myQ.setQobj(q_obj)
+        yq_list = self.myQ.fixp([2.**64 + 2.**12, -2.**63 - 2.**12, 5.], scaling='none')
+        np.testing.assert_array_equal(yq_list, [2.**12, 2.**63 - 2.**12, 5.])
+
+    def test_ovr_log(self):
+        """
+        Test sparse overflow log over several calls of fixp() and fixp_int()
+        """
+        q_obj = {'WI':0, 'WF':3, 'ovfl':'sat', 'quant':'round', 'frmt': 'dec', 'scale': 1}
+        self.myQ.setQobj(q_obj)
+        self.myQ.enable_ovr_log()
+        self.myQ.fixp([0.5, 1.5, -2, 0])
+        self.assertEqual(self.myQ.ovr_flag, 0) # no dense flag array
+        self.assertEqual(self.myQ.fixp(3.0), 0.875)
+        self.assertEqual(self.myQ.ovr_flag, 1)
+        self.myQ.fixp_int(np.array([[100, 1], [-100, 2]]), WF_in=5)
+        idx, sign = self.myQ.get_ovr_log()
+        self.assertEqual(list(idx), [1, 2, 4, 5, 7])
+        self.assertEqual(list(sign), [1, -1, 1, 1, -1])
+        self.assertEqual(self.myQ.N_over, len(idx))
+        self.assertEqual(self.myQ.N_over_neg, 2)
+        # log is cleared by resetN()
+        self.myQ.resetN()
+        self.assertEqual(len(self.myQ.get_ovr_log()[0]), 0)
+        # dense flags when log is disabled
+        self.myQ.enable_ovr_log(False)
+        self.myQ.fixp([0.5, 1.5, -2, 0])
+        self.assertEqual(list(self.myQ.ovr_flag), [0, 1, -1, 0])
+
+    def test_fixp_out(self):
+        """
+        Test quantization into a preallocated buffer and in place
+        """
+        y = np.array([[-1.1, -1.0, -0.5, 0.26], [0.5, 0.9, 0.99, 1.1]])
+        y_orig = y.copy()
+        for ovfl in ['sat', 'wrap', 'none']:
+            q_obj = {'WI':0, 'WF':3, 'ovfl':ovfl, 'quant':'round', 'frmt':'dec', 'scale':1}
+            self.myQ.setQobj(q_obj)
+            yq_goal = self.myQ.fixp(y)
+            flags_goal = self.myQ.ovr_flag.copy()
+
+            buf = np.zeros(y.shape)
+            yq = self.myQ.fixp(y, out=buf)
+            self.assertIs(yq, buf)
+            np.testing.assert_array_equal(yq, yq_goal)
+            np.testing.assert_array_equal(self.myQ.ovr_flag, flags_goal)
+            np.testing.assert_array_equal(y, y_orig) # input is not modified
+
+            y_inplace = y.copy()
+            self.myQ.fixp(y_inplace, out=y_inplace)
+            np.testing.assert_array_equal(y_inplace, yq_goal)
+
+        # 'out' must be a float array with the shape of the input
+        with self.assertRaises(ValueError):
+            self.myQ.fixp(y, out=np.zeros(3))
+        with self.assertRaises(ValueError):
+            self.myQ.fixp(0.5, out=np.zeros(1))
+
+    def test_process_stream(self):
+        """
+        Test that quantizing a signal block by block yields the same results and
+        statistics as quantizing it in one go
+        """
+        q_obj = {'WI':0, 'WF':7, 'ovfl':'wrap', 'quant':'round', 'frmt': 'dec', 'scale': 1}
+        self.myQ.setQobj(q_obj)
+        y = np.random.RandomState(1).randn(1000)
+        self.myQ.resetN()
+        self.myQ.enable_ovr_log()
+        yq_goal = self.myQ.fixp(y)
+        stats_goal = (self.myQ.N, self.myQ.N_over, self.myQ.N_over_pos)
+        idx_goal = self.myQ.get_ovr_log()[0]
+
+        self.myQ.resetN()
+        blocks = (y[i:i + 128] for i in range(0, len(y), 128))
+        yq = np.concatenate(list(self.myQ.process_stream(blocks)))
+        np.testing.assert_array_equal(yq, yq_goal)
+        self.assertEqual((self.myQ.N, self.myQ.N_over, self.myQ.N_over_pos), stats_goal)
+        np.testing.assert_array_equal(self.myQ.get_ovr_log()[0], idx_goal)
+
+    def test_dsm_params(self):
+        """
+        Test handling of delta-sigma modulator parameters in the quantization dict
+        """
+        self.assertEqual(self.myQ.dsm, fix_lib.DSM_DEFAULTS)
+        self.assertNotIn('dsm', self.myQ.q_obj)
+        q_obj = {'quant':'dsm', 'dsm':{'order':4}}
+        self.myQ.setQobj(q_obj)
+        self.assertEqual(self.myQ.q_obj['dsm'], {'order':4, 'osr':64, 'opt':1, 'H_inf':1.5})
+        # missing parameters are taken from the previous setting
+        self.myQ.setQobj({'dsm':{'osr':32}})
+        self.assertEqual(self.myQ.dsm, {'order':4, 'osr':32, 'opt':1, 'H_inf':1.5})
+        with self.assertRaises(Exception):
+            self.myQ.setQobj({'dsm':{'osrx':32}})
+
+    @unittest.skipUnless(fix_lib.DS, "requires deltasigma")
+    def test_dsm_ntf_cache(self):
+        """
+        Test that the NTF is only synthesized once per parameter set
+        """
+        fix_lib.synthesize_ntf.cache_clear()
+        self.myQ.setQobj({'WI':0, 'WF':0, 'quant':'dsm', 'dsm':{'order':2, 'osr':32}})
+        for _ in range(3):
+            self.myQ.fixp(np.zeros(16))
+        self.assertEqual(fix_lib.synthesize_ntf.cache_info().misses, 1)
+        self.assertEqual(fix_lib.synthesize_ntf.cache_info().hits, 2)
+
+    @unittest.skipUnless(fix_lib.DS, "requires deltasigma")
+    def test_process_stream_dsm(self):
+        """
+        Test that the state of the delta-sigma modulator is carried over between blocks
+        """
+        q_obj = {'WI':0, 'WF':0, 'ovfl':'sat', 'quant':'dsm', 'frmt': 'dec', 'scale': 1}
+        self.myQ.setQobj(q_obj)
+        y = 0.5 * np.sin(2 * np.pi * np.arange(512) / 256)
+        self.myQ.resetN()
+        yq_goal = self.myQ.fixp(y)
+        self.myQ.resetN()
+        yq = np.concatenate([self.myQ.process_block(y[:200]), self.myQ.process_block(y[200:])])
+        np.testing.assert_array_equal(yq, yq_goal)
+
     def test_float2frmt_bin(self):
         """
         Conversion from float to binary format
@@ -290,6 +462,22 @@ class TestSequenceFunctions(unittest.TestCase):
         yq_list = list(map(self.myQ.float2frmt, y_list))
         yq_list_goal = ['1.00', '1.04', '1.84', '1.FC', '0.00', '0.04', '0.7C', '0.80', '0.FC']
         self.assertEqual(yq_list, yq_list_goal)
+        # same, vectorized and as 2D array
+        yq_arr = self.myQ.float2frmt(np.reshape(y_list, (3, 3)))
+        self.assertEqual(yq_arr.shape, (3, 3))
+        self.assertEqual(list(yq_arr.ravel()), yq_list_goal)
+
+        # 64 bit word length, Q4.59: fractional bits don't fill complete hex
+        # digits, fall back to np.binary_repr()
+        self.myQ.setQobj({'Q':'4.59', 'scale':1})
+        yq_list = list(self.myQ.float2frmt([-16, -0.5, 15.5]))
+        yq_list_goal = ['10.000000000000000', '1F.800000000000000', '0F.800000000000000']
+        self.assertEqual(yq_list, yq_list_goal)
+        # Q4.58: 63 bits
+        self.myQ.setQobj({'Q':'4.58'})
+        yq_list = list(self.myQ.float2frmt([-16, -0.5, 15.5]))
+        self.assertEqual(yq_list, yq_list_goal)
+        self.assertEqual(self.myQ.float2frmt(-0.5), '1F.800000000000000')
 
         # Integer case: Q3.0, scale = 8, scalar parameter, test float2frmt
         q_obj = {'WI':3, 'WF':0, 'ovfl':'wrap', 'quant':'round', 'frmt': 'hex', 'scale': 8}
@@ -336,8 +524,10 @@ class TestSequenceFunctions(unittest.TestCase):
         # Fractional case: Q0.6, scalar, test float2frmt
         self.myQ.setQobj({'Q':'0.6', 'scale':1./64})
         yq_list = list(map(self.myQ.float2frmt, y_list))
-        yq_list_goal = ['-.000000',  '-.00000+', '-.0+0+0+', '0.00000-', '0', '0.00000+', '+.0-0-0-', '+.0-0-0-', '+.00000-']
-# TODO: 3rd argument should be: '-.0000+', 7th argument should be '+.0000-', 8th argument should be '+.00000'
+        yq_list_goal = ['-.000000',  '-.00000+', '0.-0000+', '0.00000-', '0', '0.00000+', '0.+0000-', '0.+00000', '+.00000-']
+        self.assertEqual(yq_list, yq_list_goal)
+        # same, vectorized
+        yq_list = list(self.myQ.float2frmt(y_list))
         self.assertEqual(yq_list, yq_list_goal)
 
         # Integer case: Q3.0, scale = 8, scalar parameter, test float2frmt
@@ -352,6 +542,25 @@ class TestSequenceFunctions(unittest.TestCase):
         yq_arr = list(self.myQ.float2frmt(self.y_list))
         self.assertEqual(yq_arr, yq_list_goal)
 
+    def test_csd_vec(self):
+        """
+        Test vectorized CSD conversion against scalar functions
+        """
+        y = np.arange(-1000, 1000)
+        yq_arr = dec2csd_vec(y)
+        self.assertEqual(list(yq_arr), [dec2csd(x) for x in y])
+        self.assertEqual(list(csd2dec_vec(yq_arr)), list(y))
+        self.assertEqual(list(csd2dec_vec(yq_arr)), [csd2dec(s) for s in yq_arr])
+        # CSD digits must be non-adjacent
+        csd_mat = dec2csd_mat(y)
+        self.assertFalse(np.any((csd_mat[:, 1:] != 0) & (csd_mat[:, :-1] != 0)))
+        self.assertEqual(dec2csd_mat(7).tolist(), [1, 0, 0, -1])
+        # fractional values and shape of multi-dimensional arrays
+        yq_arr = dec2csd_vec([[0.5, -0.75], [0, 3.25]], WF=2)
+        self.assertEqual(yq_arr.tolist(), [['0.+0', '-.0+'], ['0', '+0-.0+']])
+        self.assertEqual(dec2csd_vec(-6), '-0+0')
+        self.assertEqual(float(csd2dec_vec('-0+0')), -6)
+
 #================== FRMT -> FLOAT ===============================================
 
     def test_frmt2float_float(self):
@@ -390,8 +599,8 @@ class TestSequenceFunctions(unittest.TestCase):
         yq_list_goal = [0, -1, 0, -1, -0.875, -0.5,-0.125,  0, 0.5, 0.875, -1, 0, 0.25]
         self.assertEqual(yq_list, yq_list_goal)
         # same but vectorized
-        #yq_list = self.myQ.frmt2float(y_list)
-        #self.assertEqual(yq_list, yq_list_goal)
+        yq_list = list(self.myQ.frmt2float(y_list))
+        self.assertEqual(yq_list, yq_list_goal)
 
         # same for integer case
         y_list = ['11000', '1000', '-0111', '1001', '1100', '1111', '0000', '0100', '0111', '01000']
@@ -408,8 +617,8 @@ class TestSequenceFunctions(unittest.TestCase):
         yq_list_goal = [-8, -8, -7, -7, -4, -1,  0, 4, 7, -8]
         self.assertEqual(yq_list, yq_list_goal)
         # same but vectorized
-        #yq_list = list(self.myQ.frmt2float(y_list))
-        #self.assertEqual(yq_list, yq_list_goal)
+        yq_list = list(self.myQ.frmt2float(y_list))
+        self.assertEqual(yq_list, yq_list_goal)
 
     def test_frmt2float_hex(self):
         """
@@ -440,8 +649,8 @@ class TestSequenceFunctions(unittest.TestCase):
         self.assertEqual(yq_list, yq_list_goal)
 
         # same but vectorized
-        # yq_list = self.myQ.frmt2float(y_list)
-        # self.assertEqual(yq_list, yq_list_goal)
+        yq_list = list(self.myQ.frmt2float(y_list))
+        self.assertEqual(yq_list, yq_list_goal)
 
         # same for integer case
         y_list = ['100000', '1,000', '1,1', '1.5', '1.E', '1.F', '0.000', '1', '2', '8','', '2.0', '07.00', '070.01']
@@ -486,11 +695,31 @@ class TestSequenceFunctions(unittest.TestCase):
         self.assertEqual(yq_list, yq_list_goal)
 
         # same but vectorized
-        # yq_list = self.myQ.frmt2float(y_list)
-        # self.assertEqual(yq_list, yq_list_goal)
+        yq_list = list(self.myQ.frmt2float(y_list))
+        self.assertEqual(yq_list, yq_list_goal)
 
+    def test_frmt2float_vec(self):
+        """
+        Test that vectorized conversion yields the same results and overflow
+        counts as the scalar conversion, including invalid and very long strings
+        """
+        y_lists = {'dec': ['1.5', '-1,25', '', '1.2.3', '-', '17', 'x0.25', '-0.125'],
+                   'bin': ['0.1.0', '.-1', '-0111', '1' * 60, '', '1|0', '0-1', '101,1'],
+                   'hex': ['1A.8', '-F', 'FF.F', '', '.8', 'G', 'F' * 20, '-.1'],
+                   'csd': ['+0-.+', '-', '', '.+', '+' * 60, '0+0-', '+|-', '-0.0-']}
+        for frmt, y_list in y_lists.items():
+            q_obj = {'WI':3, 'WF':2, 'ovfl':'wrap', 'quant':'round', 'frmt': frmt, 'scale': 1}
+            self.myQ.setQobj(q_obj)
+            self.myQ.resetN()
+            yq_list_goal = list(map(self.myQ.frmt2float, y_list))
+            N_goal = (self.myQ.N, self.myQ.N_over, self.myQ.N_over_neg, self.myQ.N_over_pos)
+            self.myQ.resetN()
+            yq_arr = self.myQ.frmt2float(np.array(y_list).reshape(2, -1))
+            self.assertEqual(yq_arr.shape, (2, len(y_list) // 2))
+            self.assertEqual(list(yq_arr.ravel()), yq_list_goal)
+            self.assertEqual((self.myQ.N, self.myQ.N_over, self.myQ.N_over_neg,
+                              self.myQ.N_over_pos), N_goal)
 
-# TODO: test csd2dec, csd2dec_vec
 
 #==============================================================================
 #         # same for Q5.0 quantization
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the pyFDA project hosted at https://github.com/chipmuenk/pyfda
+#
+# Copyright © pyFDA Project Contributors
+# Licensed under the terms of the MIT License
+# (see file LICENSE in root directory for details)
+
+"""
+Test suite for the response cache in pyfda_lib
+"""
+
+import unittest
+import numpy as np
+from numpy.testing import assert_array_equal, assert_allclose
+import scipy.signal as sig
+from pyfda.libs.pyfda_lib import (resp_hash, Resp_Cache, resp_cache, calc_Hcomplex,
+                                  calc_Hcomplex_zoom, H_mag, H_mag_polar)
+
+
+class TestSequenceFunctions(unittest.TestCase):
+
+    def setUp(self):
+        self.b, self.a = sig.ellip(4, 1, 40, 0.3)
+        self.calls = 0
+
+    def calc(self, N=16):
+        self.calls += 1
+        return np.arange(N), np.ones(N, dtype=complex)
+
+    def test_resp_hash(self):
+        """
+        Keys depend on values, dtypes and shapes of the arguments
+        """
+        k = resp_hash('H', self.b, self.a, 128, True)
+        self.assertEqual(k, resp_hash('H', list(self.b), tuple(self.a), 128, True))
+        self.assertNotEqual(k, resp_hash('H', self.b, self.a, 128, False))
+        self.assertNotEqual(k, resp_hash('H', self.b, self.a, 256, True))
+        self.assertNotEqual(k, resp_hash('H', self.b * 1.000001, self.a, 128, True))
+        self.assertNotEqual(resp_hash([1, 2]), resp_hash([[1, 2]]))
+        self.assertNotEqual(resp_hash([1, 2]), resp_hash([1., 2.]))
+
+    def test_resp_cache(self):
+        """
+        Responses are calculated once, copies are returned and the least
+        recently used entries are removed when the size limit is reached
+        """
+        N_bytes = 16 * (8 + 16)
+        cache = Resp_Cache(max_bytes=3 * N_bytes)
+        W, H = cache.get('a', self.calc)
+        H[:] = 0 # modifying the returned copy doesn't change the cache
+        assert_array_equal(cache.get('a', self.calc)[1], np.ones(16))
+        self.assertEqual(self.calls, 1)
+
+        cache.get('b', self.calc)
+        cache.get('c', self.calc)
+        cache.get('a', self.calc) # 'a' is now the most recently used entry
+        cache.get('d', self.calc) # removes 'b'
+        self.assertEqual(list(cache.cache), ['c', 'a', 'd'])
+        self.assertEqual(cache.N_bytes, 3 * N_bytes)
+        self.assertEqual(self.calls, 4)
+
+        cache.get('e', lambda: self.calc(1000)) # too large, is not stored
+        self.assertEqual(list(cache.cache), ['c', 'a', 'd'])
+
+    def test_calc_Hcomplex(self):
+        """
+        Cached results are identical to freqz() and depend on the coefficients
+        """
+        fil = {'ba':[self.b, self.a]}
+        resp_cache.clear()
+        W, H = calc_Hcomplex(fil, 512, True)
+        W_f, H_f = sig.freqz(self.b, self.a, worN=512, whole=True)
+        assert_array_equal(W, W_f)
+        assert_array_equal(H, H_f)
+        self.assertEqual(len(resp_cache.cache), 1)
+        calc_Hcomplex(fil, 512, True)
+        self.assertEqual(len(resp_cache.cache), 1)
+        calc_Hcomplex({'ba':[self.b, np.ones(1)]}, 512, True)
+        self.assertEqual(len(resp_cache.cache), 2)
+
+    def test_calc_Hcomplex_zoom(self):
+        """
+        Response in a zoomed frequency range (including negative frequencies)
+        equals freqz() at the same frequencies
+        """
+        for W_range in [(0.1, 0.12), (-0.5, 0.5), (0, 2 * np.pi)]:
+            W, H = calc_Hcomplex_zoom({'ba':[self.b, self.a]}, W_range, 300)
+            assert_allclose(W, np.linspace(W_range[0], W_range[1], 300))
+            assert_allclose(H, sig.freqz(self.b, self.a, worN=W)[1], rtol=1e-9, atol=1e-12)
+
+    def test_H_mag_polar(self):
+        """
+        |H(z)| evaluated ring by ring on a polar grid equals H_mag() on the
+        same grid, also for polynomials longer than the number of angles
+        """
+        r = np.arange(0, 1, 0.05)
+        for b, a in [(self.b, self.a), (sig.firwin(251, 0.2), 1)]:
+            for N_phi in [100, 50]:
+                R, Phi = np.meshgrid(r, np.linspace(0, 2 * np.pi, N_phi, endpoint=True))
+                H = H_mag(b, a, R * np.exp(1j * Phi), np.inf)
+                H_p = H_mag_polar(b, a, r, N_phi, np.inf)
+                self.assertEqual(H_p.shape, H.shape)
+                assert_allclose(H_p, H, rtol=1e-8, atol=1e-12)
+        assert_allclose(H_mag_polar(self.b, self.a, r, 64, 0, H_min=-40, log=True,
+                                    endpoint=False),
+                        H_mag(self.b, self.a, np.exp(2j * np.pi * np.arange(64) / 64)[:, None] * r,
+                              0, H_min=-40, log=True), rtol=1e-8, atol=1e-8)
+
+
+if __name__=='__main__':
+    unittest.main()
+
+# run tests with python -m pyfda.tests.test_pyfda_lib
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the pyFDA project hosted at https://github.com/chipmuenk/pyfda
+#
+# Copyright © pyFDA Project Contributors
+# Licensed under the terms of the MIT License
+# (see file LICENSE in root directory for details)
+
+"""
+Test suite for pyfda_sig_lib
+"""
+
+import unittest
+import numpy as np
+from numpy.testing import assert_allclose
+import scipy.signal as sig
+from pyfda.libs.pyfda_sig_lib import (RunningStats, AvgSpectrum, group_delay, group_delayz,
+                                      sos_group_delayz, quadfilt_group_delayz,
+                                      zpk_group_delay)
+
+
+class TestSequenceFunctions(unittest.TestCase):
+
+    def setUp(self):
+        self.x = np.random.RandomState(3).randn(10000) * 2 + 0.5
+
+    def test_running_stats(self):
+        """
+        Statistics calculated block by block must be independent of the block size
+        """
+        for N_blk in [1, 7, 1000, 10000]:
+            stats = RunningStats()
+            for n0 in range(0, len(self.x), N_blk):
+                stats.update(self.x[n0:n0 + N_blk])
+            self.assertEqual(stats.N, len(self.x))
+            assert_allclose(stats.mean, np.mean(self.x))
+            assert_allclose(stats.var, np.var(self.x))
+            assert_allclose(stats.rms, np.sqrt(np.mean(self.x**2)))
+            self.assertEqual(stats.min, np.min(self.x))
+            self.assertEqual(stats.max, np.max(self.x))
+
+    def test_running_stats_cmplx(self):
+        """
+        Statistics of complex signals
+        """
+        x = self.x[:5000] + 1j * self.x[5000:]
+        stats = RunningStats()
+        for n0 in range(0, len(x), 333):
+            stats.update(x[n0:n0 + 333])
+        assert_allclose(stats.mean, np.mean(x))
+        assert_allclose(stats.var, np.var(x))
+
+    def test_avg_spectrum(self):
+        """
+        Averaged spectrum of one segment equals the scaled FFT magnitude, the
+        power of the averaged spectrum is the mean power of the segments
+        """
+        win = np.hanning(1000)
+        spec = AvgSpectrum(win)
+        assert_allclose(spec.spectrum(), np.zeros(1000))
+        spec.update(self.x[:1000])
+        assert_allclose(spec.spectrum(), np.abs(np.fft.fft(self.x[:1000] * win)) / 1000)
+        for n0 in range(1000, len(self.x), 1000):
+            spec.update(self.x[n0:n0 + 1000])
+        self.assertEqual(spec.N_avg, 10)
+        P = [np.sum(np.abs(np.fft.fft(self.x[n0:n0 + 1000] * win) / 1000)**2)
+             for n0 in range(0, len(self.x), 1000)]
+        assert_allclose(np.sum(spec.spectrum()**2), np.mean(P))
+
+    def test_sos_group_delayz(self):
+        """
+        Group delay of all sections calculated at once equals the sum of the
+        group delays of the individual sections and scipy's result
+        """
+        sos = sig.ellip(8, 0.5, 60, 0.3, output='sos')
+        w = np.linspace(0, np.pi, 500, endpoint=False)
+        gd_ref = 0
+        for biquad in sos:
+            gd_ref += quadfilt_group_delayz(biquad[:3], w)[1]
+            gd_ref -= quadfilt_group_delayz(biquad[3:], w)[1]
+        W, gd = sos_group_delayz(sos, w)
+        assert_allclose(gd, gd_ref, rtol=1e-10, atol=1e-10)
+        b, a = sig.sos2tf(sos)
+        assert_allclose(gd, sig.group_delay((b, a), w=w)[1], rtol=1e-6, atol=1e-6)
+        # second call uses the cached second-order sections
+        assert_allclose(group_delayz(b, a, w)[1], gd, rtol=1e-6, atol=1e-6)
+        assert_allclose(group_delayz(b, a, w)[1], gd, rtol=1e-6, atol=1e-6)
+
+    def test_zpk_group_delay(self):
+        """
+        Group delay calculated from zeros and poles in chunks equals scipy's
+        result, independent of the chunk size. This includes the delay lost by
+        tf2zpk (FIR filters with zero end taps) and the degree difference.
+        """
+        w = np.linspace(0, np.pi, 500, endpoint=False)
+        for b, a in [(sig.firwin(41, 0.3), np.ones(1)),
+                     (sig.firwin(41, 0.3, window='hann'), np.ones(1)),
+                     ([0, 0, 1, 0.5], [1, -0.5])]:
+            z, p, k = sig.tf2zpk(b, a)
+            gd_ref = sig.group_delay((b, a), w=w)[1]
+            for n_max in [2**20, 1000, 1]:
+                W, gd = zpk_group_delay(z, p, k, w, n_max=n_max)
+                assert_allclose(gd + len(b) - len(a), gd_ref, rtol=1e-6, atol=1e-6)
+            W, gd = group_delay(b, a, nfft=500, alg='zpk', verbose=False)
+            assert_allclose(W, w)
+            assert_allclose(gd, gd_ref, rtol=1e-6, atol=1e-6)
+
+        # scipy evaluates the polynomials of higher order IIR filters with an
+        # error of ~1e-6, compare to the group delay of the sections instead
+        z, p, k = sig.ellip(6, 0.5, 40, 0.3, output='zpk')
+        sos = sig.zpk2sos(z, p, k)
+        gd_ref = sos_group_delayz(sos, w)[1]
+        for n_max in [2**20, 1000, 1]:
+            assert_allclose(zpk_group_delay(z, p, k, w, n_max=n_max)[1], gd_ref,
+                            rtol=1e-7, atol=1e-7)
+        W, gd = group_delay([z, p, k], nfft=500, zpk=True, alg='auto', verbose=False)
+        assert_allclose(gd, gd_ref, rtol=1e-7, atol=1e-7)
+        W, gd = group_delay(sos, nfft=500, sos=True, alg='zpk', verbose=False)
+        assert_allclose(gd, gd_ref, rtol=1e-7, atol=1e-7)
+        assert_allclose(gd_ref, sig.group_delay(sig.zpk2tf(z, p, k), w=w)[1],
+                        rtol=1e-5, atol=1e-5)
+
+        # section with b0 = 0, sos2zpk would replace its delay by a zero at the origin
+        W, gd = group_delay([[0, 1, 0.5, 1, -0.5, 0.2]], nfft=500, sos=True, alg='zpk',
+                            verbose=False)
+        assert_allclose(gd, sig.group_delay(([0, 1, 0.5], [1, -0.5, 0.2]), w=w)[1],
+                        rtol=1e-6, atol=1e-6)
+
+if __name__=='__main__':
+    unittest.main()
+
+# run tests with python -m pyfda.tests.test_pyfda_sig_lib